@@ -0,0 +1,140 @@
+"""
+Compares the ways of loading video stats into a pandas DataFrame:
+    - legacy: full YtVideo models (transcripts included) -> list of dicts -> DataFrame
+    - rows: projected flat rows -> DataFrame
+    - columnar: projected rows streamed into typed numpy buffers
+
+Usage:
+    python -m benchmarks.dataframe_export [--videos 100000] [--mongo-url mongodb://localhost:27017]
+
+Without mongo url the documents are generated in mongomock. Mongomock cursors are
+quadratic in the result size, so the documents are fetched from it once per projection
+and served from memory, which leaves only the client-side part of each path measured
+(no network transfer, so the savings from not fetching transcripts aren't included)
+"""
+import argparse
+import contextlib
+import datetime
+import random
+import time
+
+import pandas as pd
+
+from model.data_analysis.youtube_stats_analysis import \
+    BtcYoutubeSentimentAnalysis
+from model.persistence.mongo import YtVideoMongoRepository
+from model.youtube.core import (YoutubeVideoSentimentRating, YtVideo,
+                                YtVideoStats)
+
+
+class PrefetchedCollection:
+    """
+    Serves the documents fetched once from the wrapped collection, like a server would
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+        self._documents = {}
+
+    def find(self, filter=None, projection=None, batch_size=0):
+        key = repr(projection)
+        if key not in self._documents:
+            self._documents[key] = list(self._collection.find(filter, projection))
+        return contextlib.nullcontext(iter(self._documents[key]))
+
+    def prefetch(self, fn, repository: YtVideoMongoRepository) -> None:
+        fn(repository)
+
+
+def create_collection(mongo_url: str | None):
+    if mongo_url:
+        import pymongo
+
+        collection = pymongo.MongoClient(mongo_url)["benchmark_scrape"]["videos"]
+    else:
+        import mongomock
+
+        collection = mongomock.MongoClient().db.collection
+    collection.drop()
+    return collection
+
+
+def synthetic_videos(first: int, n: int) -> list[YtVideo]:
+    start = datetime.datetime(2020, 1, 1)
+    return [
+        YtVideo(
+            video_id=f"vid{i}",
+            title=f"Synthetic video number {i}",
+            channel="channel",
+            date=start + datetime.timedelta(minutes=20 * i),
+            description="description " * 20,
+            transcript="transcript text " * 300,
+            stats=YtVideoStats(
+                views=random.randint(1_000, 10_000_000),
+                likes=random.randint(10, 100_000),
+                comments=random.randint(0, 10_000),
+                length_minutes=random.uniform(5, 60),
+                sentiment_rating=YoutubeVideoSentimentRating(
+                    model="synthetic",
+                    score_title=random.uniform(-1, 1),
+                    score_transcript=random.uniform(-1, 1),
+                ),
+            ),
+        )
+        for i in range(first, first + n)
+    ]
+
+
+def legacy_dataframe(repository: YtVideoMongoRepository) -> pd.DataFrame:
+    vids = [
+        {
+            "date": v.date,
+            "views": v.stats.views,
+            "likes": v.stats.likes,
+            "comments": v.stats.comments,
+            "title_sentiment": v.stats.sentiment_rating.score_title,
+            "transcript_sentiment": v.stats.sentiment_rating.score_transcript,
+        }
+        for v in repository.get_all_videos()
+    ]
+    return pd.DataFrame(vids)
+
+
+def rows_dataframe(repository: YtVideoMongoRepository) -> pd.DataFrame:
+    return pd.DataFrame(repository.iter_rows(BtcYoutubeSentimentAnalysis.COLUMNS))
+
+
+def columnar_dataframe(repository: YtVideoMongoRepository) -> pd.DataFrame:
+    return repository.to_dataframe(
+        BtcYoutubeSentimentAnalysis.COLUMNS, BtcYoutubeSentimentAnalysis.DTYPES
+    )
+
+
+def measure(name: str, fn, repository: YtVideoMongoRepository) -> float:
+    start = time.perf_counter()
+    df = fn(repository)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>10}: {elapsed:8.2f} s, {len(df)} rows")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", type=int, default=100_000)
+    parser.add_argument("--mongo-url", default=None)
+    args = parser.parse_args()
+
+    repository = YtVideoMongoRepository(create_collection(args.mongo_url))
+    for i in range(0, args.videos, 10_000):
+        videos = synthetic_videos(i, min(10_000, args.videos - i))
+        repository.collection.insert_many([video.model_dump() for video in videos])
+
+    if not args.mongo_url:
+        repository.collection = PrefetchedCollection(repository.collection)
+        for fn in (legacy_dataframe, rows_dataframe, columnar_dataframe):
+            repository.collection.prefetch(fn, repository)
+
+    legacy = measure("legacy", legacy_dataframe, repository)
+    rows = measure("rows", rows_dataframe, repository)
+    columnar = measure("columnar", columnar_dataframe, repository)
+    print(f"speedup: rows {legacy / rows:.1f}x, columnar {legacy / columnar:.1f}x")
@@ -0,0 +1,78 @@
+"""
+Compares the throughput of the sentiment rater backends on CPU:
+    - roberta: fp32 PyTorch model, texts rated one by one
+    - roberta batched: fp32 PyTorch model, rate_many
+    - roberta-onnx: int8 quantized ONNX model run by onnxruntime, rate_many
+
+Usage:
+    python -m benchmarks.sentiment_backends [--texts 256] [--batch-size 16] [--threads 4]
+
+The texts are the test sentiment data, repeated up to the requested count. The ONNX
+model is exported to onnx_models on the first run, which isn't measured
+"""
+import argparse
+import itertools
+import time
+
+import torch
+
+from model.sentiment_analysis.core import ISentimentRater
+from model.sentiment_analysis.onnx_rater import RobertaOnnxSentimentRater
+from model.sentiment_analysis.sentiment_roberta import RobertaSentimentRater
+from tests.resources.sentiment_data import (SentimentRatingType,
+                                            read_sentiment_data)
+
+
+def sample_texts(count: int) -> list[str]:
+    texts = [
+        text
+        for rating_type in SentimentRatingType
+        for text in read_sentiment_data(rating_type)
+    ]
+    return list(itertools.islice(itertools.cycle(texts), count))
+
+
+def rate_one_by_one(rater: ISentimentRater, texts: list[str], batch_size: int):
+    return [rater.rate(text) for text in texts]
+
+
+def rate_batched(rater: ISentimentRater, texts: list[str], batch_size: int):
+    return rater.rate_many(texts, batch_size)
+
+
+def measure(name: str, fn, rater: ISentimentRater, texts: list[str], batch_size: int):
+    # warm up, so that one-off initialization isn't measured
+    fn(rater, texts[:batch_size], batch_size)
+
+    start = time.perf_counter()
+    ratings = fn(rater, texts, batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>16}: {elapsed:8.2f} s, {len(texts) / elapsed:8.1f} texts/s")
+    return elapsed, [rating.score for rating in ratings]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    texts = sample_texts(args.texts)
+    roberta = RobertaSentimentRater()
+    roberta_onnx = RobertaOnnxSentimentRater(threads=args.threads)
+
+    serial, scores = measure(
+        "roberta", rate_one_by_one, roberta, texts, args.batch_size
+    )
+    batched, _ = measure(
+        "roberta batched", rate_batched, roberta, texts, args.batch_size
+    )
+    onnx, onnx_scores = measure(
+        "roberta-onnx", rate_batched, roberta_onnx, texts, args.batch_size
+    )
+    difference = max(abs(a - b) for a, b in zip(scores, onnx_scores))
+    print(f"speedup: batched {serial / batched:.1f}x, onnx {serial / onnx:.1f}x")
+    print(f"max score difference of onnx: {difference:.2f}")
@@ -17,6 +17,23 @@ class BtcYoutubeSentimentAnalysis:
     assign some positive sentiment impact to videos that have sentiment rating close to 0.
     """
 
+    COLUMNS = {
+        "date": "date",
+        "views": "stats.views",
+        "likes": "stats.likes",
+        "comments": "stats.comments",
+        "title_sentiment": "stats.sentiment_rating.score_title",
+        "transcript_sentiment": "stats.sentiment_rating.score_transcript",
+    }
+    DTYPES = {
+        "date": "datetime64[ms]",
+        "views": "float64",
+        "likes": "float64",
+        "comments": "float64",
+        "title_sentiment": "float64",
+        "transcript_sentiment": "float64",
+    }
+
     def __init__(self, repository: IYtVideoRepository, btc_price_csv_path: str):
         self.repository = repository
         self.btc_price_csv_path = btc_price_csv_path
@@ -71,23 +88,7 @@ class BtcYoutubeSentimentAnalysis:
             return (row["title_sentiment"] + row["transcript_sentiment"]) / 2
 
     def _prepare_df(self):
-        vids = self.repository.get_all_videos()
-        vids = [
-            {
-                "video_id": v.video_id,
-                "title": v.title,
-                "date": v.date,
-                "views": v.stats.views,
-                "likes": v.stats.likes,
-                "comments": v.stats.comments,
-                "length_minutes": v.stats.length_minutes,
-                "title_sentiment": v.stats.sentiment_rating.score_title,
-                "transcript_sentiment": v.stats.sentiment_rating.score_transcript,
-            }
-            for v in vids
-        ]
-
-        return pd.DataFrame(vids)
+        return self.repository.to_dataframe(self.COLUMNS, self.DTYPES)
 
     def _prepare_btc_df(self):
         btc_usd = pd.read_csv(self.btc_price_csv_path)
@@ -1,20 +1,39 @@
+from functools import cache
+
 from config_data_provider import (get_config, get_open_ai_api_key,
                                   get_scraper_config, get_yt_api_keys)
+from model.gpt_tools.rate_limiter import RateLimiter
 from model.persistence.core import IYtVideoRepository
 from model.persistence.factory import YtVideoRepositoryFactory
 from model.pipeline.batch_pipeline import YtVidScrapingBatchPipeline
+from model.pipeline.concurrent_pipeline import YtVidScrapingConcurrentPipeline
 from model.pipeline.core import IYtVidScrapingPipeline
 from model.pipeline.serial_pipeline import YtVidScrapingSerialPipeline
+from model.pipeline.sharded_runner import (MongoShardQueue,
+                                           ShardedBackfillRunner)
 from model.pipeline.std_pipeline import YtVidScrapingStdPipeline
+from model.sentiment_analysis.chunking_rater import ChunkingSentimentRater
+from model.sentiment_analysis.classifier_rater import ClassifierSentimentRater
 from model.sentiment_analysis.core import ISentimentRater
+from model.sentiment_analysis.onnx_rater import (ONNX_MODELS_DIR,
+                                                 FinbertOnnxSentimentRater,
+                                                 RobertaOnnxSentimentRater)
+from model.sentiment_analysis.rating_cache import (CachedSentimentRater,
+                                                   SentimentRatingCache)
+from model.sentiment_analysis.sentiment_finbert import FinbertSentimentRater
 from model.sentiment_analysis.sentiment_gpt import GptSentimentRater
 from model.sentiment_analysis.sentiment_roberta import RobertaSentimentRater
+from model.youtube.api_key_pool import DAILY_QUOTA, ApiKeyPool
 from model.youtube.core import (IYtStatsScraper, IYtTopVideoFinder,
                                 IYtTranscriptScraper)
+from model.youtube.response_cache import ResponseCache
 from model.youtube.sentiment_filler import SentimentFiller
 from model.youtube.transcript_filler import TranscriptFiller
+from model.youtube.voice_activity import VoiceActivityDetector
+from model.youtube.whisper_pool import WhisperTranscriptionPool
 from model.youtube.whisper_transcript import WhisperTranscriptExtractor
 from model.youtube.yt_audio_downloader import YtAudioDownloader
+from model.youtube.yt_info_extractor import YtInfoExtractor
 from model.youtube.yt_transcript_scraper import (ComboYtTranscriptScraper,
                                                  YtDlpTranscriptScraper,
                                                  YtWhisperTranscriptScraper)
@@ -27,7 +46,7 @@ def create_stats_scraper() -> IYtStatsScraper:
     if scraper_config["stats_scraper"] == "yt-dlp":
         from model.youtube.yt_stats_scraper import YtDlpStatsScraper
 
-        return YtDlpStatsScraper()
+        return YtDlpStatsScraper(create_info_extractor())
     elif scraper_config["stats_scraper"] == "ytapi":
         from model.youtube.yt_stats_scraper import YtApiStatsScraper
 
@@ -36,31 +55,119 @@ def create_stats_scraper() -> IYtStatsScraper:
         raise Exception("Invalid stats scraper type")
 
 
-def create_top_video_finder() -> IYtTopVideoFinder:
+@cache
+def create_info_extractor() -> YtInfoExtractor:
+    """
+    Creates the yt-dlp info extractor once, all the yt-dlp based components share it
+    """
+    return YtInfoExtractor(
+        max_entries=get_scraper_config().get("info_cache_entries", 256)
+    )
+
+
+def create_api_key_pool(api_keys: list[str]) -> ApiKeyPool:
+    scraper_config = get_scraper_config()
+    return ApiKeyPool(
+        api_keys,
+        daily_quota=scraper_config.get("daily_quota_per_key", DAILY_QUOTA),
+        state_path=scraper_config.get("quota_state_path", "yt_api_quota.json"),
+    )
+
+
+def create_response_cache() -> ResponseCache | None:
+    cache_path = get_scraper_config().get("response_cache_path", "yt_api_cache.sqlite")
+    # empty path turns the cache off
+    if not cache_path:
+        return None
+    return ResponseCache(cache_path)
+
+
+def create_top_video_finder(api_keys: list[str] | None = None) -> IYtTopVideoFinder:
+    scraper_config = get_scraper_config()
+    api_keys = api_keys or get_yt_api_keys()
+    key_pool = create_api_key_pool(api_keys)
+    response_cache = create_response_cache()
+
+    if scraper_config.get("top_video_finder", "sync") == "async":
+        from model.youtube.yt_top_vid_finder_async import AsyncYtTopVideoFinder
+
+        # without stats scraper, async finder scrapes the stats using yt api itself
+        stats_scraper = (
+            create_stats_scraper()
+            if scraper_config["stats_scraper"] == "yt-dlp"
+            else None
+        )
+        return AsyncYtTopVideoFinder(
+            api_keys,
+            stats_scraper=stats_scraper,
+            max_concurrent_windows=scraper_config.get("max_concurrent_windows", 5),
+            key_pool=key_pool,
+            response_cache=response_cache,
+        )
+
     stats_scraper = create_stats_scraper()
     from model.youtube.yt_top_vid_finder import YtTopVideoFinder
 
-    api_keys = get_yt_api_keys()
-    return YtTopVideoFinder(api_keys, stats_scraper=stats_scraper)
+    return YtTopVideoFinder(
+        api_keys,
+        stats_scraper=stats_scraper,
+        key_pool=key_pool,
+        response_cache=response_cache,
+    )
 
 
 def create_transcript_scraper() -> IYtTranscriptScraper:
     scraper_config = get_scraper_config()
     if scraper_config["transcript_scraper"] == "yt-dlp":
-        transcript_scraper = YtDlpTranscriptScraper()
+        transcript_scraper = YtDlpTranscriptScraper(
+            info_extractor=create_info_extractor()
+        )
     elif scraper_config["transcript_scraper"] == "whisper":
-        whisper = WhisperTranscriptExtractor()
         transcript_scraper = YtWhisperTranscriptScraper(
-            whisper,
-            YtAudioDownloader(),
+            create_whisper_transcriber(),
+            YtAudioDownloader(
+                sample_windows=scraper_config.get("audio_sample_windows", 1),
+                info_extractor=create_info_extractor(),
+            ),
+            vad=create_voice_activity_detector(),
         )
     elif scraper_config["transcript_scraper"] == "combo":
-        transcript_scraper = ComboYtTranscriptScraper()
+        transcript_scraper = ComboYtTranscriptScraper(
+            whisper=create_whisper_transcriber(),
+            sample_windows=scraper_config.get("audio_sample_windows", 1),
+            vad=create_voice_activity_detector(),
+            info_extractor=create_info_extractor(),
+        )
     else:
         raise Exception("Invalid transcript scraper type")
     return transcript_scraper
 
 
+@cache
+def create_whisper_transcriber() -> (
+    WhisperTranscriptExtractor | WhisperTranscriptionPool
+):
+    """
+    Creates the whisper model (or pool of whisper workers) once, all the transcript
+    scrapers share it
+    """
+    scraper_config = get_scraper_config()
+    model = scraper_config.get("whisper_model", "base")
+    workers = scraper_config.get("whisper_workers", 1)
+    backend = scraper_config.get("whisper_backend", "whisper")
+    if workers == 1 and backend == "whisper":
+        return WhisperTranscriptExtractor(model)
+    return WhisperTranscriptionPool(model, workers, backend)
+
+
+def create_voice_activity_detector() -> VoiceActivityDetector | None:
+    backend = get_scraper_config().get("whisper_vad", "")
+    # empty backend turns the speech detection off
+    if not backend:
+        return None
+    return VoiceActivityDetector(backend)
+
+
 def create_video_repository():
     db_config = config["db"]
 
@@ -77,48 +184,128 @@ def create_video_repository():
 def create_sentiment_rater() -> ISentimentRater:
     scraper_config = get_scraper_config()
     if scraper_config["sentiment_rater"] == "roberta":
-        return RobertaSentimentRater()
+        rater = _chunking_rater(RobertaSentimentRater())
+    elif scraper_config["sentiment_rater"] == "finbert":
+        rater = _chunking_rater(FinbertSentimentRater())
+    elif scraper_config["sentiment_rater"] == "roberta-onnx":
+        rater = _chunking_rater(RobertaOnnxSentimentRater(_onnx_models_dir()))
+    elif scraper_config["sentiment_rater"] == "finbert-onnx":
+        rater = _chunking_rater(FinbertOnnxSentimentRater(_onnx_models_dir()))
     elif scraper_config["sentiment_rater"] == "gpt":
-        return GptSentimentRater(get_open_ai_api_key())
+        rater = GptSentimentRater(
+            get_open_ai_api_key(),
+            max_in_flight=scraper_config.get("gpt_max_in_flight", 8),
+            rate_limiter=RateLimiter(
+                scraper_config.get(
+                    "gpt_requests_per_minute", GptSentimentRater.REQUESTS_PER_MINUTE
+                ),
+                scraper_config.get(
+                    "gpt_tokens_per_minute", GptSentimentRater.TOKENS_PER_MINUTE
+                ),
+            ),
+            pack_token_budget=scraper_config.get("gpt_pack_token_budget", 0),
+            max_texts_per_pack=scraper_config.get("gpt_texts_per_pack", 20),
+        )
     else:
         raise Exception("Invalid sentiment rater type")
 
+    cache_path = scraper_config.get("sentiment_cache_path", "sentiment_cache.sqlite")
+    # empty path turns the cache off
+    if not cache_path:
+        return rater
+    return CachedSentimentRater(rater, SentimentRatingCache(cache_path))
+
+
+def _onnx_models_dir() -> str:
+    return get_scraper_config().get("onnx_models_dir", ONNX_MODELS_DIR)
+
+
+def _chunking_rater(rater: ClassifierSentimentRater) -> ChunkingSentimentRater:
+    # transcripts are far longer than the transformer models' input
+    return ChunkingSentimentRater(
+        rater,
+        rater.tokenizer,
+        overlap_tokens=get_scraper_config().get("sentiment_chunk_overlap", 50),
+    )
+
 
-def create_scraping_pipeline() -> IYtVidScrapingPipeline:
-    pipeline = config["pipeline"]
+def create_scraping_pipeline(
+    api_keys: list[str] | None = None,
+) -> IYtVidScrapingPipeline:
+    """
+    Creates the configured pipeline, using the given api keys (all the keys from
+    config by default)
+    """
+    scraper_config = get_scraper_config()
+    pipeline = scraper_config["pipeline"]
 
     if pipeline == "std":
         return YtVidScrapingStdPipeline(
             create_video_repository(),
-            create_top_video_finder(),
+            create_top_video_finder(api_keys),
             create_transcript_scraper(),
             create_sentiment_rater(),
-            config["overwrite_existing_data"],
+            scraper_config["overwrite_existing_data"],
         )
     elif pipeline == "batch":
         return YtVidScrapingBatchPipeline(
             create_video_repository(),
-            create_top_video_finder(),
+            create_top_video_finder(api_keys),
             create_transcript_scraper(),
             create_sentiment_rater(),
-            config["overwrite_existing_data"],
+            scraper_config["overwrite_existing_data"],
+        )
+    elif pipeline == "concurrent":
+        return YtVidScrapingConcurrentPipeline(
+            create_video_repository(),
+            create_top_video_finder(api_keys),
+            create_transcript_scraper(),
+            create_sentiment_rater(),
+            scraper_config["overwrite_existing_data"],
+            transcript_workers=scraper_config.get("transcript_workers", 2),
+            sentiment_workers=scraper_config.get("sentiment_workers", 1),
+            sentiment_batch_size=scraper_config.get("sentiment_batch_size", 8),
         )
     elif pipeline == "serial":
         return YtVidScrapingSerialPipeline(
             create_video_repository(),
-            create_top_video_finder(),
+            create_top_video_finder(api_keys),
             create_transcript_scraper(),
             create_sentiment_rater(),
         )
+    else:
+        raise Exception("Invalid pipeline type")
 
 
 def create_transcript_filler() -> TranscriptFiller:
-    return TranscriptFiller(create_transcript_scraper(), create_video_repository())
+    return TranscriptFiller(
+        create_transcript_scraper(),
+        create_video_repository(),
+        workers=get_scraper_config().get("transcript_workers", 2),
+    )
 
 
 def create_sentiment_filler() -> SentimentFiller:
     return SentimentFiller(
         create_sentiment_rater(),
         create_video_repository(),
-        config["overwrite_existing_data"],
+        get_scraper_config()["overwrite_existing_data"],
+    )
+
+
+def create_shard_queue() -> MongoShardQueue:
+    db_config = config["db"]
+    repository = create_video_repository()
+    return MongoShardQueue(
+        repository.collection.database[f"{db_config['collection_name']}_backfill_queue"]
+    )
+
+
+def create_sharded_backfill_runner() -> ShardedBackfillRunner:
+    return ShardedBackfillRunner(
+        get_yt_api_keys(),
+        create_scraping_pipeline,
+        workers=get_scraper_config().get("backfill_workers", 4),
+        machines=get_scraper_config().get("backfill_machines", 1),
+        machine_index=get_scraper_config().get("backfill_machine_index", 0),
     )
@@ -0,0 +1,66 @@
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """
+    Bucket of per_minute units, refilled continuously. Not thread-safe on its own
+    """
+
+    def __init__(self, per_minute: float, now: float):
+        self.capacity = per_minute
+        self.available = per_minute
+        self._rate = per_minute / 60
+        self._updated = now
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self.available = min(self.capacity, self.available + elapsed * self._rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Returns seconds until the amount is available (amounts over the capacity are
+        treated as the whole capacity, as they would never fit otherwise)
+        """
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing / self._rate)
+
+    def take(self, amount: float) -> None:
+        self.available -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter of the requests per minute and tokens per minute sent to the
+    openai api (token-bucket scheduler). acquire blocks the calling thread until both
+    limits allow the request to be sent.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        now = clock()
+        self._requests = TokenBucket(requests_per_minute, now)
+        self._tokens = TokenBucket(tokens_per_minute, now)
+
+    def acquire(self, tokens: int) -> None:
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                wait = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+                if wait == 0:
+                    self._requests.take(1)
+                    self._tokens.take(tokens)
+                    return
+            self._sleep(wait)
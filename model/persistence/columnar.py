@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# dtype kinds that can't hold missing values themselves
+MASKED_KINDS = "iub"
+
+
+def get_path(document: dict | None, path: list[str]):
+    """
+    Returns value at the (split dotted) path of the document, None if any part is missing
+    """
+    for key in path:
+        if document is None:
+            return None
+        document = document.get(key)
+    return document
+
+
+class ColumnBuffers:
+    """
+    Typed NumPy buffers that documents are streamed into batch by batch, so that columnar
+    data (pandas, arrow) can be built without materialising per-row python objects.
+
+    Columns map the column names to dotted document paths. Float dtypes store missing
+    values as NaN, datetime64 as NaT. Integer and bool dtypes keep a mask of the missing
+    values and are returned as pandas nullable (Int64, boolean...) arrays. Columns
+    without specified dtype are stored as python objects.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, columns: dict[str, str], dtypes: dict[str, str] | None = None):
+        dtypes = dtypes or {}
+        self._size = 0
+        self._paths = {name: path.split(".") for name, path in columns.items()}
+        self._buffers = {
+            name: np.empty(self.INITIAL_CAPACITY, dtype=dtypes.get(name, object))
+            for name in columns
+        }
+        self._masks = {
+            name: np.empty(self.INITIAL_CAPACITY, dtype=bool)
+            for name, buffer in self._buffers.items()
+            if buffer.dtype.kind in MASKED_KINDS
+        }
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append_batch(self, documents: list[dict]) -> None:
+        end = self._size + len(documents)
+        if end > self._capacity:
+            self._grow(end)
+
+        for name, buffer in self._buffers.items():
+            values = self._values(documents, self._paths[name])
+            if buffer.dtype.kind == "M":
+                # pandas parses python datetimes in C, numpy does it element by element
+                buffer[self._size : end] = pd.to_datetime(values).to_numpy(buffer.dtype)
+            elif name in self._masks:
+                missing = np.array([value is None for value in values], dtype=bool)
+                self._masks[name][self._size : end] = missing
+                if missing.any():
+                    values = [0 if value is None else value for value in values]
+                buffer[self._size : end] = np.array(values, dtype=buffer.dtype)
+            else:
+                buffer[self._size : end] = np.array(values, dtype=buffer.dtype)
+        self._size = end
+
+    def arrays(self) -> dict[str, np.ndarray | pd.api.extensions.ExtensionArray]:
+        arrays = {}
+        for name, buffer in self._buffers.items():
+            if name in self._masks:
+                mask = self._masks[name][: self._size]
+                array_type = (
+                    pd.arrays.BooleanArray
+                    if buffer.dtype.kind == "b"
+                    else pd.arrays.IntegerArray
+                )
+                arrays[name] = array_type(buffer[: self._size], mask)
+            else:
+                arrays[name] = buffer[: self._size]
+        return arrays
+
+    @staticmethod
+    def _values(documents: list[dict], path: list[str]) -> list:
+        if len(path) == 1:
+            return [document.get(path[0]) for document in documents]
+        return [get_path(document, path) for document in documents]
+
+    @property
+    def _capacity(self) -> int:
+        return len(next(iter(self._buffers.values()), []))
+
+    def _grow(self, min_capacity: int) -> None:
+        capacity = max(min_capacity, 2 * self._capacity)
+        for buffers in (self._buffers, self._masks):
+            for name, buffer in buffers.items():
+                grown = np.empty(capacity, dtype=buffer.dtype)
+                grown[: self._size] = buffer[: self._size]
+                buffers[name] = grown
@@ -1,9 +1,32 @@
 import datetime
-from typing import Protocol
+from typing import Iterator, Protocol
+
+import pandas as pd
+from pydantic import BaseModel
 
 from model.youtube.core import YtVideo
 
 
+class WindowCheckpoint(BaseModel):
+    """
+    Progress of the pipeline on a single (topic, time window) search. Saved once the
+    window is searched, pending_video_ids are the found videos that still need
+    transcripts or sentiment ratings. search_key identifies the search parameters
+    (number of results, filters) the window was searched with
+    """
+
+    topic: str
+    search_key: str = ""
+    window_start: datetime.datetime
+    window_end: datetime.datetime
+    video_ids: list[str] = []
+    pending_video_ids: list[str] = []
+
+    @property
+    def done(self) -> bool:
+        return not self.pending_video_ids
+
+
 class IYtVideoRepository(Protocol):
     def add_or_update(self, video: YtVideo) -> bool:
         ...
@@ -14,9 +37,32 @@ class IYtVideoRepository(Protocol):
     def update_if_exists(self, video: YtVideo) -> bool:
         ...
 
+    def add_many(self, videos: list[YtVideo]) -> list[bool]:
+        """
+        Adds the videos that don't exist yet. Returns per-video outcomes,
+        True if the video was added, False if it already existed
+        """
+        ...
+
+    def upsert_many(self, videos: list[YtVideo]) -> list[bool]:
+        """
+        Adds or updates all the videos. Returns per-video outcomes
+        """
+        ...
+
+    def update_many(self, videos: list[YtVideo]) -> list[bool]:
+        """
+        Updates the videos that exist. Returns per-video outcomes,
+        True if the video was updated, False if it doesn't exist
+        """
+        ...
+
     def get_video(self, video_id: str) -> YtVideo:
         ...
 
+    def get_videos(self, video_ids: list[str]) -> list[YtVideo]:
+        ...
+
     def get_videos_by_date(
         self, date_from: datetime.date, date_to: datetime.date
     ) -> list[YtVideo]:
@@ -29,3 +75,65 @@ class IYtVideoRepository(Protocol):
 
     def get_all_videos(self) -> list[YtVideo]:
         ...
+
+    def iter_videos(
+        self,
+        filter: dict | None = None,
+        projection: dict | None = None,
+        batch_size: int = 100,
+    ) -> Iterator[YtVideo]:
+        """
+        Lazily yields the videos matching the filter, fetching them from the
+        database in batches. Projection must keep the required YtVideo fields
+        """
+        ...
+
+    def iter_rows(
+        self,
+        columns: dict[str, str],
+        filter: dict | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[dict]:
+        """
+        Lazily yields plain dict rows containing only the requested columns.
+        Columns map the row keys to dotted document paths, e.g. {"views": "stats.views"}.
+        Missing values are returned as None
+        """
+        ...
+
+    def to_dataframe(
+        self,
+        columns: dict[str, str],
+        dtypes: dict[str, str] | None = None,
+        filter: dict | None = None,
+        batch_size: int = 10_000,
+    ) -> pd.DataFrame:
+        """
+        Same as iter_rows, but the values are streamed straight into typed numpy
+        column buffers (dtypes maps column names to numpy dtypes) and returned as DataFrame
+        """
+        ...
+
+    def to_arrow(
+        self,
+        columns: dict[str, str],
+        dtypes: dict[str, str] | None = None,
+        filter: dict | None = None,
+        batch_size: int = 10_000,
+    ):
+        """
+        Same as to_dataframe, but returns pyarrow Table. Requires pyarrow to be installed
+        """
+        ...
+
+    def save_checkpoint(self, checkpoint: WindowCheckpoint) -> None:
+        """
+        Adds or replaces the checkpoint of the checkpoint's topic and window
+        """
+        ...
+
+    def get_checkpoints(self, topic: str) -> list[WindowCheckpoint]:
+        """
+        Returns the checkpoints of the topic, ordered by window start
+        """
+        ...
@@ -12,4 +12,6 @@ class YtVideoRepositoryFactory:
         client = pymongo.MongoClient(get_mongo_db_url())
         db = client[db_name]
         collection = db[collection_name]
-        return YtVideoMongoRepository(collection)
+        repository = YtVideoMongoRepository(collection)
+        repository.ensure_indexes()
+        return repository
@@ -1,8 +1,15 @@
-from datetime import datetime
+import datetime
+from itertools import islice
+from typing import Iterator
 
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
 from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
 
-from model.persistence.core import IYtVideoRepository
+from model.persistence.columnar import ColumnBuffers, get_path
+from model.persistence.core import IYtVideoRepository, WindowCheckpoint
 from model.youtube.core import YtVideo
 
 
@@ -10,6 +17,60 @@ class YtVideoMongoRepository(IYtVideoRepository):
     def __init__(self, collection: Collection):
         self.collection = collection
 
+    @property
+    def checkpoints_collection(self) -> Collection:
+        return self.collection.database[f"{self.collection.name}_checkpoints"]
+
+    def ensure_indexes(self) -> None:
+        """
+        Creates the indexes used by repository queries, existing ones are left as is.
+        The unique video_id index can't be built on a collection already holding
+        duplicates, these have to be removed first (see duplicate_video_ids)
+        """
+        try:
+            self.collection.create_index("video_id", unique=True)
+        except DuplicateKeyError as e:
+            raise Exception(
+                "Unique video_id index can't be created, the collection "
+                f"{self.collection.name} holds duplicated videos: "
+                f"{self.duplicate_video_ids()[:10]}. Remove all but one document of "
+                f"each before running again"
+            ) from e
+        self.collection.create_index("date")
+        self.collection.create_index("stats.views")
+        # checkpoints used to be unique per window, whatever the search parameters
+        if "topic_1_window_start_1_window_end_1" in (
+            self.checkpoints_collection.index_information()
+        ):
+            self.checkpoints_collection.drop_index(
+                "topic_1_window_start_1_window_end_1"
+            )
+        self.checkpoints_collection.create_index(
+            [("topic", 1), ("search_key", 1), ("window_start", 1), ("window_end", 1)],
+            unique=True,
+        )
+
+    def duplicate_video_ids(self) -> list[str]:
+        """
+        Returns ids of the videos stored in more than one document
+        """
+        return [
+            group["_id"]
+            for group in self.collection.aggregate(
+                [
+                    {"$group": {"_id": "$video_id", "count": {"$sum": 1}}},
+                    {"$match": {"count": {"$gt": 1}}},
+                ]
+            )
+        ]
+
+    def uses_collection_scan(self, query: dict) -> bool:
+        """
+        Checks whether the server's query plan falls back to a full collection scan
+        """
+        plan = self.collection.find(query).explain()["queryPlanner"]["winningPlan"]
+        return "COLLSCAN" in self._plan_stages(plan)
+
     def add_or_update(self, video: YtVideo) -> bool:
         self.collection.update_one(
             {"video_id": video.video_id}, {"$set": video.model_dump()}, upsert=True
@@ -31,30 +92,210 @@ class YtVideoMongoRepository(IYtVideoRepository):
             return True
         return False
 
+    def add_many(self, videos: list[YtVideo]) -> list[bool]:
+        if not videos:
+            return []
+
+        # $setOnInsert leaves existing documents untouched, so a video is added
+        # only when its upsert actually inserted a new document
+        result = self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"video_id": video.video_id},
+                    {"$setOnInsert": video.model_dump()},
+                    upsert=True,
+                )
+                for video in videos
+            ],
+            ordered=False,
+        )
+        return [i in result.upserted_ids for i in range(len(videos))]
+
+    def upsert_many(self, videos: list[YtVideo]) -> list[bool]:
+        if not videos:
+            return []
+
+        self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"video_id": video.video_id},
+                    {"$set": video.model_dump()},
+                    upsert=True,
+                )
+                for video in videos
+            ],
+            ordered=False,
+        )
+        return [True] * len(videos)
+
+    def update_many(self, videos: list[YtVideo]) -> list[bool]:
+        if not videos:
+            return []
+
+        result = self.collection.bulk_write(
+            [
+                UpdateOne({"video_id": video.video_id}, {"$set": video.model_dump()})
+                for video in videos
+            ],
+            ordered=False,
+        )
+        if result.matched_count == len(videos):
+            return [True] * len(videos)
+
+        # bulk write result doesn't tell which updates matched, ask only when some missed
+        existing = {
+            doc["video_id"]
+            for doc in self.collection.find(
+                {"video_id": {"$in": [video.video_id for video in videos]}},
+                {"video_id": 1},
+            )
+        }
+        return [video.video_id in existing for video in videos]
+
     def get_video(self, video_id: str) -> YtVideo | None:
         result = self.collection.find_one({"video_id": video_id})
         if result:
             return YtVideo(**result)
         return None
 
+    def get_videos(self, video_ids: list[str]) -> list[YtVideo]:
+        return [
+            YtVideo(**video)
+            for video in self.collection.find({"video_id": {"$in": video_ids}})
+        ]
+
     def get_videos_by_date(
         self, date_start: datetime.date, date_end: datetime.date
     ) -> list[YtVideo]:
         return [
             YtVideo(**video)
-            for video in self.collection.find(
-                {"published_at": {"$gte": date_start, "$lte": date_end}}
-            )
+            for video in self.collection.find(self._date_query(date_start, date_end))
         ]
 
     def get_all_videos(self) -> list[YtVideo]:
-        return [YtVideo(**video) for video in self.collection.find()]
+        return list(self.iter_videos())
+
+    def iter_videos(
+        self,
+        filter: dict | None = None,
+        projection: dict | None = None,
+        batch_size: int = 100,
+    ) -> Iterator[YtVideo]:
+        with self.collection.find(
+            filter or {}, projection, batch_size=batch_size
+        ) as cursor:
+            for video in cursor:
+                yield YtVideo(**video)
+
+    def save_checkpoint(self, checkpoint: WindowCheckpoint) -> None:
+        self.checkpoints_collection.replace_one(
+            {
+                "topic": checkpoint.topic,
+                "search_key": checkpoint.search_key,
+                "window_start": checkpoint.window_start,
+                "window_end": checkpoint.window_end,
+            },
+            checkpoint.model_dump(),
+            upsert=True,
+        )
+
+    def get_checkpoints(self, topic: str) -> list[WindowCheckpoint]:
+        return [
+            WindowCheckpoint(**checkpoint)
+            for checkpoint in self.checkpoints_collection.find({"topic": topic}).sort(
+                "window_start"
+            )
+        ]
 
     def get_videos_by_views(
         self, views_min: int, views_max: int = None
     ) -> list[YtVideo]:
+        return [
+            YtVideo(**video)
+            for video in self.collection.find(self._views_query(views_min, views_max))
+        ]
+
+    def iter_rows(
+        self,
+        columns: dict[str, str],
+        filter: dict | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[dict]:
+        # only the requested fields go over the wire
+        projection = {"_id": 0, **{path: 1 for path in columns.values()}}
+        paths = {name: path.split(".") for name, path in columns.items()}
+        with self.collection.find(
+            filter or {}, projection, batch_size=batch_size
+        ) as cursor:
+            for document in cursor:
+                yield {name: get_path(document, path) for name, path in paths.items()}
+
+    def to_dataframe(
+        self,
+        columns: dict[str, str],
+        dtypes: dict[str, str] | None = None,
+        filter: dict | None = None,
+        batch_size: int = 10_000,
+    ) -> pd.DataFrame:
+        arrays = self._read_columns(columns, dtypes, filter, batch_size)
+        return pd.DataFrame(arrays, columns=list(columns), copy=False)
+
+    def to_arrow(
+        self,
+        columns: dict[str, str],
+        dtypes: dict[str, str] | None = None,
+        filter: dict | None = None,
+        batch_size: int = 10_000,
+    ):
+        import pyarrow as pa
+
+        arrays = self._read_columns(columns, dtypes, filter, batch_size)
+        # from_pandas makes NaN and NaT values nulls
+        return pa.table(
+            {name: pa.array(array, from_pandas=True) for name, array in arrays.items()}
+        )
+
+    def _read_columns(
+        self,
+        columns: dict[str, str],
+        dtypes: dict[str, str] | None,
+        filter: dict | None,
+        batch_size: int,
+    ) -> dict[str, np.ndarray]:
+        buffers = ColumnBuffers(columns, dtypes)
+        projection = {"_id": 0, **{path: 1 for path in columns.values()}}
+        with self.collection.find(
+            filter or {}, projection, batch_size=batch_size
+        ) as cursor:
+            while batch := list(islice(cursor, batch_size)):
+                buffers.append_batch(batch)
+        return buffers.arrays()
+
+    @staticmethod
+    def _date_query(date_start: datetime.date, date_end: datetime.date) -> dict:
+        # videos are stored with full publish datetime, so the day bounds are inclusive
+        if not isinstance(date_start, datetime.datetime):
+            date_start = datetime.datetime.combine(date_start, datetime.time.min)
+        if not isinstance(date_end, datetime.datetime):
+            date_end = datetime.datetime.combine(date_end, datetime.time.max)
+        return {"date": {"$gte": date_start, "$lte": date_end}}
+
+    @staticmethod
+    def _views_query(views_min: int, views_max: int = None) -> dict:
         params = {"stats.views": {"$gte": views_min}}
         if views_max:
             params["stats.views"]["$lte"] = views_max
+        return params
 
-        return [YtVideo(**video) for video in self.collection.find(params)]
+    @staticmethod
+    def _plan_stages(plan: dict | list) -> set[str]:
+        stages = set()
+        if isinstance(plan, dict):
+            if "stage" in plan:
+                stages.add(plan["stage"])
+            for value in plan.values():
+                stages |= YtVideoMongoRepository._plan_stages(value)
+        elif isinstance(plan, list):
+            for value in plan:
+                stages |= YtVideoMongoRepository._plan_stages(value)
+        return stages
@@ -2,10 +2,11 @@ import datetime
 import logging
 
 from model.persistence.core import IYtVideoRepository
+from model.pipeline.checkpoint import WindowCheckpoints, search_key
 from model.pipeline.core import IYtVidScrapingPipeline
 from model.sentiment_analysis.core import ISentimentRater
-from model.youtube.core import (IYtTopVideoFinder, YoutubeVideoSentimentRating,
-                                YtVideo)
+from model.youtube.core import IYtTopVideoFinder, YtVideo
+from model.youtube.sentiment_filler import rate_videos_sentiment
 from model.youtube.yt_top_vid_finder import YtTopVideoFinder
 from model.youtube.yt_transcript_scraper import IYtTranscriptScraper
 
@@ -45,6 +46,20 @@ class YtVidScrapingBatchPipeline(IYtVidScrapingPipeline):
         stats_lower_limit: int | None = None,
         length_minutes_lower_limit: int = 5,
     ) -> None:
+        checkpoints = WindowCheckpoints(
+            self.repository,
+            topic,
+            date_start,
+            date_end,
+            time_delta,
+            search_key(
+                max_results_per_time_delta,
+                language,
+                stats_lower_limit,
+                length_minutes_lower_limit,
+            ),
+            overwrite=self.overwrite_existing_data,
+        )
         videos_list_generator = self.yt_finder.scrape_top_videos_with_stats(
             topic=topic,
             date_start=date_start,
@@ -54,91 +69,73 @@ class YtVidScrapingBatchPipeline(IYtVidScrapingPipeline):
             language=language,
             min_views=stats_lower_limit,
             min_video_length=length_minutes_lower_limit,
+            skip_windows=checkpoints.searched_windows(),
         )
 
-        for video_batch in videos_list_generator:
-            self._process_video_batch(video_batch)
+        # finish the videos left over by the previous, interrupted run first
+        pending_videos = checkpoints.pending_videos()
+        if pending_videos:
+            self._process_video_batch(pending_videos)
+            checkpoints.videos_processed(v.video_id for v in pending_videos)
 
-    # todo: refactor this to use batch operations
+        for window, video_batch in zip(
+            checkpoints.remaining_windows(), videos_list_generator
+        ):
+            vids = self._add_videos_to_database(video_batch)
+            checkpoints.window_searched(window, vids)
+            self._process_video_batch(vids)
+            checkpoints.videos_processed(v.video_id for v in vids)
 
     def _process_video_batch(self, videos: list[YtVideo]):
-        vids = self._add_videos_to_database(videos)
-        self.scrape_transcripts(vids)
-        self.rate_sentiments(vids)
+        self.scrape_transcripts(videos)
+        self.rate_sentiments(videos)
 
     def _add_videos_to_database(self, videos: list[YtVideo]):
-        vids = []
         if self.overwrite_existing_data:
-            for video in videos:
-                self.repository.add_or_update(video)
-            vids = videos
-        else:
-            for video in videos:
-                v = self.repository.get_video(video.video_id)
-                if v:
-                    vids.append(v)
-                else:
-                    self._save_video(video)
-                    vids.append(video)
-        return vids
+            self.repository.upsert_many(videos)
+            return videos
+
+        existing = {
+            video.video_id: video
+            for video in self.repository.get_videos([v.video_id for v in videos])
+        }
+        self._save_videos([v for v in videos if v.video_id not in existing])
+        return [existing.get(video.video_id, video) for video in videos]
 
     def _update_videos_in_database(self, videos: list[YtVideo]):
-        for video in videos:
-            self._update_video(video)
+        updated = self.repository.update_many(videos)
 
-    def scrape_transcripts(self, videos: list[YtVideo]):
-        for video in videos:
-            transcript = video.transcript
-            if transcript is None:
-                transcript = self.transcript_scraper.scrape_transcript(video.video_id)
+        for video, video_updated in zip(videos, updated):
+            if not video_updated:
+                logging.log(
+                    logging.ERROR,
+                    f"Video {video.video_id} doesn't exist in the database.",
+                )
 
-            video.transcript = transcript
+    def scrape_transcripts(self, videos: list[YtVideo]):
+        missing = {
+            video.video_id: video for video in videos if video.transcript is None
+        }
+        for video_id, transcript in self.transcript_scraper.scrape_transcripts(missing):
+            missing[video_id].transcript = transcript
         self._update_videos_in_database(videos)
 
     def rate_sentiments(self, videos: list[YtVideo]):
         for video in videos:
-            transcript = video.transcript
-
-            # todo: check if the videos have ratings already
-
-            title_sentiment_rating = None
-            transcript_sentiment_rating = None
-
-            if video.stats.sentiment_rating is not None:
-                title_sentiment_rating = video.stats.sentiment_rating.score_title
-                transcript_sentiment_rating = (
-                    video.stats.sentiment_rating.score_transcript
-                )
-
-            if title_sentiment_rating is None:
-                title_sentiment_rating = self.sentiment_rater.rate(video.title).score
-            if transcript and transcript_sentiment_rating is None:
-                transcript_sentiment_rating = self.sentiment_rater.rate(
-                    transcript
-                ).score
-            elif not transcript:
+            if not video.transcript:
                 logging.log(logging.ERROR, f"Video {video.video_id} has no transcript.")
 
-            sentiment_rating = YoutubeVideoSentimentRating(
-                model=self.sentiment_rater.model_name,
-                score_title=title_sentiment_rating,
-                score_transcript=transcript_sentiment_rating,
-            )
-            video.stats.sentiment_rating = sentiment_rating
+        rate_videos_sentiment(
+            self.sentiment_rater, videos, overwrite_existing_data=False
+        )
         self._update_videos_in_database(videos)
 
-    def _save_video(self, video: YtVideo):
-        added = self.repository.add_if_doesnt_exist(video)
-
-        if not added:
-            logging.log(
-                logging.ERROR, f"Video {video.video_id} already exists in the database."
-            )
+    def _save_videos(self, videos: list[YtVideo]):
+        added = self.repository.add_many(videos)
 
-    def _update_video(self, video: YtVideo):
-        updated = self.repository.update_if_exists(video)
-
-        if not updated:
-            logging.log(
-                logging.ERROR, f"Video {video.video_id} doesn't exist in the database."
-            )
+        for video, video_added in zip(videos, added):
+            if not video_added:
+                logging.log(
+                    logging.ERROR,
+                    f"Video {video.video_id} already exists in the database.",
+                )
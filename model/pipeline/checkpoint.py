@@ -0,0 +1,157 @@
+import datetime
+import json
+import threading
+from typing import Iterable
+
+from model.persistence.core import IYtVideoRepository, WindowCheckpoint
+from model.youtube.core import YtVideo, iter_time_windows
+
+Window = tuple[datetime.date, datetime.date]
+
+
+def search_key(
+    max_results: int,
+    language: str | None,
+    min_views: int | None,
+    min_video_length: int | None,
+) -> str:
+    """
+    Returns the key of the search parameters the checkpoints are saved with, so that
+    windows searched with other parameters are searched again
+    """
+    return json.dumps(
+        {
+            "max_results": max_results,
+            "language": language,
+            "min_views": min_views,
+            "min_video_length": min_video_length,
+        },
+        sort_keys=True,
+    )
+
+
+class WindowCheckpoints:
+    """
+    Tracks the progress of a pipeline run over the time windows of the topic, using
+    the checkpoints saved in the repository, so that a restarted run:
+    1. finishes the videos of the windows that were searched, but not fully processed
+    2. searches only the windows that weren't searched yet
+
+    The windows are the same as the ones searched by the top video finders.
+    Only the checkpoints saved with the same search_key count. With overwrite, the saved
+    checkpoints are ignored, so all the windows are searched and processed again.
+    Can be updated from multiple threads.
+    """
+
+    def __init__(
+        self,
+        repository: IYtVideoRepository,
+        topic: str,
+        date_start: datetime.date,
+        date_end: datetime.date,
+        time_delta: int,
+        search_key: str = "",
+        overwrite: bool = False,
+    ):
+        self.repository = repository
+        self.topic = topic
+        self.search_key = search_key
+        self._windows = list(iter_time_windows(date_start, date_end, time_delta))
+        self._lock = threading.Lock()
+
+        saved = {
+            self._window(checkpoint): checkpoint
+            for checkpoint in repository.get_checkpoints(topic)
+            if checkpoint.search_key == search_key and not overwrite
+        }
+        self._checkpoints: dict[Window, WindowCheckpoint] = {
+            window: saved[window] for window in self._windows if window in saved
+        }
+        self._video_windows: dict[str, list[Window]] = {}
+        for window, checkpoint in self._checkpoints.items():
+            self._track(window, checkpoint.pending_video_ids)
+
+    def searched_windows(self) -> set[Window]:
+        return set(self._checkpoints)
+
+    def remaining_windows(self) -> list[Window]:
+        """
+        Returns the windows that weren't searched yet, in the order they are searched
+        """
+        return [window for window in self._windows if window not in self._checkpoints]
+
+    def pending_videos(self) -> list[YtVideo]:
+        """
+        Returns the videos of the searched windows that weren't fully processed
+        """
+        video_ids = list(
+            dict.fromkeys(
+                video_id
+                for checkpoint in self._checkpoints.values()
+                for video_id in checkpoint.pending_video_ids
+            )
+        )
+        videos = {
+            video.video_id: video for video in self.repository.get_videos(video_ids)
+        }
+
+        # videos missing from the database can't be processed
+        missing = [video_id for video_id in video_ids if video_id not in videos]
+        if missing:
+            self.videos_processed(missing)
+
+        return [videos[video_id] for video_id in video_ids if video_id in videos]
+
+    def window_searched(self, window: Window, videos: list[YtVideo]) -> None:
+        """
+        Saves the checkpoint of the window, with all the videos pending
+        """
+        self._save_window(window, videos, pending=True)
+
+    def window_done(self, window: Window, videos: list[YtVideo]) -> None:
+        """
+        Saves the checkpoint of the window, with all the videos processed
+        """
+        self._save_window(window, videos, pending=False)
+
+    def videos_processed(self, video_ids: Iterable[str]) -> None:
+        with self._lock:
+            changed = {}
+            for video_id in video_ids:
+                for window in self._video_windows.pop(video_id, []):
+                    checkpoint = self._checkpoints[window]
+                    checkpoint.pending_video_ids.remove(video_id)
+                    changed[window] = checkpoint
+
+            for checkpoint in changed.values():
+                self.repository.save_checkpoint(checkpoint)
+
+    def _save_window(self, window: Window, videos: list[YtVideo], pending: bool):
+        video_ids = [video.video_id for video in videos]
+        checkpoint = WindowCheckpoint(
+            topic=self.topic,
+            search_key=self.search_key,
+            window_start=self._datetime(window[0]),
+            window_end=self._datetime(window[1]),
+            video_ids=video_ids,
+            pending_video_ids=list(video_ids) if pending else [],
+        )
+
+        with self._lock:
+            self._checkpoints[window] = checkpoint
+            if pending:
+                self._track(window, video_ids)
+            self.repository.save_checkpoint(checkpoint)
+
+    def _track(self, window: Window, video_ids: list[str]) -> None:
+        for video_id in video_ids:
+            self._video_windows.setdefault(video_id, []).append(window)
+
+    @staticmethod
+    def _window(checkpoint: WindowCheckpoint) -> Window:
+        return checkpoint.window_start.date(), checkpoint.window_end.date()
+
+    @staticmethod
+    def _datetime(date: datetime.date) -> datetime.datetime:
+        # mongo stores datetimes only
+        return datetime.datetime.combine(date, datetime.time.min)
@@ -0,0 +1,292 @@
+import datetime
+import logging
+import queue
+import threading
+from typing import Callable
+
+from model.persistence.core import IYtVideoRepository
+from model.pipeline.checkpoint import WindowCheckpoints, search_key
+from model.pipeline.core import IYtVidScrapingPipeline
+from model.sentiment_analysis.core import ISentimentRater
+from model.youtube.core import IYtTopVideoFinder, IYtTranscriptScraper, YtVideo
+from model.youtube.sentiment_filler import rate_videos_sentiment
+
+
+class YtVidScrapingConcurrentPipeline(IYtVidScrapingPipeline):
+    """
+    This class is responsible for conducting video search on particular topic,
+    scraping the video's stats, transcript, and rating the video's sentiment.
+    Then it saves the data to the database using repository.
+
+    The processing is done in a concurrent manner, every pipeline step runs in its
+    own pool of worker threads and the steps are connected with bounded queues:
+    1. Find the videos and their stats, add them to the database (caller's thread)
+    2. Scrape the transcripts (transcript_workers threads)
+    3. Rate the sentiment of up to sentiment_batch_size videos at once
+       (sentiment_workers threads)
+    4. Update the videos in the database in batches (single thread)
+
+    Progress is checkpointed per time window, so an interrupted run can be resumed.
+    Videos found again by an overlapping window are processed once per run.
+
+    The transcript workers share the transcript scraper, so it has to be thread-safe
+    (the whisper extractor transcribes one video at a time, the pool of whisper
+    workers transcribes in parallel).
+
+    So e.g. transcript of the next video is scraped whilst the previous one is being
+    rated. When a step falls behind, the queue in front of it fills up and blocks
+    the previous step, so the memory usage stays bounded.
+    """
+
+    _DONE = object()
+
+    def __init__(
+        self,
+        repository: IYtVideoRepository,
+        yt_finder: IYtTopVideoFinder,
+        transcript_scraper: IYtTranscriptScraper,
+        sentiment_rater: ISentimentRater,
+        overwrite_existing_data: bool,
+        transcript_workers: int = 2,
+        sentiment_workers: int = 1,
+        queue_size: int = 10,
+        persistence_batch_size: int = 20,
+        sentiment_batch_size: int = 8,
+    ):
+        self.repository = repository
+        self.yt_finder = yt_finder
+        self.transcript_scraper = transcript_scraper
+        self.sentiment_rater = sentiment_rater
+        self.overwrite_existing_data = overwrite_existing_data
+        self.transcript_workers = transcript_workers
+        self.sentiment_workers = sentiment_workers
+        self.queue_size = queue_size
+        self.persistence_batch_size = persistence_batch_size
+        self.sentiment_batch_size = sentiment_batch_size
+
+    def process(
+        self,
+        topic: str,
+        date_start: datetime.date,
+        date_end: datetime.date,
+        time_delta: int,
+        max_results_per_time_delta: int = 10,
+        language: str = "en",
+        stats_lower_limit: int | None = None,
+        length_minutes_lower_limit: int = 5,
+    ) -> None:
+        checkpoints = WindowCheckpoints(
+            self.repository,
+            topic,
+            date_start,
+            date_end,
+            time_delta,
+            search_key(
+                max_results_per_time_delta,
+                language,
+                stats_lower_limit,
+                length_minutes_lower_limit,
+            ),
+            overwrite=self.overwrite_existing_data,
+        )
+        videos_list_generator = self.yt_finder.scrape_top_videos_with_stats(
+            topic=topic,
+            date_start=date_start,
+            date_end=date_end,
+            time_delta=time_delta,
+            max_results_per_time_delta=max_results_per_time_delta,
+            language=language,
+            min_views=stats_lower_limit,
+            min_video_length=length_minutes_lower_limit,
+            skip_windows=checkpoints.searched_windows(),
+        )
+
+        transcript_queue = queue.Queue(self.queue_size)
+        sentiment_queue = queue.Queue(self.queue_size)
+        persistence_queue = queue.Queue(self.queue_size)
+
+        stages = [
+            (
+                self._start_workers(
+                    self._scrape_transcripts,
+                    transcript_queue,
+                    sentiment_queue,
+                    self.transcript_workers,
+                ),
+                transcript_queue,
+            ),
+            (
+                self._start_workers(
+                    self._rate_sentiments,
+                    sentiment_queue,
+                    persistence_queue,
+                    self.sentiment_workers,
+                    self.sentiment_batch_size,
+                ),
+                sentiment_queue,
+            ),
+            (
+                self._start_persistence_worker(persistence_queue, checkpoints),
+                persistence_queue,
+            ),
+        ]
+
+        try:
+            # ids of the videos queued by this run
+            queued = set()
+            # finish the videos left over by the previous, interrupted run first
+            for video in checkpoints.pending_videos():
+                queued.add(video.video_id)
+                transcript_queue.put(video)
+
+            for window, video_batch in zip(
+                checkpoints.remaining_windows(), videos_list_generator
+            ):
+                video_batch = self._skip_queued(video_batch, queued)
+                video_batch = self._add_videos_to_database(video_batch)
+                checkpoints.window_searched(window, video_batch)
+                for video in video_batch:
+                    transcript_queue.put(video)
+        finally:
+            # stages are shut down in order, so every video put in the queues gets processed
+            for workers, inbox in stages:
+                for _ in workers:
+                    inbox.put(self._DONE)
+                for worker in workers:
+                    worker.join()
+
+    def _start_workers(
+        self,
+        work: Callable[[list[YtVideo]], list[YtVideo]],
+        inbox: queue.Queue,
+        outbox: queue.Queue,
+        workers: int,
+        batch_size: int = 1,
+    ) -> list[threading.Thread]:
+        def run():
+            done = False
+            while not done:
+                batch, done = self._take_batch(inbox, batch_size)
+                try:
+                    for video in work(batch):
+                        outbox.put(video)
+                except Exception as e:
+                    for video in batch:
+                        logging.log(
+                            logging.ERROR,
+                            f"Video {video.video_id} processing failed: {e}",
+                        )
+
+        threads = [threading.Thread(target=run, daemon=True) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _start_persistence_worker(
+        self, inbox: queue.Queue, checkpoints: WindowCheckpoints
+    ) -> list[threading.Thread]:
+        def run():
+            done = False
+            while not done:
+                batch, done = self._take_batch(inbox, self.persistence_batch_size)
+                if not batch:
+                    continue
+                updated = self._update_videos_in_database(batch)
+                # the worker has to keep draining the queue, or the upstream stages
+                # block on the full queues
+                try:
+                    checkpoints.videos_processed(updated)
+                except Exception as e:
+                    logging.log(logging.ERROR, f"Saving the checkpoints failed: {e}")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return [thread]
+
+    def _take_batch(self, inbox: queue.Queue, batch_size: int) -> tuple[list, bool]:
+        """
+        Waits for the next item, then collects whatever else is already waiting, up to
+        batch_size items. Returns the batch and whether the inbox was shut down
+        """
+        batch = []
+        item = inbox.get()
+        while item is not self._DONE:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                break
+            try:
+                item = inbox.get_nowait()
+            except queue.Empty:
+                break
+        return batch, item is self._DONE
+
+    @staticmethod
+    def _skip_queued(videos: list[YtVideo], queued: set[str]) -> list[YtVideo]:
+        """
+        Returns the videos that weren't queued yet and adds them to the queued ones
+        """
+        new_videos = []
+        for video in videos:
+            if video.video_id not in queued:
+                queued.add(video.video_id)
+                new_videos.append(video)
+        return new_videos
+
+    def _add_videos_to_database(self, videos: list[YtVideo]) -> list[YtVideo]:
+        if self.overwrite_existing_data:
+            self.repository.upsert_many(videos)
+            return videos
+
+        existing = {
+            video.video_id: video
+            for video in self.repository.get_videos([v.video_id for v in videos])
+        }
+        new_videos = [v for v in videos if v.video_id not in existing]
+        for video, video_added in zip(new_videos, self.repository.add_many(new_videos)):
+            if not video_added:
+                logging.log(
+                    logging.ERROR,
+                    f"Video {video.video_id} already exists in the database.",
+                )
+        return [existing.get(video.video_id, video) for video in videos]
+
+    def _update_videos_in_database(self, videos: list[YtVideo]) -> list[str]:
+        """
+        Returns ids of the updated videos
+        """
+        try:
+            updated = self.repository.update_many(videos)
+        except Exception as e:
+            logging.log(logging.ERROR, f"Updating videos in the database failed: {e}")
+            return []
+
+        for video, video_updated in zip(videos, updated):
+            if not video_updated:
+                logging.log(
+                    logging.ERROR,
+                    f"Video {video.video_id} doesn't exist in the database.",
+                )
+            else:
+                logging.log(
+                    logging.INFO,
+                    f"Video {video.video_id} was processed and saved to the database.",
+                )
+        return [
+            video.video_id
+            for video, video_updated in zip(videos, updated)
+            if video_updated
+        ]
+
+    def _scrape_transcripts(self, videos: list[YtVideo]) -> list[YtVideo]:
+        for video in videos:
+            if video.transcript is None or self.overwrite_existing_data:
+                video.transcript = self.transcript_scraper.scrape_transcript(
+                    video.video_id
+                )
+        return videos
+
+    def _rate_sentiments(self, videos: list[YtVideo]) -> list[YtVideo]:
+        rate_videos_sentiment(
+            self.sentiment_rater, videos, self.overwrite_existing_data
+        )
+        return videos
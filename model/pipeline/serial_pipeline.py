@@ -2,10 +2,11 @@ import datetime
 import logging
 
 from model.persistence.core import IYtVideoRepository
+from model.pipeline.checkpoint import WindowCheckpoints, search_key
 from model.pipeline.core import IYtVidScrapingPipeline
 from model.sentiment_analysis.core import ISentimentRater
-from model.youtube.core import (IYtTopVideoFinder, YoutubeVideoSentimentRating,
-                                YtVideo)
+from model.youtube.core import IYtTopVideoFinder, YtVideo
+from model.youtube.sentiment_filler import rate_videos_sentiment
 from model.youtube.yt_top_vid_finder import YtTopVideoFinder
 from model.youtube.yt_transcript_scraper import IYtTranscriptScraper
 
@@ -43,6 +44,19 @@ class YtVidScrapingSerialPipeline(IYtVidScrapingPipeline):
         stats_lower_limit: int | None = None,
         length_minutes_lower_limit: int = 5,
     ) -> None:
+        checkpoints = WindowCheckpoints(
+            self.repository,
+            topic,
+            date_start,
+            date_end,
+            time_delta,
+            search_key(
+                max_results_per_time_delta,
+                language,
+                stats_lower_limit,
+                length_minutes_lower_limit,
+            ),
+        )
         videos_list_generator = self.yt_finder.scrape_top_videos_with_stats(
             topic=topic,
             date_start=date_start,
@@ -52,29 +66,25 @@ class YtVidScrapingSerialPipeline(IYtVidScrapingPipeline):
             language=language,
             min_views=stats_lower_limit,
             min_video_length=length_minutes_lower_limit,
+            skip_windows=checkpoints.searched_windows(),
         )
 
-        for videos_list in videos_list_generator:
+        # videos are saved only once processed, so the window is checkpointed as a whole
+        for window, videos_list in zip(
+            checkpoints.remaining_windows(), videos_list_generator
+        ):
             for video in videos_list:
                 self._process_video(video)
+            checkpoints.window_done(window, videos_list)
 
     def _process_video(self, video: YtVideo):
         transcript = self.transcript_scraper.scrape_transcript(video.video_id)
         video.transcript = transcript
 
-        title_sentiment_rating = self.sentiment_rater.rate(video.title).score
-        transcript_sentiment_rating = (
-            self.sentiment_rater.rate(transcript).score if video.transcript else None
-        )
-
-        sentiment_rating = YoutubeVideoSentimentRating(
-            model=self.sentiment_rater.model_name,
-            score_title=title_sentiment_rating,
-            score_transcript=transcript_sentiment_rating,
+        rate_videos_sentiment(
+            self.sentiment_rater, [video], overwrite_existing_data=True
         )
 
-        video.stats.sentiment_rating = sentiment_rating
-
         self._save_video(video)
         logging.log(
             logging.INFO,
@@ -0,0 +1,348 @@
+import datetime
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from typing import Callable
+
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+
+from model.pipeline.core import IYtVidScrapingPipeline
+from model.youtube.core import iter_time_windows
+
+# creates the pipeline of a worker, using only the given api keys
+PipelineFactory = Callable[[list[str]], IYtVidScrapingPipeline]
+
+
+@dataclass
+class BackfillShard:
+    """
+    Contiguous range of the time windows of a backfill, processed by a single worker
+    """
+
+    topic: str
+    date_start: datetime.date
+    date_end: datetime.date
+    time_delta: int
+    process_kwargs: dict = field(default_factory=dict)
+
+    def process(self, pipeline: IYtVidScrapingPipeline) -> None:
+        pipeline.process(
+            topic=self.topic,
+            date_start=self.date_start,
+            date_end=self.date_end,
+            time_delta=self.time_delta,
+            **self.process_kwargs,
+        )
+
+
+def split_into_shards(
+    topic: str,
+    date_start: datetime.date,
+    date_end: datetime.date,
+    time_delta: int,
+    shards: int,
+    **process_kwargs,
+) -> list[BackfillShard]:
+    """
+    Splits the time windows of the date range into up to shards contiguous ranges of
+    (nearly) the same number of windows. A shard ends the day before the next one
+    starts, as the day a window ends on is searched by the next window anyway
+    """
+    starts = [start for start, _ in iter_time_windows(date_start, date_end, time_delta)]
+    shards = max(1, min(shards, len(starts)))
+    size, remainder = divmod(len(starts), shards)
+
+    first_windows = []
+    first = 0
+    for i in range(shards):
+        first_windows.append(first)
+        first += size + (1 if i < remainder else 0)
+
+    return [
+        BackfillShard(
+            topic=topic,
+            date_start=starts[first],
+            date_end=(
+                starts[first_windows[i + 1]] - datetime.timedelta(days=1)
+                if i + 1 < shards
+                else date_end
+            ),
+            time_delta=time_delta,
+            process_kwargs=process_kwargs,
+        )
+        for i, first in enumerate(first_windows)
+    ]
+
+
+class MongoShardQueue:
+    """
+    Work queue of backfill shards kept in mongo collection, so that the workers of
+    multiple machines can share a backfill. Workers claim the shards atomically, a claim
+    expires after lease_seconds, so shards of crashed workers get picked up again.
+    Workers renew the claims of the shards they are processing (see renew), so a long
+    shard isn't handed out twice.
+    """
+
+    def __init__(self, collection: Collection, lease_seconds: int = 6 * 60 * 60):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+
+    def enqueue(self, shards: list[BackfillShard]) -> None:
+        """
+        Adds the shards that aren't queued yet, so every machine can call it
+        """
+        for shard in shards:
+            document = self._to_document(shard)
+            self.collection.update_one(
+                {"_id": document["_id"]},
+                {"$setOnInsert": {**document, "status": "pending"}},
+                upsert=True,
+            )
+
+    def claim(self, worker_id: str) -> BackfillShard | None:
+        now = datetime.datetime.utcnow()
+        expired = now - datetime.timedelta(seconds=self.lease_seconds)
+        document = self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "pending"},
+                    {"status": "claimed", "claimed_at": {"$lt": expired}},
+                ]
+            },
+            {"$set": {"status": "claimed", "worker": worker_id, "claimed_at": now}},
+            sort=[("date_start", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        return self._from_document(document) if document else None
+
+    def renew(self, shard: BackfillShard, worker_id: str) -> bool:
+        """
+        Extends the claim of the worker's shard by another lease_seconds. Returns False
+        if the shard isn't claimed by the worker anymore (its claim has expired and
+        another worker took it)
+        """
+        result = self.collection.update_one(
+            {
+                "_id": self._to_document(shard)["_id"],
+                "status": "claimed",
+                "worker": worker_id,
+            },
+            {"$set": {"claimed_at": datetime.datetime.utcnow()}},
+        )
+        return result.matched_count == 1
+
+    def complete(self, shard: BackfillShard) -> None:
+        self._set_status(shard, "done")
+
+    def release(self, shard: BackfillShard) -> None:
+        self._set_status(shard, "pending")
+
+    def _set_status(self, shard: BackfillShard, status: str) -> None:
+        self.collection.update_one(
+            {"_id": self._to_document(shard)["_id"]}, {"$set": {"status": status}}
+        )
+
+    @staticmethod
+    def _to_document(shard: BackfillShard) -> dict:
+        document = asdict(shard)
+        # mongo stores datetimes only
+        for name in ("date_start", "date_end"):
+            document[name] = datetime.datetime.combine(document[name], datetime.time())
+        shard_id = f"{shard.topic}:{shard.date_start}:{shard.date_end}"
+        document["_id"] = f"{shard_id}:{shard.time_delta}"
+        return document
+
+    @staticmethod
+    def _from_document(document: dict) -> BackfillShard:
+        return BackfillShard(
+            topic=document["topic"],
+            date_start=document["date_start"].date(),
+            date_end=document["date_end"].date(),
+            time_delta=document["time_delta"],
+            process_kwargs=document["process_kwargs"],
+        )
+
+
+def _run_shard(
+    pipeline_factory: PipelineFactory, api_keys: list[str], shard: BackfillShard
+) -> None:
+    logging.log(
+        logging.INFO,
+        f"Backfilling {shard.topic} : {shard.date_start} - {shard.date_end}",
+    )
+    shard.process(pipeline_factory(api_keys))
+
+
+def _renew_lease(
+    queue: MongoShardQueue,
+    shard: BackfillShard,
+    worker_id: str,
+    stopped: threading.Event,
+) -> None:
+    # renewed a few times per lease, so a slow renewal doesn't let the claim expire
+    while not stopped.wait(queue.lease_seconds / 3):
+        if not queue.renew(shard, worker_id):
+            logging.log(
+                logging.WARNING,
+                f"Lease of {shard.topic} : {shard.date_start} - {shard.date_end} "
+                f"was lost by {worker_id}",
+            )
+            return
+
+
+def _run_queue_worker(
+    pipeline_factory: PipelineFactory,
+    api_keys: list[str],
+    queue_factory: Callable[[], MongoShardQueue],
+    worker_id: str,
+) -> int:
+    queue = queue_factory()
+    pipeline = pipeline_factory(api_keys)
+    processed = 0
+
+    while (shard := queue.claim(worker_id)) is not None:
+        stopped = threading.Event()
+        heartbeat = threading.Thread(
+            target=_renew_lease, args=(queue, shard, worker_id, stopped), daemon=True
+        )
+        heartbeat.start()
+        try:
+            shard.process(pipeline)
+        except Exception:
+            queue.release(shard)
+            raise
+        finally:
+            stopped.set()
+            heartbeat.join()
+        queue.complete(shard)
+        processed += 1
+
+    return processed
+
+
+class ShardedBackfillRunner:
+    """
+    Runs a backfill in parallel worker processes. The time windows of the date range
+    are split into contiguous shards, and every worker gets its own subset of the api
+    keys (so the number of workers is capped by the number of keys). Workers build
+    their own pipelines with pipeline_factory, which has to be picklable (e.g. module
+    level function), and checkpoint the progress of their shards independently.
+
+    run processes the shards of a single machine, run_from_queue shares them with
+    other machines through MongoShardQueue. Machines sharing the api keys split them
+    as well: each of the machines runs with its own machine_index (0 to machines - 1)
+    and the same number of workers, so every worker of the backfill gets its own keys.
+    """
+
+    def __init__(
+        self,
+        api_keys: list[str],
+        pipeline_factory: PipelineFactory,
+        workers: int = 4,
+        machines: int = 1,
+        machine_index: int = 0,
+    ):
+        if not 0 <= machine_index < machines:
+            raise Exception(f"Invalid machine index {machine_index} of {machines}")
+        keys_per_machine = len(api_keys) // machines
+        if workers > keys_per_machine:
+            logging.log(
+                logging.WARNING,
+                f"Only {keys_per_machine} api keys per machine for {workers} workers, "
+                f"running {max(1, keys_per_machine)} workers",
+            )
+        self.workers = max(1, min(workers, keys_per_machine))
+        self.machines = machines
+        self.machine_index = machine_index
+        self.api_keys = api_keys
+        self.pipeline_factory = pipeline_factory
+
+    def run(
+        self,
+        topic: str,
+        date_start: datetime.date,
+        date_end: datetime.date,
+        time_delta: int,
+        **process_kwargs,
+    ) -> None:
+        shards = split_into_shards(
+            topic, date_start, date_end, time_delta, self.workers, **process_kwargs
+        )
+
+        with self._executor() as executor:
+            futures = {
+                executor.submit(
+                    _run_shard, self.pipeline_factory, self._worker_keys(i), shard
+                ): shard
+                for i, shard in enumerate(shards)
+            }
+            self._wait(futures)
+
+    def run_from_queue(
+        self,
+        queue_factory: Callable[[], MongoShardQueue],
+        topic: str,
+        date_start: datetime.date,
+        date_end: datetime.date,
+        time_delta: int,
+        shards: int = 100,
+        **process_kwargs,
+    ) -> None:
+        """
+        Queues the backfill split into shards (if it's not queued yet), then processes
+        the queued shards until there are none left
+        """
+        queue_factory().enqueue(
+            split_into_shards(
+                topic, date_start, date_end, time_delta, shards, **process_kwargs
+            )
+        )
+
+        with self._executor() as executor:
+            futures = {
+                executor.submit(
+                    _run_queue_worker,
+                    self.pipeline_factory,
+                    self._worker_keys(i),
+                    queue_factory,
+                    f"{socket.gethostname()}-{os.getpid()}-{i}",
+                ): f"worker {i}"
+                for i in range(self.workers)
+            }
+            self._wait(futures)
+
+    def _worker_keys(self, worker: int) -> list[str]:
+        # index of the worker among the workers of all the machines
+        total_workers = self.workers * self.machines
+        keys = self.api_keys[
+            self.machine_index * self.workers + worker :: total_workers
+        ]
+        if not keys:
+            raise Exception(
+                f"No api keys left for worker {worker} of machine {self.machine_index}"
+            )
+        return keys
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # spawned workers don't inherit the parent's threads and mongo connections
+        return ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    @staticmethod
+    def _wait(futures: dict) -> None:
+        failed = []
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logging.log(logging.ERROR, f"Backfill of {futures[future]} failed: {e}")
+                failed.append(futures[future])
+
+        if failed:
+            raise Exception(f"Backfill failed for: {failed}")
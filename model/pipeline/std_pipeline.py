@@ -2,10 +2,12 @@ import datetime
 import logging
 
 from model.persistence.core import IYtVideoRepository
+from model.pipeline.checkpoint import WindowCheckpoints, search_key
 from model.pipeline.core import IYtVidScrapingPipeline
 from model.sentiment_analysis.core import ISentimentRater
-from model.youtube.core import (IYtTopVideoFinder, YoutubeVideoSentimentRating,
-                                YtVideo)
+from model.youtube.core import IYtTopVideoFinder, YtVideo
+from model.youtube.sentiment_filler import (SENTIMENT_BATCH_SIZE,
+                                            rate_videos_sentiment)
 from model.youtube.yt_top_vid_finder import YtTopVideoFinder
 from model.youtube.yt_transcript_scraper import IYtTranscriptScraper
 
@@ -47,6 +49,20 @@ class YtVidScrapingStdPipeline(IYtVidScrapingPipeline):
         stats_lower_limit: int | None = None,
         length_minutes_lower_limit: int = 5,
     ) -> None:
+        checkpoints = WindowCheckpoints(
+            self.repository,
+            topic,
+            date_start,
+            date_end,
+            time_delta,
+            search_key(
+                max_results_per_time_delta,
+                language,
+                stats_lower_limit,
+                length_minutes_lower_limit,
+            ),
+            overwrite=self.overwrite_existing_data,
+        )
         videos_list_generator = self.yt_finder.scrape_top_videos_with_stats(
             topic=topic,
             date_start=date_start,
@@ -56,81 +72,76 @@ class YtVidScrapingStdPipeline(IYtVidScrapingPipeline):
             language=language,
             min_views=stats_lower_limit,
             min_video_length=length_minutes_lower_limit,
+            skip_windows=checkpoints.searched_windows(),
         )
 
-        processed = []
+        # videos left over by the previous, interrupted run are processed as well
+        processed = checkpoints.pending_videos()
 
-        for video_batch in videos_list_generator:
-            processed.extend(self._add_videos_to_database(video_batch))
+        for window, video_batch in zip(
+            checkpoints.remaining_windows(), videos_list_generator
+        ):
+            video_batch = self._add_videos_to_database(video_batch)
+            checkpoints.window_searched(window, video_batch)
+            processed.extend(video_batch)
 
         processed = self._add_videos_to_database(processed)
 
-        transcript_scraped = []
+        # the videos are saved in batches, so a batch costs one round-trip
+        batches = [
+            processed[i : i + SENTIMENT_BATCH_SIZE]
+            for i in range(0, len(processed), SENTIMENT_BATCH_SIZE)
+        ]
 
-        for video in processed:
-            self._scrape_transcript(video)
-            transcript_scraped.append(video)
+        for batch in batches:
+            self._scrape_transcripts(batch)
 
-        for video in transcript_scraped:
-            self._rate_sentiment(video)
+        for batch in batches:
+            self._rate_sentiments(batch)
+            checkpoints.videos_processed(video.video_id for video in batch)
 
-    # todo: refactor this to use batch operations
     def _add_videos_to_database(self, videos: list[YtVideo]):
-        vids = []
         if self.overwrite_existing_data:
-            for video in videos:
-                self.repository.add_or_update(video)
-            vids = videos
-        else:
-            for video in videos:
-                v = self.repository.get_video(video.video_id)
-                if v:
-                    vids.append(v)
-                else:
-                    self._save_video(video)
-                    vids.append(video)
-        return vids
-
-    def _save_video(self, video: YtVideo):
-        added = self.repository.add_if_doesnt_exist(video)
-
-        if not added:
-            logging.log(
-                logging.ERROR, f"Video {video.video_id} already exists in the database."
-            )
-
-    def _update_video(self, video: YtVideo):
-        updated = self.repository.update_if_exists(video)
-
-        if not updated:
-            logging.log(
-                logging.ERROR, f"Video {video.video_id} doesn't exist in the database."
-            )
-
-    def _scrape_transcript(self, video: YtVideo):
-        transcript = video.transcript
-        if transcript is None or self.overwrite_existing_data:
-            transcript = self.transcript_scraper.scrape_transcript(video.video_id)
-
-        video.transcript = transcript
-        self._update_video(video)
-
-    def _rate_sentiment(self, video: YtVideo):
-        if video.stats.sentiment_rating and not self.overwrite_existing_data:
-            title_sentiment_rating = video.stats.sentiment_rating.score_title
-            transcript_sentiment_rating = video.stats.sentiment_rating.score_transcript
-        else:
-            title_sentiment_rating = self.sentiment_rater.rate(video.title).score
-            transcript_sentiment_rating = (
-                self.sentiment_rater.rate(video.transcript).score
-                if video.transcript
-                else None
-            )
-
-        sentiment_rating = YoutubeVideoSentimentRating(
-            model=self.sentiment_rater.model_name,
-            score_title=title_sentiment_rating,
-            score_transcript=transcript_sentiment_rating,
+            self.repository.upsert_many(videos)
+            return videos
+
+        existing = {
+            video.video_id: video
+            for video in self.repository.get_videos([v.video_id for v in videos])
+        }
+        self._save_videos([v for v in videos if v.video_id not in existing])
+        return [existing.get(video.video_id, video) for video in videos]
+
+    def _save_videos(self, videos: list[YtVideo]):
+        added = self.repository.add_many(videos)
+
+        for video, video_added in zip(videos, added):
+            if not video_added:
+                logging.log(
+                    logging.ERROR,
+                    f"Video {video.video_id} already exists in the database.",
+                )
+
+    def _update_videos_in_database(self, videos: list[YtVideo]):
+        updated = self.repository.update_many(videos)
+
+        for video, video_updated in zip(videos, updated):
+            if not video_updated:
+                logging.log(
+                    logging.ERROR,
+                    f"Video {video.video_id} doesn't exist in the database.",
+                )
+
+    def _scrape_transcripts(self, videos: list[YtVideo]):
+        for video in videos:
+            if video.transcript is None or self.overwrite_existing_data:
+                video.transcript = self.transcript_scraper.scrape_transcript(
+                    video.video_id
+                )
+        self._update_videos_in_database(videos)
+
+    def _rate_sentiments(self, videos: list[YtVideo]):
+        rate_videos_sentiment(
+            self.sentiment_rater, videos, self.overwrite_existing_data
         )
-        video.stats.sentiment_rating = sentiment_rating
-        self._update_video(video)
+        self._update_videos_in_database(videos)
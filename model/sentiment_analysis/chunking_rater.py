@@ -0,0 +1,93 @@
+from typing import Any
+
+from model.sentiment_analysis.core import (ChunkedRating, ISentimentRater,
+                                           SplitScoreRating)
+
+
+class ChunkingSentimentRater(ISentimentRater):
+    """
+    Wraps the rater of a model with limited input length (e.g. Roberta), so that long
+    text (transcripts) is rated as a whole instead of being truncated.
+
+    The text is split with the model's tokenizer into windows of chunk_tokens tokens,
+    each overlapping the previous one by overlap_tokens. The chunks of all the texts
+    are rated together with one rate_many call, the rating of a text is the mean of
+    its chunks' ratings weighted by their length in tokens.
+    """
+
+    def __init__(
+        self,
+        rater: ISentimentRater,
+        tokenizer: Any,
+        chunk_tokens: int = 500,
+        overlap_tokens: int = 50,
+        keep_chunks: bool = False,
+    ):
+        if not 0 <= overlap_tokens < chunk_tokens:
+            raise Exception("Chunk overlap has to be smaller than the chunk")
+
+        self.rater = rater
+        self.tokenizer = tokenizer
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.keep_chunks = keep_chunks
+
+    def rate(self, text: str) -> ChunkedRating:
+        return self.rate_many([text])[0]
+
+    def rate_many(
+        self, texts: list[str], batch_size: int = 16
+    ) -> list[ChunkedRating | None]:
+        chunks = []
+        # per text: (length of each chunk in tokens), chunks of a text are consecutive
+        chunk_lengths = []
+        for token_ids in self.tokenizer(texts, add_special_tokens=False)["input_ids"]:
+            windows = self._windows(token_ids)
+            chunks.extend(self.tokenizer.decode(window) for window in windows)
+            chunk_lengths.append([max(1, len(window)) for window in windows])
+
+        chunk_ratings = self.rater.rate_many(chunks, batch_size) if chunks else []
+
+        ratings = []
+        first = 0
+        for lengths in chunk_lengths:
+            text_chunks = chunk_ratings[first : first + len(lengths)]
+            first += len(lengths)
+            # a text with an unrated chunk isn't rated as a whole
+            if any(chunk is None for chunk in text_chunks):
+                ratings.append(None)
+            else:
+                ratings.append(self._aggregate(text_chunks, lengths))
+        return ratings
+
+    def _windows(self, token_ids: list[int]) -> list[list[int]]:
+        stride = self.chunk_tokens - self.overlap_tokens
+        windows = [token_ids[: self.chunk_tokens]]
+        start = stride
+        # the last window ends with the text, later ones would be inside of it
+        while start + self.overlap_tokens < len(token_ids):
+            windows.append(token_ids[start : start + self.chunk_tokens])
+            start += stride
+        return windows
+
+    def _aggregate(
+        self, chunks: list[SplitScoreRating], lengths: list[int]
+    ) -> ChunkedRating:
+        total = sum(lengths)
+
+        def weighted_mean(label: str) -> float:
+            return sum(getattr(c, label) * n for c, n in zip(chunks, lengths)) / total
+
+        return ChunkedRating(
+            negative=weighted_mean("negative"),
+            neutral=weighted_mean("neutral"),
+            positive=weighted_mean("positive"),
+            chunks=chunks if self.keep_chunks else None,
+        )
+
+    @property
+    def model_name(self) -> str:
+        # ratings depend on the chunking, so they aren't shared between configurations
+        return (
+            f"{self.rater.model_name}-chunks-{self.chunk_tokens}-{self.overlap_tokens}"
+        )
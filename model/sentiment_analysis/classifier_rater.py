@@ -0,0 +1,48 @@
+from model.sentiment_analysis.core import ISentimentRater, SplitScoreRating
+
+
+class ClassifierSentimentRater(ISentimentRater):
+    """
+    Base of the sentiment raters based on sequence classification models with negative,
+    neutral and positive labels. Subclasses set the MODEL and the LABELS - names of the
+    model's output labels, in the order of its logits, and compute the label
+    probabilities of a batch of texts.
+
+    Texts are rated in padded batches, sorted by length, so that texts of similar
+    length share a batch and little compute is spent on padding. Texts longer than
+    MAX_LENGTH tokens are truncated.
+    """
+
+    MODEL: str
+    LABELS: tuple[str, str, str]
+    MAX_LENGTH = 512
+
+    def rate(self, text: str) -> SplitScoreRating:
+        return self.rate_many([text])[0]
+
+    def rate_many(
+        self, texts: list[str], batch_size: int = 16
+    ) -> list[SplitScoreRating]:
+        ratings: list[SplitScoreRating | None] = [None] * len(texts)
+        by_length = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+
+        for start in range(0, len(by_length), batch_size):
+            indices = by_length[start : start + batch_size]
+            probabilities = self._probabilities([texts[i] for i in indices])
+            for i, row in zip(indices, probabilities):
+                ratings[i] = self._rating(row)
+
+        return ratings
+
+    def _probabilities(self, texts: list[str]) -> list[list[float]]:
+        """
+        Returns the label probabilities of every text, in the order of LABELS
+        """
+        raise NotImplementedError
+
+    def _rating(self, probabilities: list[float]) -> SplitScoreRating:
+        return SplitScoreRating(**dict(zip(self.LABELS, probabilities)))
+
+    @property
+    def model_name(self) -> str:
+        return self.MODEL
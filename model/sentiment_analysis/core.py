@@ -34,9 +34,28 @@ class SplitScoreRating(SentimentRating):
         return round(-1 * self.negative + 0 * self.neutral + 1 * self.positive, 2)
 
 
+class ChunkedRating(SplitScoreRating):
+    """
+    Rating of a long text - length-weighted mean of the ratings of its chunks,
+    which are kept only if requested
+    """
+
+    chunks: list[SplitScoreRating] | None = None
+
+
 class ISentimentRater(Protocol):
     def rate(self, text: str) -> SentimentRating:
         ...
 
+    def rate_many(
+        self, texts: list[str], batch_size: int = 16
+    ) -> list[SentimentRating | None]:
+        """
+        Rates the texts in batches of batch_size, returns the ratings in the order of
+        the texts. Raters calling remote apis return None for the texts that couldn't
+        be rated, rather than losing the ratings of the rest
+        """
+        ...
+
     def model_name(self) -> str:
         ...
@@ -0,0 +1,113 @@
+import logging
+import os
+
+import onnxruntime
+from scipy.special import softmax
+from transformers import AutoTokenizer
+
+from model.sentiment_analysis.classifier_rater import ClassifierSentimentRater
+
+ONNX_MODELS_DIR = "onnx_models"
+
+
+def export_quantized_model(model: str, models_dir: str = ONNX_MODELS_DIR) -> str:
+    """
+    Exports the huggingface sequence classification model to ONNX, with dynamic batch
+    and sequence axes, and quantizes its weights to int8. Returns path of the quantized
+    model, which is exported only if it doesn't exist yet
+    """
+    model_dir = os.path.join(models_dir, model.replace("/", "--"))
+    quantized_path = os.path.join(model_dir, "model.int8.onnx")
+    if os.path.exists(quantized_path):
+        return quantized_path
+
+    # torch is needed only for the export
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModelForSequenceClassification
+
+    logging.log(logging.INFO, f"Exporting {model} to {quantized_path}")
+    os.makedirs(model_dir, exist_ok=True)
+    classifier = AutoModelForSequenceClassification.from_pretrained(model)
+    classifier.eval()
+    sample = AutoTokenizer.from_pretrained(model)(["sample"], return_tensors="pt")
+
+    # workers may export the model at the same time, the last one replaces the file
+    fp32_path = os.path.join(model_dir, f"model.{os.getpid()}.onnx")
+    tmp_path = f"{quantized_path}.{os.getpid()}.tmp"
+    torch.onnx.export(
+        classifier,
+        (sample["input_ids"], sample["attention_mask"]),
+        fp32_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=14,
+    )
+    quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    os.replace(tmp_path, quantized_path)
+    return quantized_path
+
+
+class OnnxSentimentRater(ClassifierSentimentRater):
+    """
+    Base of the sentiment raters running the int8 quantized ONNX export of the
+    huggingface model through onnxruntime, for CPU-only machines, where it has several
+    times the throughput of the fp32 PyTorch model. The model is exported to models_dir
+    on first use. Scores differ from the PyTorch model's by a few hundredths.
+    """
+
+    def __init__(self, models_dir: str = ONNX_MODELS_DIR, threads: int | None = None):
+        self.tokenizer = AutoTokenizer.from_pretrained(self.MODEL)
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            export_quantized_model(self.MODEL, models_dir),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+
+    def _probabilities(self, texts: list[str]) -> list[list[float]]:
+        encoded_input = self.tokenizer(
+            texts,
+            return_tensors="np",
+            padding=True,
+            truncation=True,
+            max_length=self.MAX_LENGTH,
+        )
+        (logits,) = self.session.run(
+            ["logits"],
+            {
+                "input_ids": encoded_input["input_ids"].astype("int64"),
+                "attention_mask": encoded_input["attention_mask"].astype("int64"),
+            },
+        )
+        return softmax(logits, axis=-1).tolist()
+
+    @property
+    def model_name(self) -> str:
+        return f"{self.MODEL}-onnx-int8"
+
+
+class RobertaOnnxSentimentRater(OnnxSentimentRater):
+    """
+    ONNX int8 version of RobertaSentimentRater
+    """
+
+    MODEL = "cardiffnlp/twitter-roberta-base-sentiment"
+    LABELS = ("negative", "neutral", "positive")
+
+
+class FinbertOnnxSentimentRater(OnnxSentimentRater):
+    """
+    ONNX int8 version of FinbertSentimentRater
+    """
+
+    MODEL = "ProsusAI/finbert"
+    LABELS = ("positive", "negative", "neutral")
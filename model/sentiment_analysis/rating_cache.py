@@ -0,0 +1,137 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from model.sentiment_analysis.core import (ChunkedRating, GptRating,
+                                           ISentimentRater, SentimentRating,
+                                           SplitScoreRating)
+
+RATING_TYPES: dict[str, type[SentimentRating]] = {
+    rating_type.__name__: rating_type
+    for rating_type in (GptRating, SplitScoreRating, ChunkedRating)
+}
+
+
+def text_hash(text: str) -> str:
+    """
+    Returns hash of the text normalized so that it doesn't depend on unicode
+    representation and whitespace
+    """
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class SentimentRatingCache:
+    """
+    Persistent (sqlite) cache of the sentiment ratings, keyed by the model name and hash
+    of the normalized text, with in-memory LRU cache of memory_entries ratings in front.
+    The cache can be shared between threads and processes.
+    """
+
+    def __init__(self, path: str, memory_entries: int = 10_000):
+        self._memory_entries = memory_entries
+        self._memory: OrderedDict[tuple[str, str], SentimentRating] = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS ratings ("
+                "model TEXT NOT NULL, text_hash TEXT NOT NULL, "
+                "rating_type TEXT NOT NULL, rating TEXT NOT NULL, "
+                "PRIMARY KEY (model, text_hash))"
+            )
+
+    def get_many(self, model: str, hashes: list[str]) -> dict[str, SentimentRating]:
+        found = {}
+        with self._lock:
+            for text_hash in hashes:
+                rating = self._memory.get((model, text_hash))
+                if rating is not None:
+                    self._memory.move_to_end((model, text_hash))
+                    found[text_hash] = rating
+
+            missing = [h for h in dict.fromkeys(hashes) if h not in found]
+            # sqlite limits the number of query parameters
+            for i in range(0, len(missing), 500):
+                chunk = missing[i : i + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    "SELECT text_hash, rating_type, rating FROM ratings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *chunk),
+                ).fetchall()
+                for text_hash, rating_type, rating in rows:
+                    found[text_hash] = RATING_TYPES[rating_type](**json.loads(rating))
+                    self._remember((model, text_hash), found[text_hash])
+
+        return found
+
+    def put_many(self, model: str, ratings: dict[str, SentimentRating]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO ratings VALUES (?, ?, ?, ?)",
+                [
+                    (model, text_hash, type(rating).__name__, rating.model_dump_json())
+                    for text_hash, rating in ratings.items()
+                ],
+            )
+            for text_hash, rating in ratings.items():
+                self._remember((model, text_hash), rating)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _remember(self, key: tuple[str, str], rating: SentimentRating) -> None:
+        self._memory[key] = rating
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+
+class CachedSentimentRater(ISentimentRater):
+    """
+    Wraps any sentiment rater, so that texts rated before (by the same model, in any
+    run) are served from the cache, without model compute or api calls. Texts the
+    rater fails to rate aren't cached, so they are rated again next time
+    """
+
+    def __init__(self, rater: ISentimentRater, cache: SentimentRatingCache):
+        self.rater = rater
+        self.cache = cache
+
+    def rate(self, text: str) -> SentimentRating:
+        rating = self.rate_many([text])[0]
+        if rating is None:
+            raise Exception(f"Could not rate the text with {self.model_name}")
+        return rating
+
+    def rate_many(
+        self, texts: list[str], batch_size: int = 16
+    ) -> list[SentimentRating | None]:
+        hashes = [text_hash(text) for text in texts]
+        ratings = self.cache.get_many(self.model_name, hashes)
+
+        # texts repeated in the batch are rated once
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h not in ratings:
+                missing.setdefault(h, text)
+        if missing:
+            new_ratings = {
+                h: rating
+                for h, rating in zip(
+                    missing, self.rater.rate_many(list(missing.values()), batch_size)
+                )
+                if rating is not None
+            }
+            self.cache.put_many(self.model_name, new_ratings)
+            ratings.update(new_ratings)
+
+        return [ratings.get(h) for h in hashes]
+
+    @property
+    def model_name(self) -> str:
+        return self.rater.model_name
@@ -1,3 +1,12 @@
+import logging
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import openai
+
+from model.gpt_tools.rate_limiter import RateLimiter
 from model.gpt_tools.tools import GptContact
 from model.sentiment_analysis.core import GptRating, ISentimentRater
 
@@ -6,6 +15,20 @@ class GptSentimentRater(ISentimentRater):
     """
     Openai-gpt based sentiment rater implementation. Depends on the GptContact class that encapsulates
     openai api calls and preprocessing input (limiting tokens etc)
+
+    rate_many keeps up to max_in_flight requests in flight, whilst the rate limiter keeps
+    them within the api's requests and tokens per minute limits, so rating many texts
+    is bound by the rate limits rather than by the latency of the requests.
+    Rate limit (429) and transient api errors are retried with exponential backoff.
+
+    With pack_token_budget set, rate_many sends up to max_texts_per_pack numbered texts
+    per request (as many as fit into the budget), so the system message and the
+    round-trip are paid once per pack. Texts without a valid rating in the packed answer
+    are rated one by one.
+
+    rate_many doesn't fail the whole call when some of the texts can't be rated, their
+    errors are logged and their ratings are None, so the ratings already paid for are
+    kept.
     """
 
     # Todo: move to config
@@ -21,37 +44,213 @@ class GptSentimentRater(ISentimentRater):
     ### Required answer format:
     sentiment_rating = <rating>
     """
+    PACKED_SYSTEM_MESSAGE = """
+    Rate the sentiment of each of the numbered texts. Use values between -100 and 100
+    ### Guidelines for rating: (but you can use value in between too) :
+    -100 : very negative
+    -50: negative
+    0: neutral
+    50: positive
+    100: very positive
+    ### Required answer format, one line per text:
+    <text number>. sentiment_rating = <rating>
+    """
+    PACKED_RATING_PATTERN = re.compile(
+        r"^\s*(\d+)\s*[.):]\s*sentiment_rating\s*=\s*(-?\d+)\s*$", re.MULTILINE
+    )
+    MAX_ANSWER_TOKENS = 15
+    # "<number>. " prefix of a packed text and its answer line
+    PACKED_TEXT_TOKENS = 4
+    PACKED_ANSWER_TOKENS = 12
     RETRY_LIMIT = 3
+    BACKOFF_SECONDS = 2
+    RETRIED_ERRORS = (
+        openai.error.RateLimitError,
+        openai.error.ServiceUnavailableError,
+        openai.error.APIConnectionError,
+        openai.error.Timeout,
+    )
+    # default limits of the model's api tier
+    REQUESTS_PER_MINUTE = 200
+    TOKENS_PER_MINUTE = 40_000
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        max_in_flight: int = 8,
+        rate_limiter: RateLimiter | None = None,
+        pack_token_budget: int = 0,
+        max_texts_per_pack: int = 20,
+    ):
         self.gpt = GptContact(api_key, self.MODEL)
-        self.fail_count = 0
+        self.max_in_flight = max_in_flight
+        self.rate_limiter = rate_limiter or RateLimiter(
+            self.REQUESTS_PER_MINUTE, self.TOKENS_PER_MINUTE
+        )
+        self.pack_token_budget = pack_token_budget
+        self.max_texts_per_pack = max_texts_per_pack
 
     def rate(self, text: str) -> GptRating:
-        rating = self._get_gpt_sentiment_rating(text)
+        for _ in range(self.RETRY_LIMIT + 1):
+            rating = self._get_gpt_sentiment_rating(text)
+            if rating is not None:
+                return GptRating(value=rating / 100)
+
+        raise ValueError("Could not get valid gpt sentiment rating")
 
-        if rating is None:
-            if self.fail_count <= self.RETRY_LIMIT:
-                self.fail_count += 1
-                return self.rate(text)
-            else:
-                raise ValueError("Could not get valid gpt sentiment rating")
+    def rate_many(
+        self, texts: list[str], batch_size: int = 16
+    ) -> list[GptRating | None]:
+        # requests are sized by the token budget, so batch_size doesn't apply
+        ratings: list[GptRating | None] = [None] * len(texts)
+        with ThreadPoolExecutor(self.max_in_flight) as executor:
+            if self.pack_token_budget:
+                packs = {
+                    executor.submit(self._rate_pack, [texts[i] for i in pack]): pack
+                    for pack in self._pack(texts)
+                }
+                for future in as_completed(packs):
+                    try:
+                        pack_ratings = future.result()
+                    except Exception as e:
+                        logging.log(
+                            logging.WARNING,
+                            f"Gpt request of {len(packs[future])} texts failed: {e}",
+                        )
+                        continue
+                    for i, rating in zip(packs[future], pack_ratings):
+                        ratings[i] = rating
 
-        self.fail_count = 0
-        return GptRating(value=rating / 100)
+            unrated = {
+                executor.submit(self.rate, texts[i]): i
+                for i, rating in enumerate(ratings)
+                if rating is None
+            }
+            for future in as_completed(unrated):
+                try:
+                    ratings[unrated[future]] = future.result()
+                except Exception as e:
+                    logging.log(
+                        logging.WARNING,
+                        f"Gpt rating of text {unrated[future]} failed: {e}",
+                    )
+        return ratings
 
     def _get_gpt_sentiment_rating(self, text: str) -> float | None:
-        rating = self.gpt.get_chat_completion(
-            self.SYSTEM_MESSAGE, text, max_tokens=15, temperature=0
+        answer = self._complete(self.SYSTEM_MESSAGE, text, self.MAX_ANSWER_TOKENS)
+        return self._parse_rating(answer)
+
+    def _pack(self, texts: list[str]) -> list[list[int]]:
+        """
+        Groups indices of the texts into packs that fit into pack_token_budget together
+        with the system message and the answer. Texts that don't fit alone aren't packed
+        """
+        system_tokens = GptContact.count_tokens(self.PACKED_SYSTEM_MESSAGE)
+        packs = []
+        pack = []
+        pack_tokens = system_tokens
+        for i, text in enumerate(texts):
+            tokens = GptContact.count_tokens(self._pack_line(text))
+            tokens += self.PACKED_TEXT_TOKENS + self.PACKED_ANSWER_TOKENS
+            if system_tokens + tokens > self.pack_token_budget:
+                continue
+
+            if pack and (
+                pack_tokens + tokens > self.pack_token_budget
+                or len(pack) >= self.max_texts_per_pack
+            ):
+                packs.append(pack)
+                pack = []
+                pack_tokens = system_tokens
+            pack.append(i)
+            pack_tokens += tokens
+
+        if pack:
+            packs.append(pack)
+        return packs
+
+    def _rate_pack(self, texts: list[str]) -> list[GptRating | None]:
+        user_message = "\n".join(
+            f"{number}. {self._pack_line(text)}"
+            for number, text in enumerate(texts, start=1)
+        )
+        max_tokens = self.PACKED_ANSWER_TOKENS * len(texts)
+
+        answer = self._complete(self.PACKED_SYSTEM_MESSAGE, user_message, max_tokens)
+        return self._parse_packed_ratings(answer, len(texts))
+
+    def _complete(self, system_message: str, user_message: str, max_tokens: int) -> str:
+        """
+        Sends the request within the rate limits, retrying the transient api errors
+        """
+        tokens = self._request_tokens(system_message, user_message, max_tokens)
+        for attempt in range(self.RETRY_LIMIT + 1):
+            self.rate_limiter.acquire(tokens)
+            try:
+                return self.gpt.get_chat_completion(
+                    system_message, user_message, max_tokens=max_tokens, temperature=0
+                )
+            except self.RETRIED_ERRORS as e:
+                if attempt == self.RETRY_LIMIT:
+                    raise
+                self._backoff(attempt, e)
+
+    def _request_tokens(
+        self, system_message: str, user_message: str, max_tokens: int
+    ) -> int:
+        # the input gets truncated to the context limit
+        input_tokens = GptContact.count_tokens(system_message)
+        input_tokens += GptContact.count_tokens(user_message)
+        context_limit = GptContact.context_limits.get(self.MODEL, input_tokens)
+        return min(input_tokens, context_limit) + max_tokens
+
+    def _backoff(self, attempt: int, error: Exception) -> None:
+        delay = self.BACKOFF_SECONDS * 2**attempt * (1 + random.random())
+        retry_after = (getattr(error, "headers", None) or {}).get("retry-after")
+        if retry_after:
+            delay = max(delay, float(retry_after))
+
+        logging.log(
+            logging.WARNING, f"Gpt request failed: {error}, retrying in {delay:.1f} s"
         )
+        time.sleep(delay)
+
+    @staticmethod
+    def _parse_rating(answer: str) -> float | None:
         str_rating = ""
         # look for number in the response
-        for char in rating:
+        for char in answer:
             if char.isdigit() or char == "-":
                 str_rating += char
 
-        rating = int(str_rating)
-        return rating if str_rating else None
+        try:
+            return int(str_rating)
+        except ValueError:
+            return None
+
+    @classmethod
+    def _parse_packed_ratings(cls, answer: str, texts: int) -> list[GptRating | None]:
+        """
+        Returns ratings of the texts by their number, None for the texts with missing,
+        repeated or out of range rating
+        """
+        ratings: dict[int, int | None] = {}
+        for match in cls.PACKED_RATING_PATTERN.finditer(answer):
+            number, rating = int(match.group(1)), int(match.group(2))
+            valid = 1 <= number <= texts and -100 <= rating <= 100
+            ratings[number] = rating if valid and number not in ratings else None
+
+        return [
+            GptRating(value=ratings[number] / 100)
+            if ratings.get(number) is not None
+            else None
+            for number in range(1, texts + 1)
+        ]
+
+    @staticmethod
+    def _pack_line(text: str) -> str:
+        # texts are separated by lines, so they can't contain line breaks
+        return " ".join(text.split())
 
     @property
     def model_name(self) -> str:
@@ -0,0 +1,32 @@
+import torch
+from transformers import (AutoConfig, AutoModelForSequenceClassification,
+                          AutoTokenizer)
+
+from model.sentiment_analysis.classifier_rater import ClassifierSentimentRater
+
+
+class TransformerSentimentRater(ClassifierSentimentRater):
+    """
+    Base of the sentiment raters running huggingface sequence classification models
+    in PyTorch, on GPU when available
+    """
+
+    def __init__(self):
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model = AutoModelForSequenceClassification.from_pretrained(self.MODEL)
+        self.model.to(self.device)
+        self.model.eval()
+        self.tokenizer = AutoTokenizer.from_pretrained(self.MODEL)
+        self.config = AutoConfig.from_pretrained(self.MODEL)
+
+    def _probabilities(self, texts: list[str]) -> list[list[float]]:
+        encoded_input = self.tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=self.MAX_LENGTH,
+        ).to(self.device)
+        with torch.inference_mode():
+            logits = self.model(**encoded_input).logits
+        return torch.softmax(logits, dim=-1).cpu().tolist()
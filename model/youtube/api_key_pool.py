@@ -0,0 +1,230 @@
+import datetime
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import zoneinfo
+from typing import Any, Callable
+
+from googleapiclient.errors import HttpError
+
+from model.youtube.yt_api_client import build_yt_client
+
+# quota units yt data api charges per call, regardless of the number of results
+QUOTA_COSTS = {"search": 100, "videos": 1}
+DAILY_QUOTA = 10_000
+QUOTA_ERROR_REASONS = ("quotaExceeded", "dailyLimitExceeded")
+# short term (per user / per second) limits, the key can be used again shortly
+RATE_LIMIT_ERROR_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+RATE_LIMIT_RETRIES = 5
+BACKOFF_SECONDS = 1
+# the daily quota resets at midnight pacific time
+QUOTA_TIMEZONE = zoneinfo.ZoneInfo("America/Los_Angeles")
+
+
+def _error_reasons(body: dict) -> list[str]:
+    return [error.get("reason") for error in body.get("error", {}).get("errors", [])]
+
+
+def is_quota_error(status: int, body: dict) -> bool:
+    if status != 403:
+        return False
+    return any(reason in QUOTA_ERROR_REASONS for reason in _error_reasons(body))
+
+
+def is_rate_limit_error(status: int, body: dict) -> bool:
+    if status not in (403, 429):
+        return False
+    return any(reason in RATE_LIMIT_ERROR_REASONS for reason in _error_reasons(body))
+
+
+def backoff_delay(attempt: int) -> float:
+    return BACKOFF_SECONDS * 2**attempt * (1 + random.random())
+
+
+class ApiKeyPool:
+    """
+    Hands out yt data api keys for requests, keeping track of the quota units each key
+    has used today. Every request is reserved on the key with the most quota left, so the
+    concurrent requests are spread across the keys.
+
+    If state_path is given, the used quota is persisted there (keys are stored hashed),
+    so the budget survives restarts. It's reset when the day in pacific time changes.
+    The state is saved every SAVE_EVERY_UNITS units used and whenever a key runs out
+    (save persists the rest, e.g. before exiting).
+    Processes sharing the file add their usage to the stored one under a file lock, so
+    they don't overwrite each other's usage.
+
+    Keys hitting the short term rate limit are retried with backoff, they keep their
+    quota. Api clients are built once per key with client_factory and reused.
+    """
+
+    SAVE_EVERY_UNITS = 100
+
+    def __init__(
+        self,
+        api_keys: list[str],
+        daily_quota: int = DAILY_QUOTA,
+        state_path: str | None = None,
+        client_factory: Callable[[str], Any] = build_yt_client,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if not api_keys:
+            raise Exception("ApiKeyPool: no api keys provided")
+
+        self._api_keys = api_keys
+        self._daily_quota = daily_quota
+        self._state_path = state_path
+        self._client_factory = client_factory
+        self._sleep = sleep
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+        self._day = self._today()
+        self._used = {api_key: 0 for api_key in api_keys}
+        # units used since the last save
+        self._unsaved: dict[str, int] = {}
+        self._load()
+
+    def acquire(self, endpoint: str) -> str:
+        """
+        Reserves the quota of the endpoint call, returns the key it was reserved on
+        """
+        cost = QUOTA_COSTS.get(endpoint, 1)
+
+        with self._lock:
+            self._reset_if_new_day()
+            api_key = max(self._api_keys, key=self._remaining)
+            if self._remaining(api_key) < cost:
+                logging.log(logging.ERROR, "All api keys used.")
+                raise Exception("quota limit reached")
+
+            self._used[api_key] += cost
+            self._unsaved[api_key] = self._unsaved.get(api_key, 0) + cost
+            if sum(self._unsaved.values()) >= self.SAVE_EVERY_UNITS:
+                self._save()
+            return api_key
+
+    def mark_exhausted(self, api_key: str) -> None:
+        logging.log(
+            logging.WARNING,
+            f"Api key {self._api_keys.index(api_key)} quota has been reached",
+        )
+
+        with self._lock:
+            self._used[api_key] = self._daily_quota
+            # the stored usage is capped at the daily quota
+            self._unsaved[api_key] = self._daily_quota
+            self._save()
+
+    def save(self) -> None:
+        with self._lock:
+            self._save()
+
+    def remaining(self, api_key: str) -> int:
+        with self._lock:
+            self._reset_if_new_day()
+            return self._remaining(api_key)
+
+    def client(self, api_key: str) -> Any:
+        with self._clients_lock:
+            if api_key not in self._clients:
+                self._clients[api_key] = self._client_factory(api_key)
+            return self._clients[api_key]
+
+    def execute(self, endpoint: str, request: Callable[[Any], Any]) -> dict:
+        """
+        Executes the api client request created by request function, switching to the
+        next key whenever the used one runs out of quota
+        """
+        while True:
+            api_key = self.acquire(endpoint)
+            try:
+                return self._execute_on_key(api_key, request)
+            except HttpError as e:
+                if not is_quota_error(e.resp.status, self._error_body(e)):
+                    raise
+                self.mark_exhausted(api_key)
+
+    def _execute_on_key(self, api_key: str, request: Callable[[Any], Any]) -> dict:
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                return request(self.client(api_key)).execute()
+            except HttpError as e:
+                rate_limited = is_rate_limit_error(e.resp.status, self._error_body(e))
+                if not rate_limited or attempt == RATE_LIMIT_RETRIES:
+                    raise
+                self._sleep(backoff_delay(attempt))
+
+    def _remaining(self, api_key: str) -> int:
+        return self._daily_quota - self._used[api_key]
+
+    def _reset_if_new_day(self) -> None:
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used = {api_key: 0 for api_key in self._api_keys}
+            self._unsaved = {}
+
+    def _load(self) -> None:
+        if not self._state_path:
+            return
+
+        used = self._read_state().get("used", {})
+        for api_key in self._api_keys:
+            self._used[api_key] = used.get(self._hash(api_key), 0)
+
+    def _read_state(self) -> dict:
+        """
+        Returns the persisted state of the current day, empty if there's none
+        """
+        if not os.path.exists(self._state_path):
+            return {}
+
+        with open(self._state_path) as f:
+            state = json.load(f)
+        return state if state.get("day") == self._day else {}
+
+    def _save(self) -> None:
+        if not self._state_path:
+            self._unsaved = {}
+            return
+
+        # other processes may use the same file (and keys), so the usage since the last
+        # save is added to the stored one, whilst the file is locked
+        with open(f"{self._state_path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            used = self._read_state().get("used", {})
+            for api_key, units in self._unsaved.items():
+                key_hash = self._hash(api_key)
+                used[key_hash] = min(self._daily_quota, used.get(key_hash, 0) + units)
+            for api_key in self._api_keys:
+                self._used[api_key] = used.get(self._hash(api_key), 0)
+
+            state = {"day": self._day, "used": used}
+            # write and rename, so that a crash never leaves a truncated file behind
+            tmp_path = f"{self._state_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self._state_path)
+        self._unsaved = {}
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.datetime.now(QUOTA_TIMEZONE).date().isoformat()
+
+    @staticmethod
+    def _hash(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+    @staticmethod
+    def _error_body(error: HttpError) -> dict:
+        try:
+            return json.loads(error.content)
+        except ValueError:
+            return {}
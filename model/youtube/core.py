@@ -1,5 +1,5 @@
 import datetime
-from typing import Protocol
+from typing import Iterable, Iterator, Protocol
 
 from pydantic import BaseModel
 
@@ -8,6 +8,23 @@ def get_url_for_vid_id(vid_id: str) -> str:
     return f"https://www.youtube.com/watch?v={vid_id}"
 
 
+def iter_time_windows(
+    date_start: datetime.date, date_end: datetime.date, time_delta: int
+) -> Iterator[tuple[datetime.date, datetime.date]]:
+    """
+    Splits the date range into the (search_from, search_to) windows searched by top video finders
+    """
+    delta = datetime.timedelta(days=time_delta)
+
+    search_from = date_start
+    search_to = date_start + delta
+
+    while search_from <= date_end:
+        yield search_from, min(search_to, date_end)
+        search_from += delta
+        search_to += delta
+
+
 class YoutubeVideoSentimentRating(BaseModel):
     model: str
     score_title: float
@@ -57,7 +74,12 @@ class IYtTopVideoFinder(Protocol):
         language: str = "en",
         min_views: int | None = None,
         min_video_length: int = 5,
+        skip_windows: set[tuple[datetime.date, datetime.date]] | None = None,
     ) -> list[list[YtVideo]]:
+        """
+        Yields the list of top videos of each (search_from, search_to) time window,
+        except for the skip_windows, in order
+        """
         ...
 
 
@@ -65,7 +87,22 @@ class IYtStatsScraper(Protocol):
     def scrape_stats(self, video_id: str) -> YtVideoStats:
         ...
 
+    def scrape_stats_many(self, video_ids: list[str]) -> dict[str, YtVideoStats]:
+        """
+        Returns stats of the videos keyed by video id, videos that weren't found are left out
+        """
+        ...
+
 
 class IYtTranscriptScraper(Protocol):
     def scrape_transcript(self, video_id: str) -> str | None:
         ...
+
+    def scrape_transcripts(
+        self, video_ids: Iterable[str]
+    ) -> Iterator[tuple[str, str | None]]:
+        """
+        Yields (video id, transcript) pairs as the transcripts are scraped, not
+        necessarily in the order of the ids. Ids are taken from the iterable lazily
+        """
+        ...
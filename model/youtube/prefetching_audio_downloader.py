@@ -0,0 +1,78 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from model.youtube.yt_audio_downloader import YtAudioDownloader
+
+
+class PrefetchingAudioDownloader:
+    """
+    Loads audio of the videos ahead, in background threads, so the next videos' audio
+    is being downloaded whilst the current one is transcribed.
+
+    Up to prefetch videos are loaded ahead of the one being consumed, as long as their
+    audio (the loaded audio, the longest possible audio of the ones still loading, and
+    the audio being consumed) fits into memory_budget_mb. The next video is always
+    loaded, even over the budget, so the consumer never waits for a download to start.
+
+    Example:
+        prefetcher = PrefetchingAudioDownloader(YtAudioDownloader(), prefetch=2)
+        for video_id, audio in prefetcher.load_many(video_ids):
+            whisper.transcribe(audio)
+    """
+
+    def __init__(
+        self,
+        downloader: YtAudioDownloader,
+        prefetch: int = 2,
+        memory_budget_mb: int = 512,
+    ):
+        self.downloader = downloader
+        self.prefetch = prefetch
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+
+    def load_many(self, video_ids: Iterable[str]) -> Iterator[tuple[str, np.ndarray]]:
+        """
+        Yields (video id, audio) in the order of the ids, raises the download error
+        when the video that failed is reached
+        """
+        video_ids = iter(video_ids)
+        pending: deque[tuple[str, Future[np.ndarray]]] = deque()
+        executor = ThreadPoolExecutor(self.prefetch)
+        try:
+            consumed = 0
+            self._load_ahead(executor, video_ids, pending, consumed)
+            while pending:
+                video_id, future = pending.popleft()
+                audio = future.result()
+                consumed = audio.nbytes
+                self._load_ahead(executor, video_ids, pending, consumed)
+                yield video_id, audio
+        finally:
+            # downloads of the videos that won't be consumed are dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load_ahead(
+        self,
+        executor: ThreadPoolExecutor,
+        video_ids: Iterator[str],
+        pending: deque[tuple[str, Future[np.ndarray]]],
+        consumed_bytes: int,
+    ) -> None:
+        max_audio_bytes = self.downloader.max_audio_bytes or 0
+        while len(pending) < self.prefetch:
+            used = consumed_bytes + sum(
+                future.result().nbytes
+                if future.done() and not future.exception()
+                else max_audio_bytes
+                for _, future in pending
+            )
+            if pending and used + max_audio_bytes > self.memory_budget:
+                return
+
+            video_id = next(video_ids, None)
+            if video_id is None:
+                return
+            pending.append((video_id, executor.submit(self.downloader.load, video_id)))
@@ -0,0 +1,137 @@
+import datetime
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# search results of windows that ended long ago barely change, recent ones still move
+# as the videos gather views
+SEARCH_TTL_CLOSED_WINDOW = 30 * DAY
+SEARCH_TTL_RECENT_WINDOW = HOUR
+CLOSED_WINDOW_AGE = 7 * DAY
+VIDEOS_TTL = DAY
+
+
+def normalize_parameters(parameters: dict) -> str:
+    """
+    Returns the request parameters as canonical json, without the api key
+    """
+    return json.dumps(
+        {name: str(value) for name, value in parameters.items() if name != "key"},
+        sort_keys=True,
+    )
+
+
+class ResponseCache:
+    """
+    On-disk (sqlite) cache of the yt data api responses, keyed by the endpoint and
+    normalized request parameters, so re-running the same searches doesn't use quota.
+
+    Search responses of the windows that ended over CLOSED_WINDOW_AGE ago are kept for
+    SEARCH_TTL_CLOSED_WINDOW, the recent ones for SEARCH_TTL_RECENT_WINDOW. Other
+    endpoints use the ttls passed in (videos endpoint defaults to VIDEOS_TTL).
+    When there are more than max_entries responses, the least recently used are evicted.
+
+    The cache can be shared between threads and processes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 100_000,
+        ttls: dict[str, float] | None = None,
+    ):
+        self._max_entries = max_entries
+        self._ttls = {"videos": VIDEOS_TTL, **(ttls or {})}
+        self._lock = threading.Lock()
+        # the cache file can be shared by worker processes, so wait for their writes
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+                "ON responses (accessed_at)"
+            )
+
+    def get(self, endpoint: str, parameters: dict) -> dict | None:
+        key = self._key(endpoint, parameters)
+        now = time.time()
+
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            response, expires_at = row
+            if expires_at <= now:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return json.loads(response)
+
+    def put(self, endpoint: str, parameters: dict, response: dict) -> None:
+        ttl = self.ttl(endpoint, parameters)
+        if ttl <= 0:
+            return
+
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (
+                    self._key(endpoint, parameters),
+                    json.dumps(response),
+                    now + ttl,
+                    now,
+                ),
+            )
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at "
+                "LIMIT MAX(0, (SELECT COUNT(*) FROM responses) - ?))",
+                (self._max_entries,),
+            )
+
+    def get_or_fetch(
+        self, endpoint: str, parameters: dict, fetch: Callable[[], dict]
+    ) -> dict:
+        response = self.get(endpoint, parameters)
+        if response is None:
+            response = fetch()
+            self.put(endpoint, parameters, response)
+        return response
+
+    def ttl(self, endpoint: str, parameters: dict) -> float:
+        if endpoint != "search":
+            return self._ttls.get(endpoint, 0)
+
+        published_before = parameters.get("publishedBefore")
+        if published_before is None:
+            return SEARCH_TTL_RECENT_WINDOW
+        window_end = datetime.datetime.fromisoformat(published_before)
+        age = datetime.datetime.now(datetime.timezone.utc) - window_end
+        if age.total_seconds() > CLOSED_WINDOW_AGE:
+            return self._ttls.get("search", SEARCH_TTL_CLOSED_WINDOW)
+        return SEARCH_TTL_RECENT_WINDOW
+
+    def close(self) -> None:
+        self._connection.close()
+
+    @staticmethod
+    def _key(endpoint: str, parameters: dict) -> str:
+        normalized = f"{endpoint}:{normalize_parameters(parameters)}"
+        return hashlib.sha256(normalized.encode()).hexdigest()
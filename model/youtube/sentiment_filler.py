@@ -2,12 +2,78 @@ from model.persistence.core import IYtVideoRepository
 from model.sentiment_analysis.core import ISentimentRater
 from model.youtube.core import YoutubeVideoSentimentRating, YtVideo
 
+SENTIMENT_BATCH_SIZE = 16
+
+
+def rate_videos_sentiment(
+    sentiment_rater: ISentimentRater,
+    videos: list[YtVideo],
+    overwrite_existing_data: bool,
+    batch_size: int = SENTIMENT_BATCH_SIZE,
+) -> None:
+    """
+    Fills out the missing title and transcript sentiment ratings of the videos (all of
+    them if overwrite_existing_data). The texts of all the videos are rated together,
+    in batches of batch_size. Texts the rater fails to rate keep their previous score
+    (even if overwrite_existing_data) or are left unrated, so they are rated by the
+    next fill of the missing ratings
+    """
+    texts = []
+    # per video: existing title and transcript scores, or indices of the texts to rate
+    rated_texts = []
+    for video in videos:
+        scores = {"title": None, "transcript": None}
+        if video.stats.sentiment_rating and not overwrite_existing_data:
+            scores["title"] = video.stats.sentiment_rating.score_title
+            scores["transcript"] = video.stats.sentiment_rating.score_transcript
+
+        indices = {}
+        if scores["title"] is None:
+            indices["title"] = len(texts)
+            texts.append(video.title)
+        if video.transcript and scores["transcript"] is None:
+            indices["transcript"] = len(texts)
+            texts.append(video.transcript)
+        rated_texts.append((scores, indices))
+
+    ratings = sentiment_rater.rate_many(texts, batch_size) if texts else []
+
+    for video, (scores, indices) in zip(videos, rated_texts):
+        previous = video.stats.sentiment_rating
+        for text, index in indices.items():
+            if ratings[index] is not None:
+                scores[text] = ratings[index].score
+            elif previous is not None:
+                # a failed rating doesn't overwrite the previous one
+                scores[text] = getattr(previous, f"score_{text}")
+        # the rating can't be stored without the title score
+        if scores["title"] is None:
+            continue
+        video.stats.sentiment_rating = YoutubeVideoSentimentRating(
+            model=sentiment_rater.model_name,
+            score_title=scores["title"],
+            score_transcript=scores["transcript"],
+        )
+
 
 class SentimentFiller:
     """
     Class responsible for filling out missing sentiment data for videos in repository
     """
 
+    BATCH_SIZE = 50
+    MISSING_SENTIMENT_QUERY = {
+        "$or": [
+            {"stats.sentiment_rating": None},
+            {"stats.sentiment_rating.score_title": None},
+            # videos without transcript never get the transcript score
+            {
+                "stats.sentiment_rating.score_transcript": None,
+                "transcript": {"$nin": [None, ""]},
+            },
+        ]
+    }
+
     def __init__(
         self,
         yt_sentiment_rater: ISentimentRater,
@@ -19,37 +85,23 @@ class SentimentFiller:
         self.overwrite_existing_data = overwrite_existing_data
 
     def fill_sentiment(self, video: YtVideo) -> None:
-        title_sentiment_rating = None
-        transcript_sentiment_rating = None
-        if video.stats.sentiment_rating and not self.overwrite_existing_data:
-            title_sentiment_rating = video.stats.sentiment_rating.score_title
-            transcript_sentiment_rating = video.stats.sentiment_rating.score_transcript
-
-        if title_sentiment_rating is None:
-            title_sentiment_rating = self.sentiment_rater.rate(video.title).score
-
-        if video.transcript and transcript_sentiment_rating is None:
-            transcript_sentiment_rating = self.sentiment_rater.rate(
-                video.transcript
-            ).score
-
-        sentiment_rating = YoutubeVideoSentimentRating(
-            model=self.sentiment_rater.model_name,
-            score_title=title_sentiment_rating,
-            score_transcript=transcript_sentiment_rating,
-        )
+        self.fill_sentiments([video])
 
-        video.stats.sentiment_rating = sentiment_rating
-        self.yt_repository.update_if_exists(video)
+    def fill_sentiments(self, videos: list[YtVideo]) -> None:
+        rate_videos_sentiment(
+            self.sentiment_rater, videos, self.overwrite_existing_data
+        )
+        self.yt_repository.update_many(videos)
 
     def fill_missing_sentiment_ratings(self):
-        for vid in self.yt_repository.get_all_videos():
-            if self._sentiment_data_incomplete(vid):
-                self.fill_sentiment(vid)
-
-    def _sentiment_data_incomplete(self, video: YtVideo) -> bool:
-        return (
-            video.stats.sentiment_rating is None
-            or video.stats.sentiment_rating.score_title is None
-            or video.stats.sentiment_rating.score_transcript is None
-        )
+        batch = []
+        for vid in self.yt_repository.iter_videos(
+            self.MISSING_SENTIMENT_QUERY, batch_size=self.BATCH_SIZE
+        ):
+            batch.append(vid)
+            if len(batch) >= self.BATCH_SIZE:
+                self.fill_sentiments(batch)
+                batch = []
+
+        if batch:
+            self.fill_sentiments(batch)
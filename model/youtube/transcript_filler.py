@@ -1,3 +1,6 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator
+
 from model.persistence.core import IYtVideoRepository
 from model.persistence.factory import YtVideoRepositoryFactory
 from model.persistence.mongo import YtVideoMongoRepository
@@ -15,25 +18,86 @@ class TranscriptFiller:
 
     As the transcript grabbing process can be time-consuming, especially when based on audio processing
     and text extraction using ml model, it's often better to do this process separately.
+
+    Up to workers videos are scraped at once, so with the whisper workers' pool shared
+    by the scraper the transcripts are extracted on as many cores as there are workers,
+    whilst the audio of the next videos is being downloaded.
     """
 
+    # videos fetched from the repository at once
+    BATCH_SIZE = 5
+    MISSING_TRANSCRIPT_QUERY = {"transcript": {"$in": [None, ""]}}
+
     def __init__(
         self,
         yt_transcript_scraper: IYtTranscriptScraper,
         yt_repository: IYtVideoRepository,
+        workers: int = 1,
     ):
         self.yt_transcript_scraper = yt_transcript_scraper
         self.yt_repository = yt_repository
+        self.workers = workers
 
     def fill_transcript(self, video: YtVideo) -> None:
         text = self.yt_transcript_scraper.scrape_transcript(video.video_id)
         video.transcript = text
         self.yt_repository.update_if_exists(video)
 
+    def _fill_transcripts(self, videos: Iterable[YtVideo]) -> None:
+        # the scraper prefetches the next videos whilst transcribing the current one
+        pending: dict[str, YtVideo] = {}
+
+        def video_ids() -> Iterator[str]:
+            for video in videos:
+                pending[video.video_id] = video
+                yield video.video_id
+
+        for video_id, text in self.yt_transcript_scraper.scrape_transcripts(
+            video_ids()
+        ):
+            video = pending.pop(video_id)
+            video.transcript = text
+            self.yt_repository.update_if_exists(video)
+
+    def _iter_missing(self) -> Iterator[YtVideo]:
+        # the ids are read upfront and the videos fetched in small batches, so no cursor
+        # is held open whilst the videos are transcribed (idle cursors time out after
+        # 10 minutes)
+        video_ids = [
+            row["video_id"]
+            for row in self.yt_repository.iter_rows(
+                {"video_id": "video_id"}, self.MISSING_TRANSCRIPT_QUERY
+            )
+        ]
+        batch_size = max(self.BATCH_SIZE, self.workers)
+        for i in range(0, len(video_ids), batch_size):
+            # videos filled in the meantime (by another filler) are skipped
+            yield from list(
+                self.yt_repository.iter_videos(
+                    {
+                        "video_id": {"$in": video_ids[i : i + batch_size]},
+                        **self.MISSING_TRANSCRIPT_QUERY,
+                    }
+                )
+            )
+
     def fill_missing_transcripts(self):
-        for vid in self.yt_repository.get_all_videos():
-            if not vid.transcript:
-                self.fill_transcript(vid)
+        videos = self._iter_missing()
+        if self.workers == 1:
+            self._fill_transcripts(videos)
+            return
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            # the videos are taken from the cursor only as the workers get free
+            in_flight = set()
+            for vid in videos:
+                if len(in_flight) >= self.workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                in_flight.add(executor.submit(self.fill_transcript, vid))
+            for future in in_flight:
+                future.result()
 
 
 def create_transcript_filler(config: dict):
@@ -0,0 +1,109 @@
+import numpy as np
+
+from model.youtube.yt_audio_downloader import SAMPLE_RATE
+
+
+class VoiceActivityDetector:
+    """
+    Finds the speech in 16 kHz mono float32 audio (see YtAudioDownloader), so that
+    silence and other non-speech parts can be dropped before whisper transcribes it.
+    Whisper's compute is proportional to the length of the audio.
+
+    The audio is judged in frames of FRAME_MS, by either of the backends:
+        "energy" - frames much quieter than the loud frames of the audio are dropped
+        "webrtc" - webrtc voice activity detector, tells speech from music and noise
+        as well (requires the webrtcvad package)
+
+    Speech frames separated by less than min_silence_ms are joined into one segment,
+    segments shorter than min_speech_ms are dropped and the rest are padded with
+    padding_ms, so the words aren't cut.
+
+    Example:
+        vad = VoiceActivityDetector("energy")
+        transcript = whisper.transcribe(vad.trim(audio))
+    """
+
+    FRAME_MS = 30
+    # energy backend: frames quieter than the loud frames by dynamic_range_db, or quieter
+    # than the absolute silence level, aren't speech
+    SILENCE_DB = -50.0
+
+    def __init__(
+        self,
+        backend: str = "energy",
+        dynamic_range_db: float = 30.0,
+        aggressiveness: int = 2,
+        min_speech_ms: int = 250,
+        min_silence_ms: int = 500,
+        padding_ms: int = 200,
+    ):
+        if backend == "energy":
+            self._vad = None
+        elif backend == "webrtc":
+            import webrtcvad
+
+            self._vad = webrtcvad.Vad(aggressiveness)
+        else:
+            raise Exception(f"Invalid voice activity detector backend: {backend}")
+
+        self.dynamic_range_db = dynamic_range_db
+        self.min_speech_ms = min_speech_ms
+        self.min_silence_ms = min_silence_ms
+        self.padding_ms = padding_ms
+
+    def speech_segments(self, audio: np.ndarray) -> list[tuple[int, int]]:
+        """
+        Returns (start, end) sample indices of the speech segments, in order and not
+        overlapping
+        """
+        frame = SAMPLE_RATE * self.FRAME_MS // 1000
+        mask = self._speech_frames(audio, frame)
+
+        segments = []
+        speech = np.flatnonzero(mask)
+        if speech.size:
+            # frames separated by a short silence belong to one segment
+            silences = (np.diff(speech) - 1) * self.FRAME_MS
+            breaks = np.flatnonzero(silences >= self.min_silence_ms)
+            starts = np.concatenate([speech[:1], speech[breaks + 1]])
+            ends = np.concatenate([speech[breaks], speech[-1:]]) + 1
+            padding = self.padding_ms * SAMPLE_RATE // 1000
+            for start, end in zip(starts * frame, ends * frame):
+                if (end - start) * 1000 < self.min_speech_ms * SAMPLE_RATE:
+                    continue
+                start, end = max(0, start - padding), min(len(audio), end + padding)
+                if segments and start <= segments[-1][1]:
+                    segments[-1] = (segments[-1][0], end)
+                else:
+                    segments.append((start, end))
+
+        return segments
+
+    def trim(self, audio: np.ndarray) -> np.ndarray:
+        """
+        Returns the speech segments of the audio joined together. Audio without any
+        speech detected is returned as it is, rather than losing its transcript to a
+        misjudged threshold
+        """
+        segments = self.speech_segments(audio)
+        if not segments:
+            return audio
+        return np.concatenate([audio[start:end] for start, end in segments])
+
+    def _speech_frames(self, audio: np.ndarray, frame: int) -> np.ndarray:
+        frames = len(audio) // frame
+        if frames == 0:
+            return np.zeros(0, dtype=bool)
+        framed = audio[: frames * frame].reshape(frames, frame)
+
+        if self._vad is not None:
+            pcm = (np.clip(framed, -1, 1) * 32767).astype(np.int16)
+            return np.array(
+                [self._vad.is_speech(f.tobytes(), SAMPLE_RATE) for f in pcm]
+            )
+
+        rms = np.sqrt(np.mean(framed.astype(np.float64) ** 2, axis=1))
+        db = 20 * np.log10(rms + 1e-10)
+        # relative to the loud frames, so it doesn't depend on the volume of the video
+        threshold = max(np.percentile(db, 95) - self.dynamic_range_db, self.SILENCE_DB)
+        return db > threshold
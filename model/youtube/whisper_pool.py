@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+
+Transcribe = Callable[[np.ndarray], str]
+# loads the model (by name, using given number of threads) in a worker process
+ModelLoader = Callable[[str, int], Transcribe]
+
+
+def load_whisper(model: str, threads: int) -> Transcribe:
+    import torch
+    import whisper
+
+    torch.set_num_threads(threads)
+    whisper_model = whisper.load_model(model, device="cpu")
+    # fp16 isn't supported on cpu
+    return lambda audio: whisper_model.transcribe(audio, fp16=False)["text"]
+
+
+def load_faster_whisper(model: str, threads: int) -> Transcribe:
+    from faster_whisper import WhisperModel
+
+    whisper_model = WhisperModel(
+        model, device="cpu", compute_type="int8", cpu_threads=threads
+    )
+
+    def transcribe(audio: np.ndarray) -> str:
+        segments, _ = whisper_model.transcribe(audio)
+        return "".join(segment.text for segment in segments)
+
+    return transcribe
+
+
+BACKENDS: dict[str, ModelLoader] = {
+    "whisper": load_whisper,
+    "faster-whisper": load_faster_whisper,
+}
+
+# model of the worker process, loaded once by the pool's initializer
+_worker_transcribe: Transcribe | None = None
+
+
+def _load_worker_model(loader: ModelLoader, model: str, threads: int) -> None:
+    global _worker_transcribe
+    _worker_transcribe = loader(model, threads)
+
+
+def _transcribe_in_worker(audio: np.ndarray) -> str:
+    return _worker_transcribe(audio)
+
+
+class WhisperTranscriptionPool:
+    """
+    Transcription service running whisper in several worker processes, so transcripts
+    are extracted on all the cpu cores at once. Each worker loads the model once, when
+    it starts, and then transcribes the audio arrays (16 kHz mono float32, see
+    YtAudioDownloader) taken from the pool's queue.
+
+    The pool can be used in place of WhisperTranscriptExtractor and shared between
+    threads: transcribe blocks the calling thread until its audio is transcribed,
+    submit and transcribe_many queue the audio without waiting.
+
+    Backends:
+        "whisper" - openai-whisper model
+        "faster-whisper" - CTranslate2 model quantized to int8, several times faster
+        on cpu (requires the faster-whisper package)
+
+    Example:
+        pool = WhisperTranscriptionPool("base", workers=4, backend="faster-whisper")
+        transcripts = list(pool.transcribe_many(audios))
+        pool.close()
+    """
+
+    def __init__(
+        self,
+        model: str = "base",
+        workers: int | None = None,
+        backend: str | ModelLoader = "whisper",
+    ):
+        cpus = os.cpu_count() or 1
+        self.workers = workers or cpus
+        # cores are split between the workers, so they don't compete for them
+        threads = max(1, cpus // self.workers)
+
+        if isinstance(backend, str):
+            if backend not in BACKENDS:
+                raise Exception(f"Invalid whisper backend: {backend}")
+            backend = BACKENDS[backend]
+        # spawned workers don't inherit the parent's threads and connections
+        self._executor = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_worker_model,
+            initargs=(backend, model, threads),
+        )
+
+    def submit(self, audio: np.ndarray) -> Future[str]:
+        return self._executor.submit(_transcribe_in_worker, audio)
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        return self.submit(audio).result()
+
+    def transcribe_many(self, audios: Iterable[np.ndarray]) -> Iterator[str]:
+        """
+        Returns transcripts in the order of the audio
+        """
+        return self._executor.map(_transcribe_in_worker, audios)
+
+    def close(self) -> None:
+        self._executor.shutdown()
@@ -1,18 +1,23 @@
-import os
+import threading
 
+import numpy as np
 import whisper
 
 
 class WhisperTranscriptExtractor:
+    """
+    Whisper model loaded in the calling process. The model isn't thread-safe (the
+    decoding hooks its kv-cache into the shared model), so threads sharing the
+    extractor transcribe one at a time; WhisperTranscriptionPool transcribes in parallel
+    """
+
     def __init__(self, model: str = "base"):
         self.model = whisper.load_model(model)
+        self._lock = threading.Lock()
 
-    def transcribe(self, audio_file_path: str, delete_after: bool = True) -> str:
-        text = self.model.transcribe(audio_file_path)["text"]
-        # delete the audio file
-        if delete_after:
-            try:
-                os.remove(audio_file_path)
-            except FileNotFoundError:
-                print(f"file {audio_file_path} not found")
-        return text
+    def transcribe(self, audio: np.ndarray) -> str:
+        """
+        Transcribes 16 kHz mono float32 audio (see YtAudioDownloader)
+        """
+        with self._lock:
+            return self.model.transcribe(audio)["text"]
@@ -0,0 +1,195 @@
+import datetime
+import math
+from dataclasses import dataclass
+
+from model.youtube.core import YtVideo, YtVideoStats
+
+# yt data api returns at most 50 search results per page
+MAX_SEARCH_PAGE_SIZE = 50
+MAX_STATS_BATCH_SIZE = 50
+# snippets of the live and upcoming broadcasts don't have the final views and length yet
+SKIPPED_BROADCASTS = ("live", "upcoming")
+
+
+def search_parameters(
+    topic: str,
+    search_from: datetime.date,
+    search_to: datetime.date,
+    language: str | None = None,
+    max_results: int = MAX_SEARCH_PAGE_SIZE,
+    page_token: str | None = None,
+) -> dict:
+    parameters = {
+        "part": "snippet",
+        "maxResults": max_results,
+        "order": "viewCount",
+        "publishedAfter": f"{search_from}T00:00:00Z",
+        "publishedBefore": f"{search_to}T23:59:59Z",
+        "q": topic,
+        "type": "video",
+    }
+
+    if language:
+        parameters["relevanceLanguage"] = language
+    if page_token:
+        parameters["pageToken"] = page_token
+
+    return parameters
+
+
+def meets_criteria(
+    stats: YtVideoStats | None,
+    min_views: int | None = None,
+    min_video_length: int | None = None,
+) -> bool:
+    if stats is None:
+        return False
+    if min_views and not (stats.views and stats.views >= min_views):
+        return False
+    if min_video_length and not (
+        stats.length_minutes and stats.length_minutes >= min_video_length
+    ):
+        return False
+    return True
+
+
+@dataclass
+class SearchRequest:
+    parameters: dict
+
+
+@dataclass
+class StatsRequest:
+    videos: list[YtVideo]
+
+
+class WindowSearch:
+    """
+    State machine of the top video search within a single time window. It doesn't do
+    any io, the finders execute the requests it returns and feed it the responses:
+
+        search = WindowSearch(...)
+        while (request := search.next_request()) is not None:
+            search.feed(request, execute(request))
+        search.results
+
+    Search results are paged lazily, the first page is sized after the number of
+    wanted videos. Candidates are pre-filtered on the snippet data, and their stats are
+    requested in batches sized after the ratio of the candidates meeting the criteria so
+    far, until max_results videos are found or the candidates run out.
+
+    A failed request can be retried, as the state only changes on feed.
+    """
+
+    def __init__(
+        self,
+        topic: str,
+        search_from: datetime.date,
+        search_to: datetime.date,
+        max_results: int = 10,
+        language: str | None = None,
+        min_video_length: int | None = None,
+        min_views: int | None = None,
+        max_candidates: int | None = None,
+    ):
+        self.topic = topic
+        self.search_from = search_from
+        self.search_to = search_to
+        self.max_results = max_results
+        self.language = language
+        self.min_video_length = min_video_length
+        self.min_views = min_views
+        # by default as many candidates as a single full search page, or wanted videos
+        self.max_candidates = max_candidates or max(MAX_SEARCH_PAGE_SIZE, max_results)
+
+        self.results: list[YtVideo] = []
+        self._candidates: list[YtVideo] = []
+        self._seen_ids = set()
+        self._searched = 0
+        self._checked = 0
+        self._next_page_token = None
+        self._search_exhausted = False
+
+    @property
+    def done(self) -> bool:
+        return len(self.results) >= self.max_results or (
+            not self._candidates and self._search_exhausted
+        )
+
+    def next_request(self) -> SearchRequest | StatsRequest | None:
+        if self.done:
+            return None
+        if self._candidates:
+            return StatsRequest(self._candidates[: self._stats_batch_size()])
+        return SearchRequest(
+            search_parameters(
+                self.topic,
+                self.search_from,
+                self.search_to,
+                self.language,
+                self._search_page_size(),
+                self._next_page_token,
+            )
+        )
+
+    def feed(
+        self,
+        request: SearchRequest | StatsRequest,
+        response: dict | dict[str, YtVideoStats],
+    ) -> None:
+        """
+        Takes the search api response for search request, or stats keyed by video id
+        for stats request
+        """
+        if isinstance(request, SearchRequest):
+            self._feed_search(response)
+        else:
+            self._feed_stats(request.videos, response)
+
+    def _feed_search(self, response: dict) -> None:
+        items = response.get("items", [])
+        self._searched += len(items)
+        self._next_page_token = response.get("nextPageToken")
+        self._search_exhausted = (
+            not items
+            or self._next_page_token is None
+            or self._searched >= self.max_candidates
+        )
+
+        for item in items:
+            if item.get("id").get("kind") != "youtube#video":
+                continue
+            if item.get("snippet").get("liveBroadcastContent") in SKIPPED_BROADCASTS:
+                continue
+            video = YtVideo.from_dict(item)
+            if video.video_id in self._seen_ids:
+                continue
+            self._seen_ids.add(video.video_id)
+            self._candidates.append(video)
+
+    def _feed_stats(
+        self, videos: list[YtVideo], stats: dict[str, YtVideoStats]
+    ) -> None:
+        del self._candidates[: len(videos)]
+        self._checked += len(videos)
+
+        for video in videos:
+            if len(self.results) >= self.max_results:
+                break
+
+            video_stats = stats.get(video.video_id)
+            if meets_criteria(video_stats, self.min_views, self.min_video_length):
+                video.stats = video_stats
+                self.results.append(video)
+
+    def _search_page_size(self) -> int:
+        # a search costs the same quota whatever the page size, so pages are always full
+        # and only the stats lookups are batched by need
+        return min(MAX_SEARCH_PAGE_SIZE, self.max_candidates - self._searched)
+
+    def _stats_batch_size(self) -> int:
+        missing = self.max_results - len(self.results)
+        # laplace smoothed ratio of the checked candidates that met the criteria
+        hit_ratio = (len(self.results) + 1) / (self._checked + 2)
+        size = math.ceil(missing / hit_ratio)
+        return max(1, min(size, MAX_STATS_BATCH_SIZE, len(self._candidates)))
@@ -0,0 +1,33 @@
+import functools
+import json
+import logging
+from typing import Any
+
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build_from_document
+
+API_SERVICE_NAME = "youtube"
+API_VERSION = "v3"
+
+
+@functools.lru_cache(maxsize=None)
+def discovery_document() -> dict:
+    """
+    Returns the yt data api discovery document bundled with google-api-python-client,
+    parsed once per process
+    """
+    document = discovery_cache.get_static_doc(API_SERVICE_NAME, API_VERSION)
+    if document is None:
+        raise Exception(
+            f"{API_SERVICE_NAME} {API_VERSION} discovery document not found "
+            f"in google-api-python-client"
+        )
+    return json.loads(document)
+
+
+def build_yt_client(api_key: str) -> Any:
+    """
+    Builds yt data api client from the cached discovery document, without network access
+    """
+    logging.log(logging.INFO, f"Building the api client, key: {api_key[:11]}...")
+    return build_from_document(discovery_document(), developerKey=api_key)
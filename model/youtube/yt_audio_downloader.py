@@ -1,59 +1,107 @@
-import os
+import subprocess
 
-import yt_dlp as yt
+import numpy as np
 
-from model.youtube.core import YtVideo, get_url_for_vid_id
+from model.youtube.yt_info_extractor import YtInfoExtractor
+
+# whisper models take 16 kHz mono audio
+SAMPLE_RATE = 16_000
 
 
 class YtAudioDownloader:
     """
-    A class to handle downloading of YouTube videos as audio files.
-    Initializer accepts optional length_min parameter, to truncate the length of audio files
+    A class to handle downloading of YouTube videos' audio into memory, decoded as
+    16 kHz mono float32 samples, which whisper takes as is.
+    Initializer accepts optional length_min parameter, to truncate the length of audio
+
+    yt-dlp (the info extractor, which can be shared with the other yt-dlp based
+    components) only resolves the url of the audio stream, ffmpeg streams it and decodes it
+    into a pipe, and stops reading after length_min minutes, so only the needed part of
+    the audio is fetched. Nothing is written to the disk, so downloaders in parallel
+    workers don't interfere.
+
+    With sample_windows > 1, the length_min minutes are taken as that many windows
+    spread evenly across the whole video (ffmpeg seeks to each of them), rather than
+    as the head of the video, which is often just an intro.
 
     Example:
         downloader = YtAudioDownloader(length_min=5)
-        path = downloader.download(YtVideo("https://www.youtube.com/watch?v=dQw4w9WgXcQ"))
+        audio = downloader.load("dQw4w9WgXcQ")
 
     Dependencies:
         yt_dlp, ffmpeg
     """
 
-    # download audio only
-    params = {
-        "format": "bestaudio/best",
-        "outtmpl": "%(id)s.%(ext)s",
-        "postprocessors": [
-            {
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "wav",
-                "preferredquality": "192",
-            }
-        ],
-    }
-
-    def __init__(self, length_min: int = 5):
+    def __init__(
+        self,
+        length_min: int = 5,
+        sample_windows: int = 1,
+        info_extractor: YtInfoExtractor | None = None,
+    ):
         self._length_min = length_min
-        self._ytdl = yt.YoutubeDL(self.params)
-        self._downloaded_files = []
-
-    # returns path to downloaded file
-    def download(self, video_id: str) -> str:
-        url_str = get_url_for_vid_id(video_id)
-        print(f"downloading {url_str}")
-        self._ytdl.download([url_str])
-
-        # if short, then cut the audio to first 5 minutes
-        if self._length_min:
-            l_min = str(self._length_min).zfill(2)
-            os.system(
-                f"ffmpeg -i ./{video_id}.wav -ss 00:00:00 -to 00:{l_min}:00 -c copy ./{video_id}_short.wav"
+        self._sample_windows = sample_windows
+        self._info_extractor = info_extractor or YtInfoExtractor()
+
+    @property
+    def max_audio_bytes(self) -> int | None:
+        """
+        Size of the longest audio load can return, None if the audio isn't truncated
+        """
+        if not self._length_min:
+            return None
+        return self._length_min * 60 * SAMPLE_RATE * np.dtype(np.float32).itemsize
+
+    def load(self, video_id: str) -> np.ndarray:
+        info = self._info_extractor.extract_info(video_id)
+        windows = []
+        for start, seconds in self._windows(info.get("duration")):
+            process = subprocess.run(
+                self._ffmpeg_command(
+                    info["url"], info.get("http_headers", {}), start, seconds
+                ),
+                capture_output=True,
             )
-            os.remove(f"./{video_id}.wav")
-            os.rename(f"./{video_id}_short.wav", f"./{video_id}.wav")
+            if process.returncode != 0:
+                raise Exception(
+                    f"Decoding audio of {video_id} failed: {process.stderr.decode()}"
+                )
+            windows.append(np.frombuffer(process.stdout, np.int16))
+
+        return np.concatenate(windows).astype(np.float32) / 32768.0
+
+    def _windows(self, duration: float | None) -> list[tuple[int, int | None]]:
+        """
+        Returns (start, seconds) of the parts of the audio to load
+        """
+        seconds = self._length_min * 60 if self._length_min else None
+        if (
+            self._sample_windows <= 1
+            or seconds is None
+            or not duration
+            or duration <= seconds
+        ):
+            return [(0, seconds)]
 
-        self._downloaded_files.append(f"{video_id}.wav")
+        window = seconds // self._sample_windows
+        step = (duration - window) / (self._sample_windows - 1)
+        return [(int(i * step), window) for i in range(self._sample_windows)]
 
-        # full path :
-        path = f"{os.getcwd()}/{video_id}.wav"
-        print(path)
-        return path
+    @staticmethod
+    def _ffmpeg_command(
+        url: str, headers: dict[str, str], start: int, seconds: int | None
+    ) -> list[str]:
+        command = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+        if headers:
+            command += [
+                "-headers",
+                "".join(f"{name}: {value}\r\n" for name, value in headers.items()),
+            ]
+        # as input options, the start seeks the stream and the duration stops
+        # the download as well
+        if start:
+            command += ["-ss", str(start)]
+        if seconds:
+            command += ["-t", str(seconds)]
+        command += ["-i", url]
+        command += ["-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-"]
+        return command
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from model.youtube.core import get_url_for_vid_id
+
+# urls of the streams in the info are signed and expire after a few hours
+INFO_TTL = 60 * 60
+
+
+class YtInfoExtractor:
+    """
+    yt-dlp extract_info of the videos, shared by the yt-dlp based stats scraper,
+    transcript scraper and audio downloader, so a video going through the whole pipeline
+    has its watch page fetched and parsed once rather than by each of them.
+
+    The infos are cached in memory for ttl seconds, up to max_entries of the least
+    recently used ones (an info with all the formats takes a few hundred kB).
+    The extractor is thread-safe; threads asking for the same video at once wait for
+    a single extraction. YoutubeDL isn't thread-safe, so every thread extracts with its
+    own instance, created on its first extraction.
+
+    The best audio format is selected, so the url of the info is the audio stream
+    the audio downloader decodes. Stats and subtitles don't depend on the format.
+    """
+
+    params = {"format": "bestaudio/best", "quiet": True}
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = INFO_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._local = threading.local()
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        self._infos: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._extracting: dict[str, threading.Lock] = {}
+
+    def extract_info(self, video_id: str) -> dict:
+        info = self._cached(video_id)
+        if info is not None:
+            return info
+
+        with self._lock:
+            video_lock = self._extracting.setdefault(video_id, threading.Lock())
+        with video_lock:
+            # another thread might have extracted it in the meantime
+            info = self._cached(video_id)
+            if info is not None:
+                return info
+
+            try:
+                info = self._ytdl().extract_info(
+                    get_url_for_vid_id(video_id), download=False
+                )
+                with self._lock:
+                    self._infos[video_id] = (self._clock() + self._ttl, info)
+                    self._infos.move_to_end(video_id)
+                    while len(self._infos) > self._max_entries:
+                        self._infos.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._extracting.pop(video_id, None)
+            return info
+
+    def _ytdl(self):
+        ytdl = getattr(self._local, "ytdl", None)
+        if ytdl is None:
+            import yt_dlp as yt
+
+            ytdl = self._local.ytdl = yt.YoutubeDL(self.params)
+        return ytdl
+
+    def _cached(self, video_id: str) -> dict | None:
+        with self._lock:
+            entry = self._infos.get(video_id)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._infos[video_id]
+                return None
+            self._infos.move_to_end(video_id)
+            return entry[1]
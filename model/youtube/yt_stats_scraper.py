@@ -1,65 +1,104 @@
+import logging
 import re
 
-from model.youtube.core import (IYtStatsScraper, YtVideoStats,
-                                get_url_for_vid_id)
+from model.youtube.api_key_pool import ApiKeyPool
+from model.youtube.core import IYtStatsScraper, YtVideoStats
+from model.youtube.response_cache import ResponseCache
+from model.youtube.yt_info_extractor import YtInfoExtractor
+
+
+def get_duration_in_minutes(duration: str) -> float:
+    duration_regex = re.compile(
+        r"PT((?P<hours>\d+)H)?((?P<minutes>\d+)M)?((?P<seconds>\d+)S)?"
+    )
+    matches = duration_regex.match(duration)
+    if not matches:
+        return 0
+    hours = int(matches.group("hours")) if matches.group("hours") else 0
+    minutes = int(matches.group("minutes")) if matches.group("minutes") else 0
+    seconds = int(matches.group("seconds")) if matches.group("seconds") else 0
+    total_minutes = hours * 60 + minutes + seconds / 60.0
+    return round(total_minutes, 2)
+
+
+def stats_from_api_item(item: dict) -> YtVideoStats:
+    """
+    Creates video stats from yt data api videos resource with statistics and contentDetails parts
+    """
+    return YtVideoStats(
+        views=int(item.get("statistics").get("viewCount", 0)),
+        comments=int(item.get("statistics").get("commentCount", 0)),
+        likes=int(item.get("statistics").get("likeCount", 0)),
+        length_minutes=get_duration_in_minutes(
+            item.get("contentDetails").get("duration")
+        ),
+    )
 
 
 class YtApiStatsScraper(IYtStatsScraper):
+    """
+    Scrapes the stats using yt data api. Requests are made either with the api key pool
+    or with the api client set directly, and go through the response cache, if it's set.
+    """
+
+    # videos.list accepts up to 50 ids per call, at the same quota cost as a single one
+    MAX_IDS_PER_REQUEST = 50
+
     def __init__(self):
         self._yt_client = None
-        self._key_manager = None
+        self._key_pool = None
+        self._response_cache = None
 
     def scrape_stats(self, video_id: str) -> YtVideoStats:
-        if self._yt_client is None:
+        return self.scrape_stats_many([video_id]).get(video_id)
+
+    def scrape_stats_many(self, video_ids: list[str]) -> dict[str, YtVideoStats]:
+        if self._yt_client is None and self._key_pool is None:
             raise Exception("YtApiStatsScraper: yt_client is not set")
 
-        video_stats = None
-
-        def _get_duration_in_minutes(duration):
-            duration_regex = re.compile(
-                r"PT((?P<hours>\d+)H)?((?P<minutes>\d+)M)?((?P<seconds>\d+)S)?"
-            )
-            matches = duration_regex.match(duration)
-            if not matches:
-                return 0
-            hours = int(matches.group("hours")) if matches.group("hours") else 0
-            minutes = int(matches.group("minutes")) if matches.group("minutes") else 0
-            seconds = int(matches.group("seconds")) if matches.group("seconds") else 0
-            total_minutes = hours * 60 + minutes + seconds / 60.0
-            return round(total_minutes, 2)
-
-        request = self._yt_client.videos().list(
-            part="statistics,contentDetails",
-            id=video_id,
-        )
+        video_stats = {}
 
-        response = request.execute()
-        items = response.get("items", [])
-        if len(items) > 0:
-            video_stats = YtVideoStats(
-                views=int(items[0].get("statistics").get("viewCount", 0)),
-                comments=int(items[0].get("statistics").get("commentCount", 0)),
-                likes=int(items[0].get("statistics").get("likeCount", 0)),
-                length_minutes=_get_duration_in_minutes(
-                    items[0].get("contentDetails").get("duration")
-                ),
-            )
+        for i in range(0, len(video_ids), self.MAX_IDS_PER_REQUEST):
+            response = self._list_videos(video_ids[i : i + self.MAX_IDS_PER_REQUEST])
+            for item in response.get("items", []):
+                video_stats[item["id"]] = stats_from_api_item(item)
 
         return video_stats
 
     def set_yt_api_client(self, yt_client):
         self._yt_client = yt_client
 
+    def set_key_pool(self, key_pool: ApiKeyPool):
+        self._key_pool = key_pool
 
-class YtDlpStatsScraper(IYtStatsScraper):
-    def __init__(self):
-        import yt_dlp as yt
+    def set_response_cache(self, response_cache: ResponseCache):
+        self._response_cache = response_cache
 
-        self._yt = yt.YoutubeDL()
+    def _list_videos(self, video_ids: list[str]) -> dict:
+        parameters = {
+            "part": "statistics,contentDetails",
+            "id": ",".join(video_ids),
+            "maxResults": self.MAX_IDS_PER_REQUEST,
+        }
+
+        def fetch():
+            if self._key_pool is not None:
+                return self._key_pool.execute(
+                    "videos", lambda yt_client: yt_client.videos().list(**parameters)
+                )
+            return self._yt_client.videos().list(**parameters).execute()
+
+        if self._response_cache is None:
+            return fetch()
+        return self._response_cache.get_or_fetch("videos", parameters, fetch)
+
+
+class YtDlpStatsScraper(IYtStatsScraper):
+    def __init__(self, info_extractor: YtInfoExtractor | None = None):
+        self._info_extractor = info_extractor or YtInfoExtractor()
 
     def scrape_stats(self, video_id: str) -> YtVideoStats:
-        vid_url = get_url_for_vid_id(video_id)
-        info_ = self._yt.extract_info(vid_url, download=False)
+        info_ = self._info_extractor.extract_info(video_id)
 
         view_count = info_.get("view_count", None)
         comments = info_.get("comment_count", None)
@@ -73,3 +112,15 @@ class YtDlpStatsScraper(IYtStatsScraper):
             likes=likes,
             length_minutes=length_minutes,
         )
+
+    def scrape_stats_many(self, video_ids: list[str]) -> dict[str, YtVideoStats]:
+        stats = {}
+        for video_id in video_ids:
+            # private, removed or age-restricted videos can't be extracted
+            try:
+                stats[video_id] = self.scrape_stats(video_id)
+            except Exception as e:
+                logging.log(
+                    logging.WARNING, f"Scraping stats of {video_id} failed: {e}"
+                )
+        return stats
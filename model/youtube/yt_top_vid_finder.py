@@ -2,51 +2,48 @@ import datetime
 import logging
 from typing import Any, Generator
 
-from googleapiclient.discovery import build
-
+from model.youtube.api_key_pool import ApiKeyPool
 from model.youtube.core import (IYtStatsScraper, IYtTopVideoFinder, YtVideo,
-                                YtVideoStats)
+                                YtVideoStats, iter_time_windows)
+from model.youtube.response_cache import ResponseCache
+from model.youtube.window_search import StatsRequest, WindowSearch
+from model.youtube.yt_api_client import build_yt_client
 from model.youtube.yt_stats_scraper import YtApiStatsScraper
 
 
 class YtTopVideoFinder(IYtTopVideoFinder):
     """
     A class that finds top yt videos and their stats for specified parameters.
-    Class handles multiple yt data api keys and after exhausting quota jumps to next one.
+    Requests are spread across multiple yt data api keys by the api key pool, which
+    keeps track of the quota left on each of them.
 
-    Initializer accepts list of api keys and optional stats scraper dependency.
-    If stats scraper is not provided, it creates the stats scraper using yt data api, using keys
+    Initializer accepts list of api keys and optional stats scraper, key pool and
+    response cache dependencies. If stats scraper is not provided, it creates the stats
+    scraper using yt data api, using keys
     """
 
-    # Todo: remove the key handling responsibility from this class
-
-    API_SERVICE_NAME = "youtube"
-    API_VERSION = "v3"
-
-    def __init__(self, api_keys: list[str], stats_scraper: IYtStatsScraper = None):
-        self._api_keys = api_keys
-        self._api_key_index = 0
-
-        self._youtube = self._build_client()
+    def __init__(
+        self,
+        api_keys: list[str],
+        stats_scraper: IYtStatsScraper = None,
+        key_pool: ApiKeyPool = None,
+        response_cache: ResponseCache = None,
+    ):
+        self._key_pool = key_pool or ApiKeyPool(
+            api_keys, client_factory=lambda api_key: self._build_client(api_key)
+        )
+        self._response_cache = response_cache
         self._stats_scraper = stats_scraper
 
         if stats_scraper is None:
             self._stats_scraper = YtApiStatsScraper()
-            self._stats_scraper.set_yt_api_client(self._youtube)
+        if isinstance(self._stats_scraper, YtApiStatsScraper):
+            self._stats_scraper.set_key_pool(self._key_pool)
+            if response_cache is not None:
+                self._stats_scraper.set_response_cache(response_cache)
 
-    def _build_client(self) -> Any:
-        api_key = self._api_keys[self._api_key_index]
-        logging.log(
-            logging.WARNING,
-            f"Rebuilding the api client, key: {api_key}. "
-            f"Current key index: {self._api_key_index}",
-        )
-
-        return build(
-            self.API_SERVICE_NAME,
-            self.API_VERSION,
-            developerKey=api_key,
-        )
+    def _build_client(self, api_key: str) -> Any:
+        return build_yt_client(api_key)
 
     def scrape_top_videos_with_stats(
         self,
@@ -58,129 +55,66 @@ class YtTopVideoFinder(IYtTopVideoFinder):
         language: str = None,
         min_video_length: int = 5,
         min_views: int | None = None,
+        skip_windows: set[tuple[datetime.date, datetime.date]] | None = None,
     ) -> Generator[list[YtVideo], None, None]:
         """
-        Returns a generator of lists of videos, where each list is the top videos for a given time delta
+        Returns a generator of lists of videos, where each list is the top videos for a given time delta.
+        Windows in skip_windows (e.g. already processed ones) aren't searched
         """
-        delta = datetime.timedelta(days=time_delta)
-
-        search_from = date_start
-        search_to = date_start + delta
-
-        while search_from <= date_end:
-            if search_to > date_end:
-                search_to = date_end
-
-            logging.log(
-                logging.DEBUG,
-                f"Attempting youtube api search : \n"
-                f"topic: {topic}, from: {search_from} , to: {search_to}",
+        for search_from, search_to in iter_time_windows(
+            date_start, date_end, time_delta
+        ):
+            if skip_windows and (search_from, search_to) in skip_windows:
+                continue
+
+            window = WindowSearch(
+                topic,
+                search_from,
+                search_to,
+                max_results_per_time_delta,
+                language,
+                min_video_length,
+                min_views,
             )
 
-            parameters = {
-                "part": "snippet",
-                "maxResults": 100,
-                "order": "viewCount",
-                "publishedAfter": f"{search_from}T00:00:00Z",
-                "publishedBefore": f"{search_to}T23:59:59Z",
-                "q": topic,
-                "type": "video",
-            }
-
-            if language:
-                parameters["relevanceLanguage"] = language
-
-            try:
-                request = self._youtube.search().list(
-                    **parameters,
-                )
-                response = request.execute()
-                items = response.get("items", [])
-                search_results = [
-                    YtVideo.from_dict(item)
-                    for item in items
-                    if item.get("id").get("kind") == "youtube#video"
-                ]
-
-                filtered_batch = []
-
-                for vid in search_results:
-                    stats = self.scrape_video_stats(vid)
-
-                    if len(filtered_batch) >= max_results_per_time_delta:
-                        break
-                    meets_criteria = False
-
-                    if min_views:
-                        meets_criteria = stats.views and stats.views >= min_views
-
-                    if min_video_length:
-                        meets_criteria = (
-                            stats.length_minutes
-                            and stats.length_minutes >= min_video_length
-                        )
-
-                    if meets_criteria:
-                        vid.stats = stats
-                        filtered_batch.append(vid)
-
-                yield filtered_batch
-
-            # Todo: add more specific exception handling
-            except Exception as e:
-                print(f"Exception: {e}")
+            while (request := window.next_request()) is not None:
+                if isinstance(request, StatsRequest):
+                    window.feed(request, self.scrape_videos_stats(request.videos))
+                    continue
 
-                # if we hit the quota limit, switch to the next api key
-                # if we run out of api keys, throw the exception, log progress and exit
+                logging.log(
+                    logging.DEBUG,
+                    f"Attempting youtube api search : \n"
+                    f"topic: {topic}, from: {search_from} , to: {search_to}",
+                )
 
-                if self._next_key():
-                    continue
-                else:
+                try:
+                    response = self._search(request.parameters)
+                except Exception:
                     logging.log(
                         logging.ERROR,
-                        f"Ran out of api keys whilst searching:"
-                        f"topic : {topic} , date range : {date_start} - {date_end}"
+                        f"Search failed: "
+                        f"topic : {topic} , date range : {date_start} - {date_end} "
                         f"on segment from : {search_from} , search_to : {search_to}",
                     )
-                    raise Exception("quota limit reached")
+                    raise
 
-            search_from += delta
-            search_to += delta
+                window.feed(request, response)
 
-    def _next_key(self) -> bool:
-        logging.log(
-            logging.WARNING,
-            f"Switching the api key, as the {self._api_key_index} "
-            f"key quota has been reached",
-        )
+            yield window.results
 
-        if self._api_key_index >= len(self._api_keys) - 1:
-            logging.log(
-                logging.ERROR,
-                f"All api keys used. Current index: {self._api_key_index}."
-                f" Cant build new client",
+    def _search(self, parameters: dict) -> dict:
+        def fetch():
+            return self._key_pool.execute(
+                "search", lambda youtube: youtube.search().list(**parameters)
             )
 
-            return False
+        if self._response_cache is None:
+            return fetch()
+        return self._response_cache.get_or_fetch("search", parameters, fetch)
 
-        self._api_key_index += 1
-        self._youtube = self._build_client()
-
-        return True
-
-    def scrape_video_stats(self, video: YtVideo) -> YtVideoStats:
+    def scrape_videos_stats(self, videos: list[YtVideo]) -> dict[str, YtVideoStats]:
         logging.log(
-            logging.DEBUG, f"Attempting stats scraping for video, id : {video.video_id}"
+            logging.DEBUG, f"Attempting stats scraping for {len(videos)} videos"
         )
-
-        try:
-            return self._stats_scraper.scrape_stats(video.video_id)
-        except Exception as e:
-            # if we hit the quota limit, switch to the next api key
-            # if we run out of api keys, throw the exception, log progress and exit
-
-            if isinstance(self._stats_scraper, YtApiStatsScraper) and self._next_key():
-                self._stats_scraper.set_yt_api_client(self._youtube)
-                return self.scrape_video_stats(video)
-            else:
-                raise e
+        return self._stats_scraper.scrape_stats_many([v.video_id for v in videos])
@@ -0,0 +1,252 @@
+import asyncio
+import collections
+import datetime
+import logging
+from typing import Generator
+
+import aiohttp
+
+from model.youtube.api_key_pool import (RATE_LIMIT_RETRIES, ApiKeyPool,
+                                        backoff_delay, is_quota_error,
+                                        is_rate_limit_error)
+from model.youtube.core import (IYtStatsScraper, IYtTopVideoFinder, YtVideo,
+                                YtVideoStats, iter_time_windows)
+from model.youtube.response_cache import ResponseCache
+from model.youtube.window_search import StatsRequest, WindowSearch
+from model.youtube.yt_stats_scraper import (YtApiStatsScraper,
+                                            stats_from_api_item)
+
+
+class AsyncYtTopVideoFinder(IYtTopVideoFinder):
+    """
+    Asyncio based implementation of the top video finder. It calls the yt data api
+    directly through aiohttp and searches up to max_concurrent_windows time delta windows
+    at the same time, with at most max_concurrent_requests http requests in flight.
+
+    Initializer accepts list of api keys and optional stats scraper, key pool and
+    response cache dependencies. If stats scraper is not provided, the stats are scraped using yt data
+    api, using keys from the key pool.
+    Blocking stats scrapers (e.g. yt-dlp) are run in worker threads.
+
+    scrape_top_videos_with_stats is a regular generator, yielding the windows in order.
+    The search runs only inside of the generator's next call, nothing is searched ahead
+    whilst the caller processes a yielded batch.
+    """
+
+    API_URL = "https://www.googleapis.com/youtube/v3"
+    MAX_IDS_PER_REQUEST = YtApiStatsScraper.MAX_IDS_PER_REQUEST
+
+    def __init__(
+        self,
+        api_keys: list[str],
+        stats_scraper: IYtStatsScraper = None,
+        max_concurrent_windows: int = 5,
+        max_concurrent_requests: int = 10,
+        key_pool: ApiKeyPool = None,
+        response_cache: ResponseCache = None,
+    ):
+        self._key_pool = key_pool or ApiKeyPool(api_keys)
+        self._response_cache = response_cache
+        self._stats_scraper = stats_scraper
+        self._max_concurrent_windows = max_concurrent_windows
+        self._max_concurrent_requests = max_concurrent_requests
+
+    def scrape_top_videos_with_stats(
+        self,
+        topic: str,
+        date_start: datetime.date,
+        date_end: datetime.date,
+        time_delta: int,
+        max_results_per_time_delta: int = 10,
+        language: str = None,
+        min_video_length: int = 5,
+        min_views: int | None = None,
+        skip_windows: set[tuple[datetime.date, datetime.date]] | None = None,
+    ) -> Generator[list[YtVideo], None, None]:
+        """
+        Returns a generator of lists of videos, where each list is the top videos for a given time delta.
+        Windows in skip_windows (e.g. already processed ones) aren't searched
+        """
+        loop = asyncio.new_event_loop()
+        session = loop.run_until_complete(self._create_session())
+        request_semaphore = asyncio.Semaphore(self._max_concurrent_requests)
+
+        windows = (
+            window
+            for window in iter_time_windows(date_start, date_end, time_delta)
+            if not skip_windows or window not in skip_windows
+        )
+        pending = collections.deque()
+
+        def schedule_next_window() -> None:
+            window = next(windows, None)
+            if window is not None:
+                pending.append(
+                    loop.create_task(
+                        self._scrape_window(
+                            session,
+                            request_semaphore,
+                            topic,
+                            *window,
+                            max_results_per_time_delta,
+                            language,
+                            min_video_length,
+                            min_views,
+                        )
+                    )
+                )
+
+        try:
+            for _ in range(self._max_concurrent_windows):
+                schedule_next_window()
+
+            # the scheduled windows run concurrently only whilst we wait for the oldest
+            # one; the loop (and so the search) is paused whilst the caller has a batch
+            while pending:
+                batch = loop.run_until_complete(pending[0])
+                pending.popleft()
+                schedule_next_window()
+                yield batch
+        except Exception:
+            logging.log(
+                logging.ERROR,
+                f"Search failed: topic : {topic} , date range : {date_start} - {date_end}",
+            )
+            raise
+        finally:
+            for task in pending:
+                task.cancel()
+            loop.run_until_complete(self._close(session, pending))
+            loop.close()
+
+    async def _create_session(self) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession()
+
+    async def _close(
+        self, session: aiohttp.ClientSession, pending: collections.deque
+    ) -> None:
+        await asyncio.gather(*pending, return_exceptions=True)
+        await session.close()
+
+    async def _scrape_window(
+        self,
+        session: aiohttp.ClientSession,
+        request_semaphore: asyncio.Semaphore,
+        topic: str,
+        search_from: datetime.date,
+        search_to: datetime.date,
+        max_results_per_time_delta: int,
+        language: str | None,
+        min_video_length: int,
+        min_views: int | None,
+    ) -> list[YtVideo]:
+        logging.log(
+            logging.DEBUG,
+            f"Attempting youtube api search : \n"
+            f"topic: {topic}, from: {search_from} , to: {search_to}",
+        )
+
+        window = WindowSearch(
+            topic,
+            search_from,
+            search_to,
+            max_results_per_time_delta,
+            language,
+            min_video_length,
+            min_views,
+        )
+
+        while (request := window.next_request()) is not None:
+            if isinstance(request, StatsRequest):
+                response = await self._scrape_videos_stats(
+                    session, request_semaphore, request.videos
+                )
+            else:
+                response = await self._get(
+                    session, request_semaphore, "search", request.parameters
+                )
+            window.feed(request, response)
+
+        return window.results
+
+    async def _scrape_videos_stats(
+        self,
+        session: aiohttp.ClientSession,
+        request_semaphore: asyncio.Semaphore,
+        videos: list[YtVideo],
+    ) -> dict[str, YtVideoStats]:
+        logging.log(
+            logging.DEBUG, f"Attempting stats scraping for {len(videos)} videos"
+        )
+        video_ids = [video.video_id for video in videos]
+
+        if self._stats_scraper is not None:
+            async with request_semaphore:
+                return await asyncio.to_thread(
+                    self._stats_scraper.scrape_stats_many, video_ids
+                )
+
+        responses = await asyncio.gather(
+            *[
+                self._get(
+                    session,
+                    request_semaphore,
+                    "videos",
+                    {
+                        "part": "statistics,contentDetails",
+                        "id": ",".join(video_ids[i : i + self.MAX_IDS_PER_REQUEST]),
+                        "maxResults": self.MAX_IDS_PER_REQUEST,
+                    },
+                )
+                for i in range(0, len(video_ids), self.MAX_IDS_PER_REQUEST)
+            ]
+        )
+        return {
+            item["id"]: stats_from_api_item(item)
+            for response in responses
+            for item in response.get("items", [])
+        }
+
+    async def _get(
+        self,
+        session: aiohttp.ClientSession,
+        request_semaphore: asyncio.Semaphore,
+        endpoint: str,
+        parameters: dict,
+    ) -> dict:
+        if self._response_cache is not None:
+            cached_response = self._response_cache.get(endpoint, parameters)
+            if cached_response is not None:
+                return cached_response
+
+        while True:
+            api_key = self._key_pool.acquire(endpoint)
+            for attempt in range(RATE_LIMIT_RETRIES + 1):
+                async with request_semaphore:
+                    async with session.get(
+                        f"{self.API_URL}/{endpoint}",
+                        params={**parameters, "key": api_key},
+                    ) as response:
+                        status = response.status
+                        body = await response.json(content_type=None)
+
+                # the short term rate limit is waited out on the same key
+                if (
+                    not is_rate_limit_error(status, body)
+                    or attempt == RATE_LIMIT_RETRIES
+                ):
+                    break
+                await asyncio.sleep(backoff_delay(attempt))
+
+            if status < 400:
+                if self._response_cache is not None:
+                    self._response_cache.put(endpoint, parameters, body)
+                return body
+
+            if is_quota_error(status, body):
+                # if we hit the quota limit, retry with another key
+                # if we run out of api keys, the key pool throws the exception
+                self._key_pool.mark_exhausted(api_key)
+                continue
+
+            raise Exception(f"Youtube api {endpoint} request failed: {status} {body}")
@@ -1,27 +1,59 @@
-from typing import Protocol
+from typing import Iterable, Iterator, Protocol
 
-from model.youtube.core import (IYtTranscriptScraper, YtVideo,
-                                get_url_for_vid_id)
+import numpy as np
+
+from model.youtube.core import IYtTranscriptScraper, YtVideo
+from model.youtube.prefetching_audio_downloader import \
+    PrefetchingAudioDownloader
+from model.youtube.voice_activity import VoiceActivityDetector
+from model.youtube.whisper_pool import WhisperTranscriptionPool
 from model.youtube.whisper_transcript import WhisperTranscriptExtractor
 from model.youtube.yt_audio_downloader import YtAudioDownloader
+from model.youtube.yt_info_extractor import YtInfoExtractor
 
 
 class YtWhisperTranscriptScraper(IYtTranscriptScraper):
     """
     Class responsible for extracting video transcript.
-    It depends on the whisper transcript extractor and on audio downloader.
+    It depends on the whisper transcript extractor (threads sharing the scraper take
+    turns to transcribe) or the pool of whisper workers (lets them transcribe in
+    parallel), and on audio downloader.
+
+    scrape_transcripts downloads audio of the next prefetch videos (within
+    memory_budget_mb) whilst the current one is being transcribed.
+    With the voice activity detector, only the speech of the audio is transcribed.
     """
 
     def __init__(
         self,
-        whisper: WhisperTranscriptExtractor,
+        whisper: WhisperTranscriptExtractor | WhisperTranscriptionPool,
         yt_audio_downloader: YtAudioDownloader,
+        prefetch: int = 2,
+        memory_budget_mb: int = 512,
+        vad: VoiceActivityDetector | None = None,
     ):
         self._whisper = whisper
         self._yt_audio_downloader = yt_audio_downloader
+        self._prefetch = prefetch
+        self._memory_budget_mb = memory_budget_mb
+        self._vad = vad
 
     def scrape_transcript(self, video_id: str) -> str | None:
-        return self._whisper.transcribe(self._yt_audio_downloader.download(video_id))
+        return self._transcribe(self._yt_audio_downloader.load(video_id))
+
+    def scrape_transcripts(
+        self, video_ids: Iterable[str]
+    ) -> Iterator[tuple[str, str | None]]:
+        prefetcher = PrefetchingAudioDownloader(
+            self._yt_audio_downloader, self._prefetch, self._memory_budget_mb
+        )
+        for video_id, audio in prefetcher.load_many(video_ids):
+            yield video_id, self._transcribe(audio)
+
+    def _transcribe(self, audio: np.ndarray) -> str:
+        if self._vad is not None:
+            audio = self._vad.trim(audio)
+        return self._whisper.transcribe(audio)
 
 
 class YtDlpTranscriptScraper(IYtTranscriptScraper):
@@ -31,18 +63,19 @@ class YtDlpTranscriptScraper(IYtTranscriptScraper):
     Warning! Sometimes the auto captions are VERY bad and limited
     """
 
-    def __init__(self, include_auto_captions: bool = True):
+    def __init__(
+        self,
+        include_auto_captions: bool = True,
+        info_extractor: YtInfoExtractor | None = None,
+    ):
         self._include_auto_captions = include_auto_captions
-        import yt_dlp as yt
-
-        self._yt = yt.YoutubeDL()
+        self._info_extractor = info_extractor or YtInfoExtractor()
 
     def scrape_transcript(self, video_id: str) -> str | None:
         import requests
 
         try:
-            url_str = get_url_for_vid_id(video_id)
-            info_ = self._yt.extract_info(url_str, download=False)
+            info_ = self._info_extractor.extract_info(video_id)
 
             # manual captions
             captions = info_.get("subtitles", {}).get("en", None)
@@ -66,6 +99,12 @@ class YtDlpTranscriptScraper(IYtTranscriptScraper):
             print("Error scraping transcript" + str(e))
             return None
 
+    def scrape_transcripts(
+        self, video_ids: Iterable[str]
+    ) -> Iterator[tuple[str, str | None]]:
+        for video_id in video_ids:
+            yield video_id, self.scrape_transcript(video_id)
+
     def _process_sub_request_response(self, text: str) -> str | None:
         import re
 
@@ -121,6 +160,10 @@ class ComboYtTranscriptScraper(IYtTranscriptScraper):
     Class responsible for extracting video transcript.
     It firstly tries to obtain captions using yt-dlp as a cheap method (only manual captions by default),
     if the captions are not available, then it uses whisper extractor.
+    An extractor (or pool) shared with other scrapers can be passed in, otherwise the
+    scraper loads its own whisper_model. sample_windows and vad are passed to the audio
+    downloader and the whisper scraper. The info extractor can be shared with the stats
+    scraper as well.
     """
 
     def __init__(
@@ -128,12 +171,20 @@ class ComboYtTranscriptScraper(IYtTranscriptScraper):
         whisper_model: str = "base",
         length_min: int = 5,
         auto_captions: bool = False,
+        whisper: WhisperTranscriptExtractor | WhisperTranscriptionPool | None = None,
+        sample_windows: int = 1,
+        vad: VoiceActivityDetector | None = None,
+        info_extractor: YtInfoExtractor | None = None,
     ):
+        # the captions lookup and the audio downloader share the video's info
+        info_extractor = info_extractor or YtInfoExtractor()
         self.scraper = YtWhisperTranscriptScraper(
-            WhisperTranscriptExtractor(whisper_model), YtAudioDownloader(length_min)
+            whisper or WhisperTranscriptExtractor(whisper_model),
+            YtAudioDownloader(length_min, sample_windows, info_extractor),
+            vad=vad,
         )
 
-        self.yt_dlp_scraper = YtDlpTranscriptScraper(auto_captions)
+        self.yt_dlp_scraper = YtDlpTranscriptScraper(auto_captions, info_extractor)
 
     def scrape_transcript(self, video_id: str) -> str | None:
         transcript = self.yt_dlp_scraper.scrape_transcript(video_id)
@@ -142,3 +193,23 @@ class ComboYtTranscriptScraper(IYtTranscriptScraper):
             transcript = self.scraper.scrape_transcript(video_id)
 
         return transcript
+
+    def scrape_transcripts(
+        self, video_ids: Iterable[str]
+    ) -> Iterator[tuple[str, str | None]]:
+        captioned = []
+
+        def without_captions() -> Iterator[str]:
+            for video_id in video_ids:
+                transcript = self.yt_dlp_scraper.scrape_transcript(video_id)
+                if transcript is None:
+                    yield video_id
+                else:
+                    captioned.append((video_id, transcript))
+
+        # the captions are looked up as the whisper scraper takes the next videos
+        for video_id, transcript in self.scraper.scrape_transcripts(without_captions()):
+            yield from captioned
+            captioned.clear()
+            yield video_id, transcript
+        yield from captioned
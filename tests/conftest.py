@@ -0,0 +1,22 @@
+import datetime
+
+import mongomock
+import pytest
+
+from model.persistence.mongo import YtVideoMongoRepository
+from model.youtube.core import YtVideo, YtVideoStats
+
+
+def make_video(video_id: str, title: str | None = None, views: int = 100) -> YtVideo:
+    return YtVideo(
+        video_id=video_id,
+        title=title or f"title {video_id}",
+        channel="channel",
+        date=datetime.datetime(2023, 1, 1, 12, 0),
+        stats=YtVideoStats(views=views, likes=10, comments=1, length_minutes=10),
+    )
+
+
+@pytest.fixture
+def repository() -> YtVideoMongoRepository:
+    return YtVideoMongoRepository(mongomock.MongoClient().db.collection)
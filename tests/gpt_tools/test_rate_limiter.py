@@ -0,0 +1,36 @@
+from model.gpt_tools.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_acquire_should_wait_for_requests_per_minute_limit():
+    clock = FakeClock()
+    limiter = RateLimiter(2, 1_000, clock=clock, sleep=clock.sleep)
+
+    for _ in range(3):
+        limiter.acquire(10)
+
+    assert clock.sleeps == [30.0]
+
+
+def test_acquire_should_wait_for_tokens_per_minute_limit():
+    clock = FakeClock()
+    limiter = RateLimiter(100, 600, clock=clock, sleep=clock.sleep)
+
+    limiter.acquire(500)
+    limiter.acquire(200)
+    # requests over the limit wait for the whole bucket, instead of forever
+    limiter.acquire(1_000)
+
+    assert clock.sleeps == [10.0, 60.0]
@@ -0,0 +1,38 @@
+"""
+Query plans can only be checked against a real mongo server, mongomock doesn't support explain
+"""
+import datetime
+
+import pymongo
+import pytest
+
+from config_data_provider import get_mongo_db_url
+from model.persistence.mongo import YtVideoMongoRepository
+
+
+@pytest.fixture(scope="module")
+def repository() -> YtVideoMongoRepository:
+    collection = pymongo.MongoClient(get_mongo_db_url())["test_scrape"]["videos"]
+    collection.drop()
+    repository = YtVideoMongoRepository(collection)
+    repository.ensure_indexes()
+    yield repository
+    collection.drop()
+
+
+def test_video_id_lookup_should_use_index(repository):
+    assert not repository.uses_collection_scan({"video_id": "dQw4w9WgXcQ"})
+
+
+def test_date_range_query_should_use_index(repository):
+    query = repository._date_query(datetime.date(2020, 1, 1), datetime.date(2020, 2, 1))
+    assert not repository.uses_collection_scan(query)
+
+
+def test_views_range_query_should_use_index(repository):
+    query = repository._views_query(1000, 1_000_000)
+    assert not repository.uses_collection_scan(query)
+
+
+def test_unindexed_query_should_be_reported_as_collection_scan(repository):
+    assert repository.uses_collection_scan({"title": "Never Gonna Give You Up"})
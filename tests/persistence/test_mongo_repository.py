@@ -0,0 +1,163 @@
+import datetime
+
+import pytest
+
+from tests.conftest import make_video
+
+
+def test_add_many_should_add_only_new_videos_and_keep_existing_untouched(repository):
+    repository.add_if_doesnt_exist(make_video("a", title="original"))
+
+    added = repository.add_many([make_video("b"), make_video("a", title="changed")])
+
+    assert added == [True, False]
+    assert repository.get_video("a").title == "original"
+    assert repository.get_video("b") is not None
+
+
+def test_upsert_many_should_add_and_overwrite_videos(repository):
+    repository.add_if_doesnt_exist(make_video("a", title="original"))
+
+    upserted = repository.upsert_many(
+        [make_video("a", title="changed"), make_video("b")]
+    )
+
+    assert upserted == [True, True]
+    assert repository.get_video("a").title == "changed"
+    assert len(repository.get_all_videos()) == 2
+
+
+def test_update_many_should_update_only_existing_videos(repository):
+    repository.add_many([make_video("a"), make_video("b")])
+
+    updated = repository.update_many(
+        [make_video("a", views=1), make_video("c", views=1), make_video("b", views=2)]
+    )
+
+    assert updated == [True, False, True]
+    assert repository.get_video("a").stats.views == 1
+    assert repository.get_video("b").stats.views == 2
+    assert repository.get_video("c") is None
+
+
+def test_bulk_methods_should_issue_single_bulk_write_per_batch(repository):
+    videos = [make_video(str(i)) for i in range(100)]
+    calls = []
+    bulk_write = repository.collection.bulk_write
+
+    def counting_bulk_write(*args, **kwargs):
+        calls.append(args)
+        return bulk_write(*args, **kwargs)
+
+    repository.collection.bulk_write = counting_bulk_write
+
+    assert all(repository.add_many(videos))
+    assert all(repository.update_many(videos))
+    assert len(calls) == 2
+
+
+def test_bulk_methods_should_accept_empty_batch(repository):
+    assert repository.add_many([]) == []
+    assert repository.upsert_many([]) == []
+    assert repository.update_many([]) == []
+
+
+def test_ensure_indexes_should_create_unique_video_id_index(repository):
+    repository.ensure_indexes()
+
+    indexes = repository.collection.index_information()
+    assert any(
+        index["key"] == [("video_id", 1)] and index.get("unique")
+        for index in indexes.values()
+    )
+    assert any(index["key"] == [("date", 1)] for index in indexes.values())
+    assert any(index["key"] == [("stats.views", 1)] for index in indexes.values())
+
+
+def test_ensure_indexes_should_report_duplicated_videos(repository):
+    repository.collection.insert_many(
+        [
+            make_video("a").model_dump(),
+            make_video("a").model_dump(),
+            make_video("b").model_dump(),
+        ]
+    )
+
+    with pytest.raises(Exception, match=r"duplicated videos: \['a'\]"):
+        repository.ensure_indexes()
+
+
+def test_get_videos_by_date_should_include_whole_end_day(repository):
+    repository.add_many([make_video("a")])
+
+    videos = repository.get_videos_by_date(
+        datetime.date(2023, 1, 1), datetime.date(2023, 1, 1)
+    )
+
+    assert [v.video_id for v in videos] == ["a"]
+
+
+def test_iter_videos_should_yield_only_matching_videos_with_projection(repository):
+    videos = [make_video(str(i)) for i in range(10)]
+    videos[3].transcript = "transcript"
+    repository.add_many(videos)
+
+    result = list(
+        repository.iter_videos(
+            {"transcript": None}, projection={"transcript": 0}, batch_size=3
+        )
+    )
+
+    assert len(result) == 9
+    assert "3" not in [v.video_id for v in result]
+
+
+def test_iter_rows_should_return_flat_rows_with_requested_columns_only(repository):
+    video = make_video("a", views=5)
+    video.transcript = "long transcript"
+    repository.add_many([video])
+
+    rows = list(
+        repository.iter_rows(
+            {
+                "views": "stats.views",
+                "title_sentiment": "stats.sentiment_rating.score_title",
+            }
+        )
+    )
+
+    assert rows == [{"views": 5, "title_sentiment": None}]
+
+
+def test_to_dataframe_should_return_typed_columns_with_missing_values(repository):
+    videos = [make_video(str(i), views=i) for i in range(500)]
+    videos[0].stats.views = None
+    repository.add_many(videos)
+
+    df = repository.to_dataframe(
+        {"date": "date", "views": "stats.views", "video_id": "video_id"},
+        {"date": "datetime64[ms]", "views": "float64"},
+        batch_size=120,
+    )
+
+    assert len(df) == 500
+    assert list(df.columns) == ["date", "views", "video_id"]
+    assert str(df["date"].dtype) == "datetime64[ms]"
+    assert df["views"].isna().sum() == 1
+    assert df["views"].sum() == sum(range(500))
+
+
+def test_to_dataframe_should_keep_missing_values_of_integer_columns(repository):
+    videos = [make_video(str(i), views=i) for i in range(3)]
+    videos[1].stats.likes = None
+    repository.add_many(videos)
+
+    df = repository.to_dataframe(
+        {"views": "stats.views", "likes": "stats.likes"},
+        {"views": "int64", "likes": "int64"},
+        batch_size=2,
+    )
+
+    assert str(df["likes"].dtype) == "Int64"
+    assert df["likes"].isna().tolist() == [False, True, False]
+    assert df["views"].tolist() == [0, 1, 2]
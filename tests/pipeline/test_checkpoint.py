@@ -0,0 +1,74 @@
+import datetime
+
+from model.pipeline.checkpoint import WindowCheckpoints, search_key
+from tests.conftest import make_video
+
+FIRST_WINDOW = (datetime.date(2023, 1, 1), datetime.date(2023, 1, 8))
+SECOND_WINDOW = (datetime.date(2023, 1, 8), datetime.date(2023, 1, 14))
+
+
+def _checkpoints(
+    repository, topic: str = "topic", max_results: int = 10, overwrite: bool = False
+) -> WindowCheckpoints:
+    return WindowCheckpoints(
+        repository,
+        topic,
+        datetime.date(2023, 1, 1),
+        datetime.date(2023, 1, 14),
+        time_delta=7,
+        search_key=search_key(max_results, "en", None, 5),
+        overwrite=overwrite,
+    )
+
+
+def test_window_checkpoints_should_resume_searched_windows_and_pending_videos(
+    repository,
+):
+    videos = [make_video("1"), make_video("2"), make_video("3")]
+    repository.add_many(videos)
+
+    checkpoints = _checkpoints(repository)
+    assert checkpoints.remaining_windows() == [FIRST_WINDOW, SECOND_WINDOW]
+    checkpoints.window_searched(FIRST_WINDOW, videos)
+    checkpoints.videos_processed(["2"])
+
+    resumed = _checkpoints(repository)
+
+    assert resumed.searched_windows() == {FIRST_WINDOW}
+    assert resumed.remaining_windows() == [SECOND_WINDOW]
+    assert [v.video_id for v in resumed.pending_videos()] == ["1", "3"]
+    assert _checkpoints(repository, topic="other").searched_windows() == set()
+
+
+def test_window_checkpoints_should_finish_video_shared_by_windows_in_both(
+    repository,
+):
+    repository.add_many([make_video("1")])
+    checkpoints = _checkpoints(repository)
+    checkpoints.window_searched(FIRST_WINDOW, [make_video("1")])
+    checkpoints.window_searched(SECOND_WINDOW, [make_video("1"), make_video("missing")])
+
+    resumed = _checkpoints(repository)
+    assert [v.video_id for v in resumed.pending_videos()] == ["1"]
+    resumed.videos_processed(["1"])
+
+    saved = repository.get_checkpoints("topic")
+    assert [c.video_ids for c in saved] == [["1"], ["1", "missing"]]
+    assert all(c.done for c in saved)
+
+
+def test_window_checkpoints_should_ignore_other_searches_and_overwritten_runs(
+    repository,
+):
+    repository.add_many([make_video("1")])
+    _checkpoints(repository).window_searched(FIRST_WINDOW, [make_video("1")])
+
+    other_search = _checkpoints(repository, max_results=20)
+    overwriting = _checkpoints(repository, overwrite=True)
+
+    for checkpoints in (other_search, overwriting):
+        assert checkpoints.searched_windows() == set()
+        assert checkpoints.pending_videos() == []
+    other_search.window_done(FIRST_WINDOW, [make_video("1")])
+    assert _checkpoints(repository).searched_windows() == {FIRST_WINDOW}
+    assert len(repository.get_checkpoints("topic")) == 2
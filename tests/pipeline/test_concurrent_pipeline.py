@@ -0,0 +1,207 @@
+import datetime
+import threading
+
+import pytest
+
+from model.pipeline.checkpoint import WindowCheckpoints
+from model.pipeline.concurrent_pipeline import YtVidScrapingConcurrentPipeline
+from model.sentiment_analysis.core import GptRating
+from model.youtube.core import iter_time_windows
+from tests.conftest import make_video
+
+
+class FakeTopVideoFinder:
+    def __init__(self, batches: list[list[str]]):
+        self.batches = batches
+
+    def scrape_top_videos_with_stats(self, **kwargs):
+        for batch in self.batches:
+            yield [make_video(video_id) for video_id in batch]
+
+
+class FakeTranscriptScraper:
+    def __init__(self):
+        self.started = {}
+        self.scraped = []
+
+    def scrape_transcript(self, video_id: str) -> str:
+        self.started.setdefault(video_id, threading.Event()).set()
+        self.scraped.append(video_id)
+        return f"transcript {video_id}"
+
+
+class FakeSentimentRater:
+    model_name = "fake"
+
+    def __init__(self, transcript_scraper: FakeTranscriptScraper):
+        self.transcript_scraper = transcript_scraper
+        self.overlapped = False
+
+    def rate(self, text: str) -> GptRating:
+        # whilst the first video is being rated, the next transcript should be scraped
+        if text == "title 1":
+            next_started = self.transcript_scraper.started.setdefault(
+                "2", threading.Event()
+            )
+            self.overlapped = next_started.wait(timeout=5)
+        return GptRating(value=0.5)
+
+    def rate_many(self, texts: list[str], batch_size: int = 16) -> list[GptRating]:
+        return [self.rate(text) for text in texts]
+
+
+def _process(pipeline: YtVidScrapingConcurrentPipeline):
+    pipeline.process(
+        topic="topic",
+        date_start=datetime.date(2023, 1, 1),
+        date_end=datetime.date(2023, 1, 14),
+        time_delta=7,
+    )
+
+
+def test_process_should_scrape_rate_and_save_all_videos(repository):
+    transcript_scraper = FakeTranscriptScraper()
+    pipeline = YtVidScrapingConcurrentPipeline(
+        repository,
+        FakeTopVideoFinder([["1", "2", "3"], ["4", "5"]]),
+        transcript_scraper,
+        FakeSentimentRater(transcript_scraper),
+        overwrite_existing_data=False,
+        transcript_workers=3,
+        sentiment_workers=2,
+        queue_size=2,
+        persistence_batch_size=2,
+    )
+
+    _process(pipeline)
+
+    videos = repository.get_all_videos()
+    assert sorted(v.video_id for v in videos) == ["1", "2", "3", "4", "5"]
+    for video in videos:
+        assert video.transcript == f"transcript {video.video_id}"
+        assert video.stats.sentiment_rating.score_title == 0.5
+        assert video.stats.sentiment_rating.score_transcript == 0.5
+
+
+def test_process_should_scrape_next_transcript_whilst_rating_previous_video(
+    repository,
+):
+    transcript_scraper = FakeTranscriptScraper()
+    sentiment_rater = FakeSentimentRater(transcript_scraper)
+    pipeline = YtVidScrapingConcurrentPipeline(
+        repository,
+        FakeTopVideoFinder([["1", "2"]]),
+        transcript_scraper,
+        sentiment_rater,
+        overwrite_existing_data=False,
+        transcript_workers=1,
+        sentiment_workers=1,
+    )
+
+    _process(pipeline)
+
+    assert sentiment_rater.overlapped
+
+
+def test_process_should_finish_queued_videos_when_search_fails(repository):
+    class FailingTopVideoFinder(FakeTopVideoFinder):
+        def scrape_top_videos_with_stats(self, **kwargs):
+            yield from super().scrape_top_videos_with_stats(**kwargs)
+            raise Exception("quota limit reached")
+
+    transcript_scraper = FakeTranscriptScraper()
+    pipeline = YtVidScrapingConcurrentPipeline(
+        repository,
+        FailingTopVideoFinder([["1", "2"]]),
+        transcript_scraper,
+        FakeSentimentRater(transcript_scraper),
+        overwrite_existing_data=False,
+    )
+
+    with pytest.raises(Exception, match="quota limit reached"):
+        _process(pipeline)
+
+    assert all(v.transcript for v in repository.get_all_videos())
+
+
+def test_process_should_process_videos_of_overlapping_windows_once(repository):
+    transcript_scraper = FakeTranscriptScraper()
+    pipeline = YtVidScrapingConcurrentPipeline(
+        repository,
+        FakeTopVideoFinder([["1", "2"], ["2", "3"]]),
+        transcript_scraper,
+        FakeSentimentRater(transcript_scraper),
+        overwrite_existing_data=True,
+    )
+
+    _process(pipeline)
+
+    assert sorted(transcript_scraper.scraped) == ["1", "2", "3"]
+    assert all(v.transcript for v in repository.get_all_videos())
+    assert all(c.done for c in repository.get_checkpoints("topic"))
+
+
+def test_process_should_finish_when_saving_checkpoints_fails(repository, monkeypatch):
+    def failing_videos_processed(self, video_ids):
+        raise Exception("checkpoints collection unavailable")
+
+    monkeypatch.setattr(WindowCheckpoints, "videos_processed", failing_videos_processed)
+    transcript_scraper = FakeTranscriptScraper()
+    pipeline = YtVidScrapingConcurrentPipeline(
+        repository,
+        FakeTopVideoFinder([[str(i) for i in range(10)], ["10", "11"]]),
+        transcript_scraper,
+        FakeSentimentRater(transcript_scraper),
+        overwrite_existing_data=False,
+        queue_size=1,
+        persistence_batch_size=1,
+    )
+
+    _process(pipeline)
+
+    assert len(repository.get_all_videos()) == 12
+    assert all(v.transcript for v in repository.get_all_videos())
+
+
+def test_process_when_restarted_should_skip_searched_windows(repository):
+    class WindowedTopVideoFinder:
+        def __init__(self):
+            self.skip_windows = None
+
+        def scrape_top_videos_with_stats(self, skip_windows=None, **kwargs):
+            self.skip_windows = skip_windows
+            windows = iter_time_windows(
+                kwargs["date_start"], kwargs["date_end"], kwargs["time_delta"]
+            )
+            for window in windows:
+                if window not in skip_windows:
+                    yield [make_video(str(window[0]))]
+
+    class FailingTopVideoFinder(WindowedTopVideoFinder):
+        def scrape_top_videos_with_stats(self, **kwargs):
+            yield next(super().scrape_top_videos_with_stats(**kwargs))
+            raise Exception("quota limit reached")
+
+    def pipeline(finder) -> YtVidScrapingConcurrentPipeline:
+        transcript_scraper = FakeTranscriptScraper()
+        return YtVidScrapingConcurrentPipeline(
+            repository,
+            finder,
+            transcript_scraper,
+            FakeSentimentRater(transcript_scraper),
+            overwrite_existing_data=False,
+        )
+
+    with pytest.raises(Exception, match="quota limit reached"):
+        _process(pipeline(FailingTopVideoFinder()))
+
+    finder = WindowedTopVideoFinder()
+    _process(pipeline(finder))
+
+    first_window = (datetime.date(2023, 1, 1), datetime.date(2023, 1, 8))
+    assert finder.skip_windows == {first_window}
+    assert sorted(v.video_id for v in repository.get_all_videos()) == [
+        "2023-01-01",
+        "2023-01-08",
+    ]
+    assert all(c.done for c in repository.get_checkpoints("topic"))
@@ -0,0 +1,162 @@
+import datetime
+import functools
+import time
+
+import mongomock
+import pytest
+
+from model.pipeline.sharded_runner import (MongoShardQueue,
+                                           ShardedBackfillRunner,
+                                           _run_queue_worker,
+                                           split_into_shards)
+from model.youtube.core import iter_time_windows
+
+
+class RecordingPipeline:
+    def __init__(self, output_path: str, api_keys: list[str]):
+        self.output_path = output_path
+        self.api_keys = api_keys
+
+    def process(self, topic, date_start, date_end, time_delta, **kwargs):
+        with open(self.output_path, "a") as f:
+            f.write(f"{','.join(self.api_keys)}|{date_start}|{date_end}\n")
+
+
+def recording_pipeline_factory(output_path: str, api_keys: list[str]):
+    return RecordingPipeline(output_path, api_keys)
+
+
+def _window_starts(shards) -> list[datetime.date]:
+    return [
+        start
+        for shard in shards
+        for start, _ in iter_time_windows(
+            shard.date_start, shard.date_end, shard.time_delta
+        )
+    ]
+
+
+def test_split_into_shards_should_cover_the_same_windows_in_contiguous_ranges():
+    date_start = datetime.date(2020, 1, 1)
+    date_end = datetime.date(2020, 12, 31)
+
+    shards = split_into_shards("Bitcoin", date_start, date_end, 7, 4, language="en")
+
+    assert len(shards) == 4
+    assert shards[0].date_start == date_start
+    assert shards[-1].date_end == date_end
+    for previous, shard in zip(shards, shards[1:]):
+        assert shard.date_start - previous.date_end == datetime.timedelta(days=1)
+    assert _window_starts(shards) == [
+        start for start, _ in iter_time_windows(date_start, date_end, 7)
+    ]
+    assert shards[0].process_kwargs == {"language": "en"}
+    assert len(split_into_shards("Bitcoin", date_start, date_start, 7, 4)) == 1
+
+
+def test_shard_queue_should_hand_out_each_shard_once_until_lease_expires():
+    queue = MongoShardQueue(mongomock.MongoClient().db.queue, lease_seconds=3600)
+    shards = split_into_shards(
+        "Bitcoin", datetime.date(2020, 1, 1), datetime.date(2020, 1, 28), 7, 2
+    )
+    queue.enqueue(shards)
+    queue.enqueue(shards)
+
+    first = queue.claim("worker1")
+    second = queue.claim("worker2")
+    assert [first, second] == shards
+    assert queue.claim("worker3") is None
+
+    queue.complete(first)
+    queue.release(second)
+    assert queue.claim("worker3") == second
+
+    queue.lease_seconds = -1
+    assert queue.claim("worker4") == second
+    queue.lease_seconds = 3600
+    assert queue.claim("worker5") is None
+
+
+def test_shard_queue_should_renew_only_the_claims_of_the_worker():
+    queue = MongoShardQueue(mongomock.MongoClient().db.queue, lease_seconds=3600)
+    queue.enqueue(
+        split_into_shards(
+            "Bitcoin", datetime.date(2020, 1, 1), datetime.date(2020, 1, 14), 7, 1
+        )
+    )
+
+    shard = queue.claim("worker1")
+    assert queue.renew(shard, "worker1")
+    assert not queue.renew(shard, "worker2")
+
+    queue.lease_seconds = -1
+    assert queue.claim("worker2") == shard
+    assert not queue.renew(shard, "worker1")
+
+
+def test_queue_worker_should_keep_the_lease_of_a_long_shard():
+    queue = MongoShardQueue(mongomock.MongoClient().db.queue, lease_seconds=0.3)
+    queue.enqueue(
+        split_into_shards(
+            "Bitcoin", datetime.date(2020, 1, 1), datetime.date(2020, 1, 14), 7, 1
+        )
+    )
+    stolen = []
+
+    class SlowPipeline:
+        def process(self, **kwargs):
+            time.sleep(1)
+            stolen.append(queue.claim("worker2"))
+
+    processed = _run_queue_worker(
+        lambda api_keys: SlowPipeline(), ["key1"], lambda: queue, "worker1"
+    )
+
+    assert processed == 1
+    assert stolen == [None]
+
+
+def test_run_should_give_the_workers_of_each_machine_other_api_keys(tmp_path):
+    output_path = str(tmp_path / "processed.txt")
+    runner = ShardedBackfillRunner(
+        ["key1", "key2", "key3", "key4", "key5", "key6"],
+        functools.partial(recording_pipeline_factory, output_path),
+        workers=2,
+        machines=2,
+        machine_index=1,
+    )
+
+    runner.run("Bitcoin", datetime.date(2020, 1, 1), datetime.date(2020, 1, 28), 7)
+
+    with open(output_path) as f:
+        keys = sorted(line.split("|")[0] for line in f)
+    assert keys == ["key3", "key4"]
+
+
+def test_run_should_process_shards_in_worker_processes_with_own_api_keys(tmp_path):
+    output_path = str(tmp_path / "processed.txt")
+    runner = ShardedBackfillRunner(
+        ["key1", "key2", "key3"],
+        functools.partial(recording_pipeline_factory, output_path),
+        workers=2,
+    )
+
+    runner.run("Bitcoin", datetime.date(2020, 1, 1), datetime.date(2020, 1, 28), 7)
+
+    with open(output_path) as f:
+        processed = sorted(line.strip().split("|") for line in f)
+    assert processed == [
+        ["key1,key3", "2020-01-01", "2020-01-14"],
+        ["key2", "2020-01-15", "2020-01-28"],
+    ]
+
+
+def test_run_should_raise_after_all_shards_when_a_shard_fails(tmp_path):
+    runner = ShardedBackfillRunner(
+        ["key1", "key2"],
+        functools.partial(recording_pipeline_factory, str(tmp_path / "missing/out")),
+        workers=2,
+    )
+
+    with pytest.raises(Exception, match="Backfill failed"):
+        runner.run("Bitcoin", datetime.date(2020, 1, 1), datetime.date(2020, 1, 28), 7)
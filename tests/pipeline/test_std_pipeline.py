@@ -0,0 +1,59 @@
+import datetime
+
+import pytest
+from mockito import spy2, unstub, verify
+
+from model.persistence.mongo import YtVideoMongoRepository
+from model.pipeline.std_pipeline import YtVidScrapingStdPipeline
+from model.sentiment_analysis.core import GptRating
+from tests.conftest import make_video
+
+
+class FakeTopVideoFinder:
+    def scrape_top_videos_with_stats(self, **kwargs):
+        yield [make_video(str(i)) for i in range(15)]
+        yield [make_video(str(i)) for i in range(15, 20)]
+
+
+class FakeTranscriptScraper:
+    def scrape_transcript(self, video_id: str) -> str:
+        return f"transcript {video_id}"
+
+
+class FakeSentimentRater:
+    model_name = "fake"
+
+    def rate_many(self, texts: list[str], batch_size: int = 16) -> list[GptRating]:
+        return [GptRating(value=0.5) for _ in texts]
+
+
+@pytest.fixture
+def repository(repository) -> YtVideoMongoRepository:
+    spy2(repository.update_many)
+    spy2(repository.update_if_exists)
+    yield repository
+    unstub()
+
+
+def test_process_should_save_videos_in_batches(repository):
+    pipeline = YtVidScrapingStdPipeline(
+        repository,
+        FakeTopVideoFinder(),
+        FakeTranscriptScraper(),
+        FakeSentimentRater(),
+        overwrite_existing_data=False,
+    )
+
+    pipeline.process(
+        topic="topic",
+        date_start=datetime.date(2023, 1, 1),
+        date_end=datetime.date(2023, 1, 14),
+        time_delta=7,
+    )
+
+    videos = repository.get_all_videos()
+    assert len(videos) == 20
+    assert all(v.transcript and v.stats.sentiment_rating for v in videos)
+    # transcripts and ratings of the 20 videos, in batches of 16
+    verify(repository, times=4).update_many(...)
+    verify(repository, times=0).update_if_exists(...)
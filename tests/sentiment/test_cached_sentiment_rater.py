@@ -0,0 +1,82 @@
+import pytest
+
+from model.sentiment_analysis.core import GptRating, SplitScoreRating
+from model.sentiment_analysis.rating_cache import (CachedSentimentRater,
+                                                   SentimentRatingCache)
+
+
+class CountingSentimentRater:
+    def __init__(self, model_name: str = "counting", failing: tuple[str, ...] = ()):
+        self.model_name = model_name
+        self.failing = failing
+        self.rated = []
+
+    def rate_many(
+        self, texts: list[str], batch_size: int = 16
+    ) -> list[GptRating | None]:
+        self.rated.extend(texts)
+        return [
+            None if text in self.failing else GptRating(value=len(text) / 100)
+            for text in texts
+        ]
+
+
+@pytest.fixture
+def cache_path(tmp_path) -> str:
+    return str(tmp_path / "sentiment_cache.sqlite")
+
+
+def test_rate_many_should_rate_each_normalized_text_once(cache_path):
+    rater = CountingSentimentRater()
+    cached_rater = CachedSentimentRater(rater, SentimentRatingCache(cache_path))
+
+    first = cached_rater.rate_many(["bitcoin  up", "btc down", "bitcoin up\n"])
+    second = cached_rater.rate_many(["btc down", "bitcoin up"])
+
+    assert rater.rated == ["bitcoin  up", "btc down"]
+    assert [r.score for r in first] == [0.11, 0.08, 0.11]
+    assert [r.score for r in second] == [0.08, 0.11]
+
+
+def test_ratings_should_be_shared_across_runs_of_the_same_model(cache_path):
+    CachedSentimentRater(
+        CountingSentimentRater(), SentimentRatingCache(cache_path)
+    ).rate("bitcoin up")
+
+    rater = CountingSentimentRater()
+    other_model_rater = CountingSentimentRater("other")
+    # memory cache of the new run is empty, so the rating comes from sqlite
+    rating = CachedSentimentRater(rater, SentimentRatingCache(cache_path)).rate(
+        "bitcoin up"
+    )
+    CachedSentimentRater(other_model_rater, SentimentRatingCache(cache_path)).rate(
+        "bitcoin up"
+    )
+
+    assert rater.rated == []
+    assert rating == GptRating(value=0.1)
+    assert other_model_rater.rated == ["bitcoin up"]
+
+
+def test_texts_that_failed_to_be_rated_should_not_be_cached(cache_path):
+    rater = CountingSentimentRater(failing=("btc down",))
+    cached_rater = CachedSentimentRater(rater, SentimentRatingCache(cache_path))
+
+    first = cached_rater.rate_many(["bitcoin up", "btc down"])
+    rater.failing = ()
+    second = cached_rater.rate_many(["bitcoin up", "btc down"])
+
+    assert first == [GptRating(value=0.1), None]
+    assert second == [GptRating(value=0.1), GptRating(value=0.08)]
+    assert rater.rated == ["bitcoin up", "btc down", "btc down"]
+
+
+def test_cache_should_keep_rating_types_and_evict_least_recently_used(cache_path):
+    cache = SentimentRatingCache(cache_path, memory_entries=1)
+    split_rating = SplitScoreRating(negative=0.1, neutral=0.2, positive=0.7)
+
+    cache.put_many("model", {"a": split_rating, "b": GptRating(value=0.5)})
+
+    assert list(cache._memory) == [("model", "b")]
+    assert cache.get_many("model", ["a", "c"]) == {"a": split_rating}
+    assert isinstance(cache.get_many("model", ["a"])["a"], SplitScoreRating)
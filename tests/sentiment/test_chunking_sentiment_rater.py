@@ -0,0 +1,81 @@
+import pytest
+
+from model.sentiment_analysis.chunking_rater import ChunkingSentimentRater
+from model.sentiment_analysis.core import SplitScoreRating
+from model.sentiment_analysis.rating_cache import (CachedSentimentRater,
+                                                   SentimentRatingCache)
+
+
+class WordTokenizer:
+    def __call__(self, texts: list[str], add_special_tokens: bool = True) -> dict:
+        return {"input_ids": [[len(word) for word in text.split()] for text in texts]}
+
+    def decode(self, token_ids: list[int]) -> str:
+        return " ".join("x" * token_id for token_id in token_ids)
+
+
+class WordLengthSentimentRater:
+    """
+    Rates the text positive if its first word is short, negative otherwise
+    """
+
+    model_name = "word-length"
+
+    def __init__(self):
+        self.calls = []
+
+    def rate_many(self, texts: list[str], batch_size: int = 16):
+        self.calls.append(texts)
+        return [
+            SplitScoreRating(negative=0.0, neutral=0.0, positive=1.0)
+            if len(text.split()[0]) == 1
+            else SplitScoreRating(negative=1.0, neutral=0.0, positive=0.0)
+            for text in texts
+        ]
+
+
+def test_rate_many_should_rate_overlapping_chunks_of_all_texts_in_one_call():
+    rater = WordLengthSentimentRater()
+    chunking_rater = ChunkingSentimentRater(
+        rater, WordTokenizer(), chunk_tokens=4, overlap_tokens=1, keep_chunks=True
+    )
+
+    ratings = chunking_rater.rate_many(["a b c dd e f", "a b"])
+
+    assert rater.calls == [["x x x xx", "xx x x", "x x"]]
+    assert len(ratings[0].chunks) == 2
+    # 4 tokens positive, 3 tokens negative
+    assert ratings[0].positive == pytest.approx(4 / 7)
+    assert ratings[0].score == pytest.approx(round(1 / 7, 2))
+    assert ratings[1].score == 1.0
+    assert chunking_rater.model_name == "word-length-chunks-4-1"
+
+
+def test_rate_should_not_keep_chunks_by_default():
+    chunking_rater = ChunkingSentimentRater(
+        WordLengthSentimentRater(), WordTokenizer(), chunk_tokens=2, overlap_tokens=0
+    )
+
+    rating = chunking_rater.rate("a b cc dd e")
+
+    assert rating.chunks is None
+    assert rating.score == pytest.approx(round((3 - 2) / 5, 2))
+
+
+def test_cached_ratings_should_not_be_shared_between_chunking_configurations(tmp_path):
+    cache = SentimentRatingCache(str(tmp_path / "sentiment_cache.sqlite"))
+    text = "a bb ccc dddd e"
+    rater = WordLengthSentimentRater()
+    small_chunks = ChunkingSentimentRater(
+        rater, WordTokenizer(), chunk_tokens=2, overlap_tokens=0
+    )
+    large_chunks = ChunkingSentimentRater(
+        rater, WordTokenizer(), chunk_tokens=5, overlap_tokens=0
+    )
+
+    small_rating = CachedSentimentRater(small_chunks, cache).rate(text)
+    large_rating = CachedSentimentRater(large_chunks, cache).rate(text)
+    CachedSentimentRater(small_chunks, cache).rate(text)
+
+    assert len(rater.calls) == 2
+    assert small_rating != large_rating
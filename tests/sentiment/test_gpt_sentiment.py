@@ -1,8 +1,13 @@
 import configparser
+import threading
 
+import openai
 import pytest
+from mockito import unstub, when
 
 from config_data_provider import get_open_ai_api_key
+from model.gpt_tools.rate_limiter import RateLimiter
+from model.gpt_tools.tools import GptContact
 from model.sentiment_analysis.core import ISentimentRater, SentimentRating
 from model.sentiment_analysis.sentiment_gpt import GptSentimentRater
 from tests.resources.sentiment_data import (SentimentRatingType,
@@ -34,3 +39,116 @@ def test_very_positive_sentiment_string_should_receive_very_positive_score(
     sentiment_rating: SentimentRating = sentiment_rater.rate(very_positive_string)
     score = sentiment_rating.score
     assert score >= 0.5
+
+
+class FakeGptContact:
+    def __init__(self, answers: dict[str, list], in_flight: int = 1):
+        self.answers = answers
+        # every request waits until in_flight requests are sent
+        self.barrier = threading.Barrier(in_flight, timeout=5)
+
+    def get_chat_completion(self, system_message: str, text: str, **kwargs) -> str:
+        self.barrier.wait()
+        answer = self.answers[text].pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def _fake_gpt_sentiment_rater(
+    gpt: FakeGptContact, max_in_flight: int = 1, **kwargs
+) -> GptSentimentRater:
+    sentiment_rater = GptSentimentRater(
+        "key",
+        max_in_flight=max_in_flight,
+        rate_limiter=RateLimiter(1_000, 100_000),
+        **kwargs,
+    )
+    sentiment_rater.gpt = gpt
+    sentiment_rater.BACKOFF_SECONDS = 0
+    when(sentiment_rater)._request_tokens(...).thenReturn(100)
+    return sentiment_rater
+
+
+def test_rate_many_should_keep_requests_in_flight_and_keep_order():
+    texts = [f"text {i}" for i in range(8)]
+    gpt = FakeGptContact(
+        {text: [f"sentiment_rating = {i * 10}"] for i, text in enumerate(texts)},
+        in_flight=4,
+    )
+
+    ratings = _fake_gpt_sentiment_rater(gpt, max_in_flight=4).rate_many(texts)
+
+    assert [rating.score for rating in ratings] == [i / 10 for i in range(8)]
+
+
+def test_rate_should_retry_rate_limit_errors_and_invalid_answers():
+    gpt = FakeGptContact(
+        {
+            "text": [
+                openai.error.RateLimitError("Rate limit reached"),
+                "I can't rate that",
+                "sentiment_rating = -50",
+            ]
+        }
+    )
+
+    assert _fake_gpt_sentiment_rater(gpt).rate("text").score == -0.5
+
+
+def test_rate_should_raise_when_retries_run_out():
+    gpt = FakeGptContact({"text": ["no rating"] * 4})
+
+    with pytest.raises(ValueError, match="Could not get valid gpt sentiment rating"):
+        _fake_gpt_sentiment_rater(gpt).rate("text")
+
+
+def test_rate_many_should_return_none_for_texts_that_fail_and_keep_the_rest():
+    gpt = FakeGptContact(
+        {
+            "up": ["sentiment_rating = 50"],
+            "broken": [openai.error.InvalidRequestError("Invalid request", None)],
+            "unclear": ["no rating"] * 4,
+            "down": ["sentiment_rating = -50"],
+        }
+    )
+
+    ratings = _fake_gpt_sentiment_rater(gpt).rate_many(
+        ["up", "broken", "unclear", "down"]
+    )
+
+    assert [rating and rating.score for rating in ratings] == [0.5, None, None, -0.5]
+
+
+@pytest.fixture
+def word_token_count():
+    when(GptContact).count_tokens(...).thenAnswer(lambda text: len(text.split()))
+    yield
+    unstub()
+
+
+def test_packed_rate_many_should_fall_back_to_single_requests_for_invalid_ratings(
+    word_token_count,
+):
+    long_text = " ".join(["long"] * 20)
+    gpt = FakeGptContact(
+        {
+            "1. up\n2. down": ["1. sentiment_rating = 50\n2. sentiment_rating = -50"],
+            "1. flat\n2. moon": ["2. sentiment_rating = 500\n1. sentiment_rating = 0"],
+            "moon": ["sentiment_rating = 100"],
+            "1. crash": ["1. sentiment_rating = -100"],
+            long_text: ["sentiment_rating = 10"],
+        }
+    )
+    # two one-word texts fit into the budget
+    system_tokens = len(GptSentimentRater.PACKED_SYSTEM_MESSAGE.split())
+    sentiment_rater = _fake_gpt_sentiment_rater(
+        gpt, pack_token_budget=system_tokens + 2 * (1 + 4 + 12)
+    )
+
+    ratings = sentiment_rater.rate_many(
+        ["up", "down", "flat", "moon", "crash", long_text]
+    )
+
+    assert [rating.score for rating in ratings] == [0.5, -0.5, 0.0, 1.0, -1.0, 0.1]
+    assert all(not answers for answers in gpt.answers.values())
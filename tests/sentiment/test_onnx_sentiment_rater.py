@@ -0,0 +1,45 @@
+import pytest
+
+from model.sentiment_analysis.core import ISentimentRater
+from model.sentiment_analysis.onnx_rater import RobertaOnnxSentimentRater
+from model.sentiment_analysis.sentiment_roberta import RobertaSentimentRater
+from tests.resources.sentiment_data import (SentimentRatingType,
+                                            read_sentiment_data)
+
+# int8 quantization moves the scores a bit, but not across the rating categories
+MAX_SCORE_DIFFERENCE = 0.1
+
+
+@pytest.fixture(scope="module")
+def sentiment_rater() -> ISentimentRater:
+    return RobertaSentimentRater()
+
+
+@pytest.fixture(scope="module")
+def onnx_sentiment_rater(tmp_path_factory) -> ISentimentRater:
+    return RobertaOnnxSentimentRater(str(tmp_path_factory.mktemp("onnx_models")))
+
+
+@pytest.mark.parametrize("rating_type", list(SentimentRatingType))
+def test_onnx_scores_should_match_pytorch_scores(
+    sentiment_rater, onnx_sentiment_rater, rating_type
+):
+    texts = read_sentiment_data(rating_type)
+
+    scores = [rating.score for rating in sentiment_rater.rate_many(texts)]
+    onnx_scores = [rating.score for rating in onnx_sentiment_rater.rate_many(texts)]
+
+    for score, onnx_score in zip(scores, onnx_scores):
+        assert abs(score - onnx_score) <= MAX_SCORE_DIFFERENCE
+
+
+def test_rate_many_should_match_rating_texts_one_by_one(onnx_sentiment_rater):
+    texts = read_sentiment_data(SentimentRatingType.NEGATIVE)[:3]
+    texts += read_sentiment_data(SentimentRatingType.POSITIVE)[:3]
+
+    batched = onnx_sentiment_rater.rate_many(texts, batch_size=4)
+
+    for text, rating in zip(texts, batched):
+        assert onnx_sentiment_rater.rate(text).score == pytest.approx(
+            rating.score, abs=0.01
+        )
@@ -0,0 +1,124 @@
+import json
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+from mockito import mock, when
+
+from model.youtube.api_key_pool import ApiKeyPool
+
+
+def _quota_error(reason: str = "quotaExceeded") -> HttpError:
+    return HttpError(
+        httplib2.Response({"status": 403}),
+        json.dumps({"error": {"errors": [{"reason": reason}]}}).encode(),
+    )
+
+
+def test_acquire_should_spread_requests_across_keys_until_quota_runs_out():
+    pool = ApiKeyPool(["key1", "key2"], daily_quota=250)
+
+    keys = [pool.acquire("search") for _ in range(4)]
+
+    assert sorted(keys) == ["key1", "key1", "key2", "key2"]
+    assert pool.remaining("key1") == 50
+    assert pool.acquire("videos") in ("key1", "key2")
+    with pytest.raises(Exception, match="quota limit reached"):
+        pool.acquire("search")
+
+
+def test_key_pool_should_resume_used_quota_from_state_file(tmp_path):
+    state_path = str(tmp_path / "quota.json")
+    pool = ApiKeyPool(["key1", "key2"], state_path=state_path)
+    pool.acquire("search")
+    pool.mark_exhausted("key2")
+
+    resumed = ApiKeyPool(["key1", "key2"], state_path=state_path)
+
+    assert resumed.remaining("key1") == 9_900
+    assert resumed.remaining("key2") == 0
+    assert "key1" not in open(state_path).read()
+
+
+def test_key_pool_should_reset_used_quota_on_new_day(tmp_path):
+    state_path = str(tmp_path / "quota.json")
+    pool = ApiKeyPool(["key1"], state_path=state_path)
+    pool.mark_exhausted("key1")
+
+    pool._day = "2020-01-01"
+    pool._save()
+
+    assert ApiKeyPool(["key1"], state_path=state_path).remaining("key1") == 10_000
+    assert pool.remaining("key1") == 10_000
+
+
+def test_execute_should_reuse_clients_and_switch_keys_on_quota_error():
+    built = []
+    exhausted_client = mock()
+    working_client = mock()
+    when(exhausted_client).search().thenRaise(_quota_error())
+    when(working_client).search().thenReturn(mock({"execute": lambda: {"items": []}}))
+
+    def client_factory(api_key: str):
+        built.append(api_key)
+        return {"key1": exhausted_client, "key2": working_client}[api_key]
+
+    pool = ApiKeyPool(["key1", "key2"], client_factory=client_factory)
+
+    assert pool.execute("search", lambda yt: yt.search()) == {"items": []}
+    assert pool.execute("search", lambda yt: yt.search()) == {"items": []}
+    assert built == ["key1", "key2"]
+    assert pool.remaining("key1") == 0
+
+
+def test_key_pools_of_different_keys_should_share_state_file(tmp_path):
+    state_path = str(tmp_path / "quota.json")
+    first = ApiKeyPool(["key1"], state_path=state_path)
+    second = ApiKeyPool(["key2"], state_path=state_path)
+
+    first.acquire("search")
+    second.mark_exhausted("key2")
+
+    resumed = ApiKeyPool(["key1", "key2"], state_path=state_path)
+    assert resumed.remaining("key1") == 9_900
+    assert resumed.remaining("key2") == 0
+
+
+def test_execute_should_retry_rate_limited_key_without_exhausting_it():
+    client = mock()
+    response = mock({"execute": lambda: {"items": []}})
+    when(client).search().thenRaise(_quota_error("rateLimitExceeded")).thenReturn(
+        response
+    )
+    sleeps = []
+    pool = ApiKeyPool(
+        ["key1", "key2"], client_factory=lambda api_key: client, sleep=sleeps.append
+    )
+
+    assert pool.execute("search", lambda yt: yt.search()) == {"items": []}
+    assert len(sleeps) == 1
+    assert pool.remaining("key1") + pool.remaining("key2") == 19_900
+
+
+def test_key_pool_should_save_state_only_every_save_units(tmp_path):
+    state_path = tmp_path / "quota.json"
+    pool = ApiKeyPool(["key1"], state_path=str(state_path))
+
+    for _ in range(ApiKeyPool.SAVE_EVERY_UNITS - 1):
+        pool.acquire("videos")
+    assert not state_path.exists()
+
+    pool.acquire("videos")
+    assert ApiKeyPool(["key1"], state_path=str(state_path)).remaining("key1") == 9_900
+
+
+def test_key_pools_sharing_key_should_add_up_their_usage(tmp_path):
+    state_path = str(tmp_path / "quota.json")
+    first = ApiKeyPool(["key1"], state_path=state_path)
+    second = ApiKeyPool(["key1"], state_path=state_path)
+
+    first.acquire("search")
+    second.acquire("search")
+
+    assert ApiKeyPool(["key1"], state_path=state_path).remaining("key1") == 9_800
+    assert second.remaining("key1") == 9_800
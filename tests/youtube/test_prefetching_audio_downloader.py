@@ -0,0 +1,66 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from model.youtube.prefetching_audio_downloader import PrefetchingAudioDownloader
+
+MB = 1024 * 1024
+
+
+class SlowAudioDownloader:
+    def __init__(self, audio_bytes: int, max_audio_bytes: int | None):
+        self.audio_bytes = audio_bytes
+        self.max_audio_bytes = max_audio_bytes
+        self._lock = threading.Lock()
+        self.loading = 0
+        self.max_loading = 0
+
+    def load(self, video_id: str) -> np.ndarray:
+        if video_id == "broken":
+            raise Exception("Decoding audio of broken failed")
+        with self._lock:
+            self.loading += 1
+            self.max_loading = max(self.max_loading, self.loading)
+        time.sleep(0.02)
+        with self._lock:
+            self.loading -= 1
+        return np.zeros(self.audio_bytes // 4, np.float32)
+
+
+def test_load_many_should_keep_order_and_prefetch_limit():
+    downloader = SlowAudioDownloader(MB, max_audio_bytes=MB)
+    prefetcher = PrefetchingAudioDownloader(downloader, prefetch=3)
+    video_ids = [f"video {i}" for i in range(10)]
+
+    loaded = []
+    for video_id, audio in prefetcher.load_many(video_ids):
+        time.sleep(0.05)
+        loaded.append(video_id)
+
+    assert loaded == video_ids
+    assert downloader.max_loading == 3
+
+
+def test_load_many_should_keep_within_memory_budget():
+    # no audio fits into the budget next to the consumed one, only the next is loaded
+    downloader = SlowAudioDownloader(MB, max_audio_bytes=MB)
+    prefetcher = PrefetchingAudioDownloader(downloader, prefetch=3, memory_budget_mb=1)
+
+    for _ in prefetcher.load_many([f"video {i}" for i in range(5)]):
+        time.sleep(0.05)
+
+    assert downloader.max_loading == 1
+
+
+def test_load_many_should_raise_download_error_at_failed_video():
+    downloader = SlowAudioDownloader(MB, max_audio_bytes=None)
+    prefetcher = PrefetchingAudioDownloader(downloader, prefetch=2)
+
+    loaded = []
+    with pytest.raises(Exception, match="broken"):
+        for video_id, _ in prefetcher.load_many(["first", "broken", "last"]):
+            loaded.append(video_id)
+
+    assert loaded == ["first"]
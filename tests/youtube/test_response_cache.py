@@ -0,0 +1,62 @@
+import datetime
+
+import pytest
+
+from model.youtube.response_cache import (SEARCH_TTL_CLOSED_WINDOW,
+                                          SEARCH_TTL_RECENT_WINDOW,
+                                          ResponseCache)
+
+
+@pytest.fixture
+def cache_path(tmp_path) -> str:
+    return str(tmp_path / "cache.sqlite")
+
+
+def _search_parameters(window_end: datetime.date, key: str = "key1") -> dict:
+    return {
+        "q": "Bitcoin",
+        "maxResults": 20,
+        "publishedBefore": f"{window_end}T23:59:59Z",
+        "key": key,
+    }
+
+
+def test_response_cache_should_ignore_api_key_and_persist_responses(cache_path):
+    cache = ResponseCache(cache_path)
+    parameters = _search_parameters(datetime.date(2020, 1, 7))
+    cache.put("search", parameters, {"items": [1, 2]})
+    cache.close()
+
+    cache = ResponseCache(cache_path)
+    other_key = _search_parameters(datetime.date(2020, 1, 7), key="key2")
+    assert cache.get("search", other_key) == {"items": [1, 2]}
+    assert cache.get("search", _search_parameters(datetime.date(2020, 1, 14))) is None
+    assert cache.get("videos", parameters) is None
+
+
+def test_response_cache_should_keep_closed_windows_longer_than_recent_ones(
+    cache_path,
+):
+    cache = ResponseCache(cache_path, ttls={"videos": 0})
+    today = datetime.date.today()
+
+    assert cache.ttl(
+        "search", _search_parameters(today - datetime.timedelta(days=30))
+    ) == (SEARCH_TTL_CLOSED_WINDOW)
+    assert cache.ttl("search", _search_parameters(today)) == SEARCH_TTL_RECENT_WINDOW
+
+    cache.put("videos", {"id": "vid"}, {"items": []})
+    assert cache.get("videos", {"id": "vid"}) is None
+
+
+def test_response_cache_should_evict_least_recently_used_responses(cache_path):
+    cache = ResponseCache(cache_path, max_entries=2)
+
+    cache.put("videos", {"id": "vid1"}, {"items": [1]})
+    cache.put("videos", {"id": "vid2"}, {"items": [2]})
+    cache.get("videos", {"id": "vid1"})
+    cache.put("videos", {"id": "vid3"}, {"items": [3]})
+
+    assert cache.get("videos", {"id": "vid1"}) == {"items": [1]}
+    assert cache.get("videos", {"id": "vid2"}) is None
+    assert cache.get("videos", {"id": "vid3"}) == {"items": [3]}
@@ -0,0 +1,177 @@
+import datetime
+
+from model.sentiment_analysis.core import GptRating
+from model.youtube.core import (YoutubeVideoSentimentRating, YtVideo,
+                                YtVideoStats)
+from model.youtube.sentiment_filler import (SentimentFiller,
+                                            rate_videos_sentiment)
+
+
+class CountingSentimentRater:
+    model_name = "counting"
+
+    def __init__(self):
+        self.rated = []
+        self.batches = []
+
+    def rate(self, text: str) -> GptRating:
+        self.rated.append(text)
+        return GptRating(value=0.5)
+
+    def rate_many(self, texts: list[str], batch_size: int = 16) -> list[GptRating]:
+        self.batches.append(len(texts))
+        return [self.rate(text) for text in texts]
+
+
+class PartlyFailingSentimentRater(CountingSentimentRater):
+    def rate_many(
+        self, texts: list[str], batch_size: int = 16
+    ) -> list[GptRating | None]:
+        return [
+            None if text.startswith("failing") else GptRating(value=0.5)
+            for text in texts
+        ]
+
+
+def test_fill_missing_sentiment_ratings_should_rate_only_incomplete_videos(
+    repository,
+):
+    rated = YtVideo(
+        video_id="rated",
+        title="rated title",
+        channel="channel",
+        date=datetime.datetime(2023, 1, 1),
+        transcript="rated transcript",
+        stats=YtVideoStats(
+            sentiment_rating=YoutubeVideoSentimentRating(
+                model="counting", score_title=0.1, score_transcript=0.2
+            )
+        ),
+    )
+    missing = YtVideo(
+        video_id="missing",
+        title="missing title",
+        channel="channel",
+        date=datetime.datetime(2023, 1, 1),
+        transcript="missing transcript",
+        stats=YtVideoStats(),
+    )
+    repository.add_many([rated, missing])
+    sentiment_rater = CountingSentimentRater()
+
+    SentimentFiller(sentiment_rater, repository, False).fill_missing_sentiment_ratings()
+
+    assert sentiment_rater.rated == ["missing title", "missing transcript"]
+    rating = repository.get_video("missing").stats.sentiment_rating
+    assert rating.score_title == 0.5 and rating.score_transcript == 0.5
+
+
+def test_rate_videos_sentiment_should_rate_missing_texts_in_one_call():
+    videos = [
+        YtVideo(
+            video_id=str(i),
+            title=f"title {i}",
+            channel="channel",
+            date=datetime.datetime(2023, 1, 1),
+            transcript=f"transcript {i}" if i != 2 else None,
+            stats=YtVideoStats(
+                sentiment_rating=YoutubeVideoSentimentRating(
+                    model="counting", score_title=0.1
+                )
+                if i == 0
+                else None
+            ),
+        )
+        for i in range(3)
+    ]
+    sentiment_rater = CountingSentimentRater()
+
+    rate_videos_sentiment(sentiment_rater, videos, overwrite_existing_data=False)
+
+    assert sentiment_rater.batches == [4]
+    assert sentiment_rater.rated == [
+        "transcript 0",
+        "title 1",
+        "transcript 1",
+        "title 2",
+    ]
+    assert [
+        (
+            v.stats.sentiment_rating.score_title,
+            v.stats.sentiment_rating.score_transcript,
+        )
+        for v in videos
+    ] == [(0.1, 0.5), (0.5, 0.5), (0.5, None)]
+
+
+def test_rate_videos_sentiment_should_leave_texts_that_failed_to_be_rated_unrated():
+    videos = [
+        YtVideo(
+            video_id=str(i),
+            title=title,
+            channel="channel",
+            date=datetime.datetime(2023, 1, 1),
+            transcript=transcript,
+            stats=YtVideoStats(),
+        )
+        for i, (title, transcript) in enumerate(
+            [("failing title", "transcript"), ("title", "failing transcript")]
+        )
+    ]
+
+    rate_videos_sentiment(
+        PartlyFailingSentimentRater(), videos, overwrite_existing_data=False
+    )
+
+    assert videos[0].stats.sentiment_rating is None
+    assert videos[1].stats.sentiment_rating == YoutubeVideoSentimentRating(
+        model="counting", score_title=0.5, score_transcript=None
+    )
+
+
+def test_rate_videos_sentiment_when_overwriting_should_keep_scores_that_failed():
+    video = YtVideo(
+        video_id="video",
+        title="title",
+        channel="channel",
+        date=datetime.datetime(2023, 1, 1),
+        transcript="failing transcript",
+        stats=YtVideoStats(
+            sentiment_rating=YoutubeVideoSentimentRating(
+                model="counting", score_title=0.1, score_transcript=-0.3
+            )
+        ),
+    )
+
+    rate_videos_sentiment(
+        PartlyFailingSentimentRater(), [video], overwrite_existing_data=True
+    )
+
+    assert video.stats.sentiment_rating == YoutubeVideoSentimentRating(
+        model="counting", score_title=0.5, score_transcript=-0.3
+    )
+
+
+def test_fill_missing_sentiment_ratings_should_skip_rated_videos_without_transcript(
+    repository,
+):
+    repository.add_many(
+        [
+            YtVideo(
+                video_id="no transcript",
+                title="title",
+                channel="channel",
+                date=datetime.datetime(2023, 1, 1),
+                stats=YtVideoStats(
+                    sentiment_rating=YoutubeVideoSentimentRating(
+                        model="counting", score_title=0.1
+                    )
+                ),
+            )
+        ]
+    )
+    sentiment_rater = CountingSentimentRater()
+
+    SentimentFiller(sentiment_rater, repository, False).fill_missing_sentiment_ratings()
+
+    assert sentiment_rater.rated == []
@@ -0,0 +1,95 @@
+import datetime
+import threading
+import time
+
+import numpy as np
+import pytest
+import whisper
+from mockito import mock, unstub, when
+
+from model.persistence.mongo import YtVideoMongoRepository
+from model.youtube.core import YtVideo
+from model.youtube.transcript_filler import TranscriptFiller
+from model.youtube.whisper_transcript import WhisperTranscriptExtractor
+from model.youtube.yt_audio_downloader import YtAudioDownloader
+from model.youtube.yt_transcript_scraper import YtWhisperTranscriptScraper
+
+
+class SlowTranscriptScraper:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def scrape_transcript(self, video_id: str) -> str | None:
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self._lock:
+            self.running -= 1
+        return f"transcript of {video_id}"
+
+    def scrape_transcripts(self, video_ids):
+        for video_id in video_ids:
+            yield video_id, self.scrape_transcript(video_id)
+
+
+@pytest.fixture
+def repository(repository) -> YtVideoMongoRepository:
+    repository.add_many(
+        [
+            YtVideo(
+                video_id=f"video {i}",
+                title="title",
+                channel="channel",
+                date=datetime.datetime(2023, 1, 1),
+                transcript="done" if i % 2 else None,
+            )
+            for i in range(10)
+        ]
+    )
+    return repository
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_fill_missing_transcripts_should_fill_only_missing(repository, workers):
+    scraper = SlowTranscriptScraper()
+
+    TranscriptFiller(scraper, repository, workers).fill_missing_transcripts()
+
+    transcripts = {v.video_id: v.transcript for v in repository.iter_videos()}
+    assert transcripts == {
+        f"video {i}": "done" if i % 2 else f"transcript of video {i}" for i in range(10)
+    }
+    assert scraper.max_running == workers
+
+
+class NotThreadSafeWhisperModel:
+    def __init__(self):
+        self.transcribing = False
+
+    def transcribe(self, audio: np.ndarray) -> dict:
+        if self.transcribing:
+            raise Exception("Transcribing from two threads at once")
+        self.transcribing = True
+        time.sleep(0.05)
+        self.transcribing = False
+        return {"text": f"{len(audio)} samples"}
+
+
+def test_threads_sharing_whisper_scraper_should_transcribe_one_at_a_time(repository):
+    when(whisper).load_model(...).thenReturn(NotThreadSafeWhisperModel())
+    downloader = mock(YtAudioDownloader)
+    when(downloader).load(...).thenReturn(np.zeros(16_000, dtype=np.float32))
+    scraper = YtWhisperTranscriptScraper(WhisperTranscriptExtractor(), downloader)
+
+    try:
+        TranscriptFiller(scraper, repository, workers=2).fill_missing_transcripts()
+    finally:
+        unstub()
+
+    transcripts = {v.video_id: v.transcript for v in repository.iter_videos()}
+    assert transcripts == {
+        f"video {i}": "done" if i % 2 else "16000 samples" for i in range(10)
+    }
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from model.youtube.voice_activity import VoiceActivityDetector
+from model.youtube.yt_audio_downloader import SAMPLE_RATE
+
+
+def tone(seconds: float, amplitude: float = 0.5) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds: float) -> np.ndarray:
+    noise = np.random.default_rng(0).normal(0, 1e-4, int(seconds * SAMPLE_RATE))
+    return noise.astype(np.float32)
+
+
+@pytest.fixture
+def vad() -> VoiceActivityDetector:
+    return VoiceActivityDetector("energy", padding_ms=0)
+
+
+def test_speech_segments_should_find_loud_parts(vad):
+    audio = np.concatenate([silence(3), tone(2), silence(2), tone(1), silence(1)])
+
+    segments = vad.speech_segments(audio)
+
+    assert len(segments) == 2
+    for (start, end), (expected_start, expected_end) in zip(segments, [(3, 5), (7, 8)]):
+        assert start / SAMPLE_RATE == pytest.approx(expected_start, abs=0.03)
+        assert end / SAMPLE_RATE == pytest.approx(expected_end, abs=0.03)
+
+
+def test_speech_segments_should_join_short_pauses_and_drop_short_noises(vad):
+    audio = np.concatenate(
+        [tone(1), silence(0.2), tone(1), silence(2), tone(0.1), silence(2)]
+    )
+
+    segments = vad.speech_segments(audio)
+
+    assert len(segments) == 1
+    assert segments[0][1] / SAMPLE_RATE == pytest.approx(2.2, abs=0.03)
+
+
+def test_trim_should_keep_only_speech(vad):
+    audio = np.concatenate([silence(10), tone(2), silence(10)])
+
+    trimmed = vad.trim(audio)
+
+    assert len(trimmed) / SAMPLE_RATE == pytest.approx(2, abs=0.05)
+
+
+def test_trim_should_keep_audio_without_speech(vad):
+    audio = silence(5)
+
+    assert vad.trim(audio) is audio
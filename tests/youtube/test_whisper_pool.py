@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+import pytest
+
+from model.youtube.whisper_pool import WhisperTranscriptionPool
+
+
+def load_fake_model(model: str, threads: int):
+    # stands for the whisper model: transcript tells which model and process made it
+    pid = os.getpid()
+    return lambda audio: f"{model} {pid} {len(audio)}"
+
+
+@pytest.fixture(scope="module")
+def pool() -> WhisperTranscriptionPool:
+    pool = WhisperTranscriptionPool("tiny", workers=2, backend=load_fake_model)
+    yield pool
+    pool.close()
+
+
+def test_transcribe_many_should_keep_order_of_audio(pool):
+    audios = [np.zeros(length, np.float32) for length in range(1, 21)]
+
+    transcripts = list(pool.transcribe_many(audios))
+
+    assert [t.split()[0] for t in transcripts] == ["tiny"] * 20
+    assert [int(t.split()[2]) for t in transcripts] == list(range(1, 21))
+
+
+def test_transcribe_should_run_in_worker_process(pool):
+    transcript = pool.transcribe(np.zeros(16_000, np.float32))
+
+    assert int(transcript.split()[1]) != os.getpid()
+
+
+def test_invalid_backend_should_raise():
+    with pytest.raises(Exception, match="Invalid whisper backend"):
+        WhisperTranscriptionPool(backend="invalid")
@@ -0,0 +1,96 @@
+import datetime
+
+from model.youtube.core import YtVideoStats
+from model.youtube.window_search import (SearchRequest, StatsRequest,
+                                         WindowSearch)
+
+
+def _search_response(
+    video_ids: list[str], next_page_token: str = None, live: tuple[str, ...] = ()
+) -> dict:
+    items = [
+        {
+            "id": {"kind": "youtube#video", "videoId": video_id},
+            "snippet": {
+                "channelTitle": "channel",
+                "title": f"video {video_id}",
+                "publishedAt": "2020-01-01T12:00:00Z",
+                "liveBroadcastContent": "live" if video_id in live else "none",
+            },
+        }
+        for video_id in video_ids
+    ]
+    response = {"items": items}
+    if next_page_token:
+        response["nextPageToken"] = next_page_token
+    return response
+
+
+def _window(max_results: int) -> WindowSearch:
+    return WindowSearch(
+        "Bitcoin",
+        datetime.date(2020, 1, 1),
+        datetime.date(2020, 1, 7),
+        max_results=max_results,
+        min_views=100,
+    )
+
+
+def _stats(videos, views: int = 1000) -> dict[str, YtVideoStats]:
+    return {
+        video.video_id: YtVideoStats(views=views, length_minutes=10) for video in videos
+    }
+
+
+def test_window_search_should_stop_scraping_stats_once_enough_videos_are_found():
+    window = _window(max_results=2)
+
+    request = window.next_request()
+    assert isinstance(request, SearchRequest)
+    assert request.parameters["maxResults"] == 50
+    window.feed(request, _search_response([f"vid{i}" for i in range(10)], "page2"))
+
+    request = window.next_request()
+    assert isinstance(request, StatsRequest)
+    assert len(request.videos) == 4
+    window.feed(request, _stats(request.videos))
+
+    assert window.next_request() is None
+    assert [video.video_id for video in window.results] == ["vid0", "vid1"]
+    assert window.results[0].stats.views == 1000
+
+
+def test_window_search_should_skip_live_and_duplicate_videos_and_page_search():
+    window = _window(max_results=2)
+
+    request = window.next_request()
+    window.feed(request, _search_response(["vid0", "vid1"], "page2", live=("vid1",)))
+
+    request = window.next_request()
+    assert [video.video_id for video in request.videos] == ["vid0"]
+    window.feed(request, _stats(request.videos))
+
+    request = window.next_request()
+    assert isinstance(request, SearchRequest)
+    assert request.parameters["pageToken"] == "page2"
+    window.feed(request, _search_response(["vid0", "vid2"]))
+
+    request = window.next_request()
+    assert [video.video_id for video in request.videos] == ["vid2"]
+    window.feed(request, _stats(request.videos))
+
+    assert window.next_request() is None
+    assert [video.video_id for video in window.results] == ["vid0", "vid2"]
+
+
+def test_window_search_should_grow_stats_batches_when_videos_dont_meet_criteria():
+    window = _window(max_results=2)
+    window.feed(window.next_request(), _search_response([f"vid{i}" for i in range(10)]))
+
+    request = window.next_request()
+    window.feed(request, _stats(request.videos, views=1))
+    assert len(window.next_request().videos) == 6
+
+    window.feed(window.next_request(), {})
+    assert window.next_request() is None
+    assert window.results == []
@@ -0,0 +1,12 @@
+from model.youtube.yt_api_client import build_yt_client, discovery_document
+
+
+def test_build_yt_client_should_build_clients_from_document_parsed_once():
+    discovery_document.cache_clear()
+
+    clients = [build_yt_client(api_key) for api_key in ("key1", "key2")]
+    request = clients[1].videos().list(part="statistics", id="dQw4w9WgXcQ")
+
+    assert discovery_document.cache_info().misses == 1
+    assert request.uri.startswith("https://youtube.googleapis.com/youtube/v3/videos")
+    assert "key=key2" in request.uri
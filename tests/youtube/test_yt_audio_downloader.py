@@ -0,0 +1,71 @@
+import subprocess
+
+import numpy as np
+import pytest
+from mockito import unstub, when
+
+from model.youtube.yt_audio_downloader import YtAudioDownloader
+
+
+@pytest.fixture
+def downloader() -> YtAudioDownloader:
+    downloader = YtAudioDownloader(length_min=2)
+    when(downloader._info_extractor).extract_info(...).thenReturn(
+        {"url": "https://audio.example/stream", "http_headers": {"User-Agent": "agent"}}
+    )
+    yield downloader
+    unstub()
+
+
+def test_load_should_decode_first_minutes_of_audio_stream_in_memory(downloader):
+    commands = []
+    samples = np.array([0, 16384, -32768], dtype=np.int16)
+
+    def run(command, **kwargs):
+        commands.append(command)
+        return subprocess.CompletedProcess(command, 0, samples.tobytes(), b"")
+
+    when(subprocess).run(...).thenAnswer(run)
+
+    audio = downloader.load("vid")
+
+    assert audio.dtype == np.float32
+    assert audio.tolist() == [0.0, 0.5, -1.0]
+    command = commands[0]
+    assert command[command.index("-t") + 1] == "120"
+    assert command.index("-t") < command.index("-i")
+    assert command[command.index("-i") + 1] == "https://audio.example/stream"
+    assert command[command.index("-ar") + 1] == "16000"
+    assert command[-1] == "-"
+
+
+def test_load_should_raise_when_decoding_fails(downloader):
+    when(subprocess).run(...).thenReturn(
+        subprocess.CompletedProcess([], 1, b"", b"Server returned 403 Forbidden")
+    )
+
+    with pytest.raises(Exception, match="403 Forbidden"):
+        downloader.load("vid")
+
+
+def test_load_should_sample_windows_across_video():
+    downloader = YtAudioDownloader(length_min=2, sample_windows=3)
+    when(downloader._info_extractor).extract_info(...).thenReturn(
+        {"url": "https://audio.example/stream", "duration": 640}
+    )
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+        samples = np.full(4, len(commands), dtype=np.int16)
+        return subprocess.CompletedProcess(command, 0, samples.tobytes(), b"")
+
+    when(subprocess).run(...).thenAnswer(run)
+
+    audio = downloader.load("vid")
+    unstub()
+
+    starts = [c[c.index("-ss") + 1] if "-ss" in c else "0" for c in commands]
+    assert starts == ["0", "300", "600"]
+    assert [c[c.index("-t") + 1] for c in commands] == ["40", "40", "40"]
+    assert (audio * 32768).tolist() == [1] * 4 + [2] * 4 + [3] * 4
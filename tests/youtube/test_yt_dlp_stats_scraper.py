@@ -1,8 +1,10 @@
 import datetime
 
 import pytest
+from mockito import mock, when
 
 from model.youtube.core import IYtStatsScraper, YtVideo, YtVideoStats
+from model.youtube.yt_info_extractor import YtInfoExtractor
 from model.youtube.yt_stats_scraper import YtDlpStatsScraper
 
 
@@ -26,3 +28,17 @@ def test_scrape_video_stats_never_gonna_give_you_up_should_return_over_1b_views_
     assert stats.views > 1_000_000_000
     assert stats.comments > 2_000_000
     assert 3.5 < stats.length_minutes < 3.7
+
+
+def test_scrape_stats_many_should_leave_out_videos_that_fail():
+    info_extractor = mock(YtInfoExtractor)
+    when(info_extractor).extract_info("ok").thenReturn(
+        {"view_count": 10, "comment_count": 1, "duration": 120}
+    )
+    when(info_extractor).extract_info("private").thenRaise(Exception("Private video"))
+    scraper = YtDlpStatsScraper(info_extractor)
+
+    stats = scraper.scrape_stats_many(["private", "ok"])
+
+    assert list(stats) == ["ok"]
+    assert stats["ok"].views == 10 and stats["ok"].length_minutes == 2
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+import yt_dlp
+
+from model.youtube.yt_info_extractor import YtInfoExtractor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeYoutubeDL:
+    def __init__(self, params: dict):
+        # threads extracting with the instance
+        self.threads = []
+        instances.append(self)
+
+    def extract_info(self, url: str, download: bool) -> dict:
+        self.threads.append(threading.get_ident())
+        time.sleep(0.01)
+        return {"webpage_url": url}
+
+
+# FakeYoutubeDLs created by the test
+instances: list[FakeYoutubeDL] = []
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def extractor(clock, monkeypatch) -> YtInfoExtractor:
+    instances.clear()
+    monkeypatch.setattr(yt_dlp, "YoutubeDL", FakeYoutubeDL)
+    return YtInfoExtractor(max_entries=2, ttl=60, clock=clock)
+
+
+def _extractions() -> int:
+    return sum(len(ytdl.threads) for ytdl in instances)
+
+
+def test_extract_info_should_fetch_video_once(extractor):
+    infos = [extractor.extract_info("vid") for _ in range(3)]
+
+    assert infos[0]["webpage_url"] == "https://www.youtube.com/watch?v=vid"
+    assert infos[1] is infos[0] and infos[2] is infos[0]
+    assert _extractions() == 1
+
+
+def test_extract_info_should_fetch_again_after_ttl(extractor, clock):
+    extractor.extract_info("vid")
+    clock.now = 61
+
+    extractor.extract_info("vid")
+
+    assert _extractions() == 2
+
+
+def test_extract_info_should_evict_least_recently_used(extractor):
+    for video_id in ["first", "second", "first", "third", "first", "second"]:
+        extractor.extract_info(video_id)
+
+    # "second" was evicted by "third", whilst "first" was in use
+    assert _extractions() == 4
+
+
+def test_extract_info_should_fetch_once_for_concurrent_threads(extractor):
+    threads = [
+        threading.Thread(target=extractor.extract_info, args=("vid",)) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert _extractions() == 1
+
+
+def test_threads_should_extract_with_their_own_youtube_dl(extractor):
+    threads = [
+        threading.Thread(target=extractor.extract_info, args=(f"vid{i}",))
+        for i in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    extractor.extract_info("vid3")
+    extractor.extract_info("vid4")
+
+    assert [len(set(ytdl.threads)) for ytdl in instances] == [1, 1, 1, 1]
+    assert sorted(len(ytdl.threads) for ytdl in instances) == [1, 1, 1, 2]
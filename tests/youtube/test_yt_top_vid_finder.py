@@ -1,6 +1,9 @@
 import datetime
+import json
 
+import httplib2
 import pytest
+from googleapiclient.errors import HttpError
 from mockito import any, mock, verify, when
 
 from config_data_provider import get_yt_api_keys
@@ -30,19 +33,18 @@ def test_scrape_top_videos_with_stats_should_yield_list_of_videos_with_stats(yt_
     assert list_of_vid_lists[0][0].stats.views > 1
 
 
-def test_scrape_top_videos_when_quota_reached_should_switch_api_keys_then_raise(
-    yt_finder,
-):
+def test_scrape_top_videos_when_quota_reached_should_switch_api_keys_then_raise():
+    api_keys = get_yt_api_keys()
+    yt_finder = YtTopVideoFinder(api_keys)
     mock_api_client = mock()
 
-    # make mock api client throw exception when we call search method on it to simulate
-    # the quota limit reached
-    when(mock_api_client).search(any()).thenRaise(Exception("quota limit reached"))
-
-    api_keys_number = len(get_yt_api_keys())
-
-    when(yt_finder)._build_client().thenReturn(mock_api_client)
-    yt_finder._youtube = yt_finder._build_client()
+    # make mock api client throw quota exceeded error when we call search method on it
+    quota_error = HttpError(
+        httplib2.Response({"status": 403}),
+        json.dumps({"error": {"errors": [{"reason": "quotaExceeded"}]}}).encode(),
+    )
+    when(mock_api_client).search().thenRaise(quota_error)
+    when(yt_finder)._build_client(any()).thenReturn(mock_api_client)
 
     with pytest.raises(Exception, match="quota limit reached"):
         list(
@@ -55,6 +57,5 @@ def test_scrape_top_videos_when_quota_reached_should_switch_api_keys_then_raise(
             )
         )
 
-    # make sure the client gets rebuilt number of times equal to number
-    # of our api keys
-    verify(yt_finder, times=api_keys_number)._build_client()
+    # make sure the client gets built once for each of our api keys
+    verify(yt_finder, times=len(api_keys))._build_client(any())
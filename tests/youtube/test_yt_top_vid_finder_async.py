@@ -0,0 +1,197 @@
+import asyncio
+import datetime
+
+import pytest
+
+from model.youtube.response_cache import ResponseCache
+from model.youtube.yt_top_vid_finder_async import AsyncYtTopVideoFinder
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: dict):
+        self.status = status
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def json(self, content_type=None):
+        return self.body
+
+
+class FakeYtApiSession:
+    """
+    Serves videos_per_search videos per search window, the first one's id is the window's
+    start day. The later windows respond faster than the earlier ones
+    """
+
+    def __init__(
+        self, exhausted_keys: tuple[str, ...] = (), videos_per_search: int = 1
+    ):
+        self.exhausted_keys = exhausted_keys
+        self.videos_per_search = videos_per_search
+        self.used_keys = []
+        self.videos_requests = []
+        self.searches_in_flight = 0
+        self.max_searches_in_flight = 0
+
+    def get(self, url: str, params: dict):
+        self.used_keys.append(params["key"])
+        if params["key"] in self.exhausted_keys:
+            error = {"error": {"errors": [{"reason": "quotaExceeded"}]}}
+            return FakeResponse(403, error)
+        if url.endswith("/search"):
+            return self._search(params)
+        self.videos_requests.append(params["id"].split(","))
+        items = [self._video_item(video_id) for video_id in params["id"].split(",")]
+        return FakeResponse(200, {"items": items})
+
+    def _search(self, params: dict):
+        session = self
+        day = params["publishedAfter"][:10]
+
+        class SlowSearchResponse(FakeResponse):
+            async def __aenter__(self):
+                session.searches_in_flight += 1
+                session.max_searches_in_flight = max(
+                    session.max_searches_in_flight, session.searches_in_flight
+                )
+                await asyncio.sleep(0.05 / int(day[-2:]))
+                session.searches_in_flight -= 1
+                return self
+
+        first = int(params.get("pageToken", 0))
+        last = min(first + params["maxResults"], self.videos_per_search)
+        items = [
+            {
+                "id": {"kind": "youtube#video", "videoId": f"{day}-{i}" if i else day},
+                "snippet": {
+                    "channelTitle": "channel",
+                    "title": f"video from {day}",
+                    "publishedAt": f"{day}T12:00:00Z",
+                },
+            }
+            for i in range(first, last)
+        ]
+        page = {"items": items}
+        if last < self.videos_per_search:
+            page["nextPageToken"] = str(last)
+        return SlowSearchResponse(200, page)
+
+    @staticmethod
+    def _video_item(video_id: str) -> dict:
+        return {
+            "id": video_id,
+            "statistics": {"viewCount": "1000", "likeCount": "10"},
+            "contentDetails": {"duration": "PT10M"},
+        }
+
+    async def close(self):
+        pass
+
+
+def _finder(
+    session: FakeYtApiSession, api_keys: list[str], response_cache: ResponseCache = None
+) -> AsyncYtTopVideoFinder:
+    finder = AsyncYtTopVideoFinder(
+        api_keys, max_concurrent_windows=3, response_cache=response_cache
+    )
+
+    async def create_session():
+        return session
+
+    finder._create_session = create_session
+    return finder
+
+
+def test_scrape_top_videos_should_search_windows_concurrently_and_yield_them_in_order():
+    session = FakeYtApiSession()
+    finder = _finder(session, ["key"])
+
+    batches = list(
+        finder.scrape_top_videos_with_stats(
+            topic="Bitcoin",
+            date_start=datetime.date(2020, 1, 1),
+            date_end=datetime.date(2020, 1, 28),
+            time_delta=7,
+            max_results_per_time_delta=5,
+        )
+    )
+
+    assert [batch[0].video_id for batch in batches] == [
+        "2020-01-01",
+        "2020-01-08",
+        "2020-01-15",
+        "2020-01-22",
+    ]
+    assert batches[0][0].stats.views == 1000
+    assert session.max_searches_in_flight == 3
+
+
+def test_scrape_top_videos_should_fetch_stats_of_up_to_50_videos_per_request():
+    session = FakeYtApiSession(videos_per_search=60)
+    finder = _finder(session, ["key"])
+
+    batches = list(
+        finder.scrape_top_videos_with_stats(
+            topic="Bitcoin",
+            date_start=datetime.date(2020, 1, 1),
+            date_end=datetime.date(2020, 1, 7),
+            time_delta=7,
+            max_results_per_time_delta=60,
+        )
+    )
+
+    assert len(batches[0]) == 60
+    assert [len(ids) for ids in session.videos_requests] == [50, 10]
+
+
+def test_scrape_top_videos_when_quota_reached_should_switch_api_keys_then_raise():
+    session = FakeYtApiSession(exhausted_keys=("key1",))
+    finder = _finder(session, ["key1", "key2"])
+
+    batches = list(
+        finder.scrape_top_videos_with_stats(
+            topic="Bitcoin",
+            date_start=datetime.date(2020, 1, 1),
+            date_end=datetime.date(2020, 1, 7),
+            time_delta=7,
+        )
+    )
+    assert len(batches) == 1
+    assert session.used_keys[-1] == "key2"
+
+    session.exhausted_keys = ("key1", "key2")
+    with pytest.raises(Exception, match="quota limit reached"):
+        list(
+            finder.scrape_top_videos_with_stats(
+                topic="Bitcoin",
+                date_start=datetime.date(2020, 1, 1),
+                date_end=datetime.date(2020, 1, 14),
+                time_delta=7,
+            )
+        )
+
+
+def test_scrape_top_videos_when_rerun_should_serve_responses_from_cache(tmp_path):
+    response_cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    session = FakeYtApiSession()
+
+    def scrape():
+        return list(
+            _finder(session, ["key"], response_cache).scrape_top_videos_with_stats(
+                topic="Bitcoin",
+                date_start=datetime.date(2020, 1, 1),
+                date_end=datetime.date(2020, 1, 14),
+                time_delta=7,
+            )
+        )
+
+    batches = scrape()
+    requests_made = len(session.used_keys)
+
+    assert scrape() == batches
+    assert len(session.used_keys) == requests_made